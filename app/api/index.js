@@ -32,6 +32,25 @@ export const fetchMe = async () => {
   return res.data;
 };
 
+// 修改密碼：伺服器撤銷此前的 token 並回傳新 token，存回 SecureStore
+export const changePassword = async (oldPassword, newPassword) => {
+  const headers = await getAuthHeader();
+  const res = await api.post("/auth/password", { oldPassword, newPassword }, { headers });
+  await SecureStore.setItemAsync("token", res.data.token);
+  return res.data;
+};
+
+// 登出：伺服器端的撤銷只在處理請求的 worker 生效，其他 worker 仍接受舊 token 直到過期，
+// 因此一定要同時刪除本地的 token
+export const logout = async () => {
+  const headers = await getAuthHeader();
+  try {
+    await api.post("/auth/logout", {}, { headers });
+  } finally {
+    await SecureStore.deleteItemAsync("token");
+  }
+};
+
 // 取出待複習單字
 export const fetchWordsToReview = async (limit = 10) => {
   const headers = await getAuthHeader();
@@ -64,6 +83,13 @@ export const sendReviewFeedback = async (wordId, quality) => {
   return res.data;
 };
 
+// 一次回報整個複習階段 items: [{ wordId, quality }]
+export const sendReviewFeedbackBatch = async (items) => {
+  const headers = await getAuthHeader();
+  const res = await api.post("/review/feedback/batch", { items }, { headers });
+  return res.data;
+};
+
 // 建立文章
 export const createArticle = async (lexileTarget, targetWords) => {
   const headers = await getAuthHeader();
@@ -74,23 +100,50 @@ export const createArticle = async (lexileTarget, targetWords) => {
   return res.data;
 };
 
-// 取得所有文章
-export const fetchArticles = async () => {
+// 依 nextCursor 逐頁取回列表端點的所有資料
+const fetchAllPages = async (path, key) => {
   const headers = await getAuthHeader();
-  const res = await api.get("/articles", { headers });
-  return res.data;
+  const items = [];
+  let cursor = null;
+  do {
+    const params = cursor ? { cursor } : {};
+    const res = await api.get(path, { headers, params });
+    items.push(...(res.data[key] || []));
+    cursor = res.data.nextCursor;
+  } while (cursor);
+  return { [key]: items };
 };
 
-// 取得單篇文章
+// 取得所有文章（摘要，不含內文）
+export const fetchArticles = async () => fetchAllPages("/articles", "articles");
+
+// 取得單篇文章：記住 ETag，再次開啟時送 If-None-Match，未變更（304）就沿用記憶體中的內容
+const articleCache = new Map();
+
 export const getArticle = async (articleId) => {
   const headers = await getAuthHeader();
-  const res = await api.get(`/articles/${articleId}`, { headers });
+  const cached = articleCache.get(articleId);
+  if (cached) headers["If-None-Match"] = cached.etag;
+  const res = await api.get(`/articles/${articleId}`, {
+    headers,
+    validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
+  });
+  if (res.status === 304 && cached) return cached.data;
+  if (res.headers.etag) articleCache.set(articleId, { etag: res.headers.etag, data: res.data });
   return res.data;
 };
 
-export async function fetchAllWords() {
-  const res = await api.get('/words', { headers: await getAuthHeader() });
+// 差異同步：since 傳上次回傳的 token（第一次傳 null）
+// 回傳 { token, full, words, deletedWords, articles, deletedArticles }；full 為 true 時以回應取代本機資料
+export const fetchChanges = async (since = null) => {
+  const headers = await getAuthHeader();
+  const params = since ? { since } : {};
+  const res = await api.get("/sync", { headers, params });
   return res.data;
+};
+
+export async function fetchAllWords() {
+  return fetchAllPages('/words', 'words');
 }
 
 export async function fetchImageForWord(word) {
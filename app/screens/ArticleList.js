@@ -55,7 +55,7 @@ export default function ArticleList() {
   };
 
   const renderItem = ({ item }) => {
-    const preview = getSmartPreview(item.article, item.targetWords);
+    const preview = item.preview || getSmartPreview(item.article, item.targetWords);
     const dateStr = formatDateTime(item.createdAt);
     const targetWordsStr = item.targetWords?.join(", ") || "（無單字）";
 
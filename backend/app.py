@@ -1,42 +1,65 @@
 # backend/app.py
+"""
+Flask app factory：
+    gunicorn "app:create_app()"     # 或沿用 gunicorn app:app
+    gunicorn -c gunicorn.conf.py app:app   # pre-fork 預載
+
+匯入本模組只載入 Flask 與各 blueprint；Firestore / SQLite 連線、OpenAI client、
+可讀性字典都在第一次使用時才建立（見 storage、clients、readability），
+worker 啟動與測試不必等 gRPC 通道或大型套件匯入。
+"""
 import os
 from flask import Flask, jsonify
 from dotenv import load_dotenv
-import firebase_admin
-from firebase_admin import credentials, firestore
-from openai import OpenAI
 
+# 先載入 .env，STORAGE_BACKEND / GOOGLE_APPLICATION_CREDENTIALS / OPENAI_API_KEY 等設定才會生效
 load_dotenv()
-GOOGLE_CRED = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
-OPENAI_KEY = os.getenv("OPENAI_API_KEY")
 
-# 初始化 Firebase
-if not firebase_admin._apps:
-    cred = credentials.Certificate(GOOGLE_CRED)
-    firebase_admin.initialize_app(cred)
-db = firestore.client()
 
-# 初始化 OpenAI (文章 Blueprint 內也要設定 key)
-client = OpenAI(api_key=OPENAI_KEY)
+def create_app(config=None):
+    """
+    建立 Flask app。config 可覆寫：
+    - STORAGE_BACKEND：firestore / memory / sqlite（預設取自環境變數，未設定為 firestore）
+    - STORAGE_PATH：sqlite 後端的檔案路徑
+    - SLOW_REQUEST_MS / METRICS_TOKEN：見 metrics.py
+    較大的 JSON 回應依 Accept-Encoding 壓縮（見 compression.py）
+    """
+    app = Flask(__name__)
+    app.config.update(
+        STORAGE_BACKEND=os.getenv("STORAGE_BACKEND", "firestore"),
+        STORAGE_PATH=os.getenv("STORAGE_PATH"),
+    )
+    app.config.update(config or {})
+
+    import storage
+    import metrics
+    import compression
+    storage.configure(app.config["STORAGE_BACKEND"], app.config["STORAGE_PATH"])
+    metrics.init_app(app)
+    compression.init_app(app)
+
+    @app.route("/")
+    def index():
+        return jsonify(message="Hello LLM World 👋")
 
-app = Flask(__name__)
+    # 註冊各 Blueprint（延後到建立 app 時才匯入）
+    from words.routes import bp as words_bp
+    from articles.routes import bp as articles_bp
+    from auth.routes import bp as auth_bp
+    from review.routes import bp as review_bp
+    from pick_words.routes import bp as pick_words_bp
+    from sync.routes import bp as sync_bp
 
-@app.route("/")
-def index():
-    return jsonify(message="Hello LLM World 👋")
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(words_bp)
+    app.register_blueprint(articles_bp)
+    app.register_blueprint(review_bp)
+    app.register_blueprint(pick_words_bp)
+    app.register_blueprint(sync_bp)
+    return app
 
-# 註冊剛才拆出的三個 Blueprint
-from words.routes import bp as words_bp
-from articles.routes import bp as articles_bp
-from auth.routes import bp as auth_bp
-from review.routes import bp as review_bp
-from pick_words.routes import bp as pick_words_bp
 
-app.register_blueprint(auth_bp)
-app.register_blueprint(words_bp)
-app.register_blueprint(articles_bp)
-app.register_blueprint(review_bp)
-app.register_blueprint(pick_words_bp)
+app = create_app()
 
 if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
@@ -0,0 +1,124 @@
+# backend/article_cache.py
+"""
+GET /articles/<id> 的條件式請求與序列化快取
+
+- 建立文章時存入 contentHash（內文的 sha256）；內文建立後不再變動
+- 強 ETag = contentHash 前段 + updatedAt（儲存層每次寫入都會更新，PUT 修改 lexileTarget / targetWords 後即改變）
+- 先只讀 userId / contentHash / updatedAt 三個欄位：If-None-Match 相符時直接回 304，不讀內文
+- 不相符時查行程內 LRU（ARTICLE_CACHE_SIZE 篇），以 (article_id, etag) 命中時直接回傳已序列化、
+  已壓縮的內容，不必讀整份文件或重新序列化；各 worker 各自一份，以 ETag 判斷是否過期
+- 沒有 contentHash 的舊文章照舊讀整份文件，ETag 以序列化後內容的雜湊計算，不放入快取
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from compression import compress, base_etag
+from metrics import register_collector
+
+CACHE_SIZE = int(os.getenv("ARTICLE_CACHE_SIZE", "256"))
+HASH_PREFIX = 16
+VALIDATOR_FIELDS = ["userId", "contentHash", "updatedAt"]
+
+
+def content_hash(article_text: str) -> str:
+    return hashlib.sha256(article_text.encode("utf-8")).hexdigest()
+
+
+def article_etag(doc):
+    """由 contentHash 與 updatedAt 組成的 ETag（含引號）；缺少任一欄位時回傳 None"""
+    digest, updated = doc.get("contentHash"), doc.get("updatedAt")
+    if not digest or updated is None:
+        return None
+    # Firestore 回傳帶時區的 UTC、SQLite 回傳 naive UTC，直接格式化兩者結果一致
+    return f'"{digest[:HASH_PREFIX]}.{updated.strftime("%Y%m%d%H%M%S%f")}"'
+
+
+def payload_etag(body: bytes) -> str:
+    return f'"{hashlib.sha256(body).hexdigest()[:HASH_PREFIX * 2]}"'
+
+
+def matching_etag(if_none_match, etag):
+    """
+    If-None-Match（werkzeug ETags）中與 etag 相符的值（弱比較，忽略編碼後綴），沒有時回傳 None；
+    回 304 時沿用用戶端送來的值，與它持有的那份表示一致
+    """
+    if if_none_match.star_tag:
+        return etag
+    bare = etag.strip('"')
+    for tag in if_none_match.as_set(include_weak=True):
+        if base_etag(tag) == bare:
+            return f'"{tag}"'
+    return None
+
+
+class ArticlePayload:
+    """一篇文章序列化後的內容，壓縮版本第一次需要時才產生"""
+
+    def __init__(self, etag, body):
+        self.etag = etag
+        self.body = body
+        self._encoded = {}
+
+    def encoded(self, encoding) -> bytes:
+        body = self._encoded.get(encoding)
+        if body is None:
+            body = self._encoded[encoding] = compress(self.body, encoding)
+        return body
+
+
+class ArticlePayloadCache:
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, article_id, etag):
+        with self._lock:
+            payload = self._lru.get(article_id)
+            if payload is None or payload.etag != etag:
+                self.misses += 1
+                return None
+            self._lru.move_to_end(article_id)
+            self.hits += 1
+            return payload
+
+    def put(self, article_id, etag, body) -> ArticlePayload:
+        payload = ArticlePayload(etag, body)
+        if self.maxsize <= 0:
+            return payload
+        with self._lock:
+            self._lru[article_id] = payload
+            self._lru.move_to_end(article_id)
+            while len(self._lru) > self.maxsize:
+                self._lru.popitem(last=False)
+        return payload
+
+    def discard(self, article_id):
+        with self._lock:
+            self._lru.pop(article_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._lru.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._lru), "hits": self.hits, "misses": self.misses}
+
+
+article_cache = ArticlePayloadCache()
+
+
+@register_collector
+def _cache_samples():
+    stats = article_cache.stats()
+    labels = {"cache": "articles"}
+    return [
+        ("cache_entries", "Entries held by in-process caches", labels, stats["size"]),
+        ("cache_hits", "In-process cache hits since start", labels, stats["hits"]),
+        ("cache_misses", "In-process cache misses since start", labels, stats["misses"]),
+    ]
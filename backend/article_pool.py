@@ -0,0 +1,246 @@
+# backend/article_pool.py
+"""
+文章預產池：在背景先替活躍使用者產好「下一篇」文章，POST /articles 命中時不必等 GPT
+
+- 預測：不帶 targetWords 產文時，目標字是依 dueDate 排序的前 5 個單字（與 _parse_article_request 相同）；
+  難度取該使用者最近最常用的 Lexile 區段（寬度 LEXILE_BAND，預設 100L）中最近一次的 lexileTarget
+- 背景 worker（每個行程一條執行緒，第一次有工作時才啟動）經 llm.py 的 article_prefetch site 產文，
+  該 site 並行上限低，忙碌時直接放棄，不與使用者的即時請求搶名額；
+  產完以 approximate_lexile 評分，與目標差超過 LEXILE_TOLERANCE 就丟棄
+- 命中：同一使用者、同一 Lexile 區段、目標字集合相同（不分大小寫與順序）；命中後即從池中取出，同一篇不會給兩次
+- 失效：超過 ARTICLE_POOL_TTL 秒、使用者數超過 ARTICLE_POOL_USERS（LRU）、
+  預產文章的目標字有異動（signals）
+- 排程：產文請求與活躍使用者的單字異動都會排程預產，延遲 ARTICLE_POOL_DELAY 秒合併連續的觸發
+  （例如連續複習多個單字只預產一次）；只有 ARTICLE_POOL_ACTIVE 秒內產過文的使用者才會預產
+
+ARTICLE_POOL=0 關閉（不預產、不命中）。池存在各行程記憶體中，與 due_queue 相同。
+"""
+import logging
+import os
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+
+import llm
+from lexile import approximate_lexile
+from metrics import register_collector, span
+from signals import word_saved, word_deleted
+from storage import word_store
+
+POOL_ENABLED = os.getenv("ARTICLE_POOL", "1") == "1"
+MAX_USERS = int(os.getenv("ARTICLE_POOL_USERS", "1000"))
+TTL_SECONDS = int(os.getenv("ARTICLE_POOL_TTL", "3600"))
+ACTIVE_SECONDS = int(os.getenv("ARTICLE_POOL_ACTIVE", "7200"))
+REFILL_DELAY = float(os.getenv("ARTICLE_POOL_DELAY", "10"))
+LEXILE_BAND = int(os.getenv("LEXILE_BAND", "100"))
+LEXILE_TOLERANCE = int(os.getenv("LEXILE_TOLERANCE", "150"))
+TARGET_WORD_COUNT = 5
+RECENT_TARGETS = 5
+
+log = logging.getLogger(__name__)
+
+
+def _word_key(words) -> frozenset:
+    return frozenset(w.strip().lower() for w in words)
+
+
+def _generate(lexile_target, target_words):
+    """預設的產文方式：與 POST /articles 相同的 prompt，走低優先的 article_prefetch site"""
+    from articles.routes import article_messages
+    return llm.complete("article_prefetch", article_messages(lexile_target, target_words)).strip()
+
+
+class ArticlePool:
+    def __init__(self, enabled=POOL_ENABLED, max_users=MAX_USERS, ttl=TTL_SECONDS, active=ACTIVE_SECONDS,
+                 delay=REFILL_DELAY, band_width=LEXILE_BAND, tolerance=LEXILE_TOLERANCE,
+                 store=None, generate=None):
+        self.enabled = enabled
+        self.max_users = max_users
+        self.ttl = ttl
+        self.active = active
+        self.delay = delay
+        self.band_width = band_width
+        self.tolerance = tolerance
+        self._store = store or word_store
+        self._generate = generate or _generate
+        self._ready = OrderedDict()     # user_id -> {band: 預產文章}
+        self._recent = OrderedDict()    # user_id -> (最近的 lexileTarget, 最後產文時間)
+        self._pending = {}              # user_id -> 可開始預產的 time.monotonic()
+        self._cond = threading.Condition()
+        self._thread = None
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self.discarded = 0
+
+    def band(self, lexile) -> int:
+        return int(lexile // self.band_width)
+
+    # ---- 請求端 ----
+
+    def take(self, user_id, lexile_target, target_words):
+        """命中時取出並回傳 {"article", "lexileActual"}，否則回傳 None"""
+        if not self.enabled:
+            return None
+        key = _word_key(target_words)
+        with self._cond:
+            entries = self._ready.get(user_id) or {}
+            band = self.band(lexile_target)
+            entry = entries.get(band)
+            if entry is not None and time.monotonic() - entry["createdAt"] > self.ttl:
+                del entries[band]
+                entry = None
+            if entry is None or entry["words"] != key:
+                self.misses += 1
+                return None
+            del entries[band]
+            self.hits += 1
+        return {"article": entry["article"], "lexileActual": entry["lexileActual"]}
+
+    def note_request(self, user_id, lexile_target):
+        """記錄使用者的產文難度並排程預產下一篇"""
+        if not self.enabled:
+            return
+        with self._cond:
+            targets = self._recent.pop(user_id, (deque(maxlen=RECENT_TARGETS), 0))[0]
+            targets.append(lexile_target)
+            self._recent[user_id] = (targets, time.monotonic())
+            while len(self._recent) > self.max_users:
+                self._recent.popitem(last=False)
+        self.schedule(user_id)
+
+    # ---- 預產 ----
+
+    def _usual_target(self, user_id):
+        """最近最常用區段中最近一次的 lexileTarget；非活躍使用者回傳 None"""
+        with self._cond:
+            recent = self._recent.get(user_id)
+        if recent is None or time.monotonic() - recent[1] > self.active:
+            return None
+        targets = list(recent[0])
+        band = Counter(self.band(t) for t in targets).most_common(1)[0][0]
+        return next(t for t in reversed(targets) if self.band(t) == band)
+
+    def refill(self, user_id) -> bool:
+        """預測下一組目標字並預產文章；實際放入池中時回傳 True"""
+        lexile_target = self._usual_target(user_id)
+        if lexile_target is None:
+            return False
+        target_words = [word_id for word_id, _ in self._store.by_due(user_id, TARGET_WORD_COUNT)]
+        if not target_words:
+            return False
+
+        band = self.band(lexile_target)
+        key = _word_key(target_words)
+        with self._cond:
+            entry = (self._ready.get(user_id) or {}).get(band)
+            if entry is not None and entry["words"] == key and time.monotonic() - entry["createdAt"] <= self.ttl:
+                return False
+
+        article = self._generate(lexile_target, target_words)
+        with span("readability", "approximate_lexile"):
+            lexile_actual = approximate_lexile(article)
+        if abs(lexile_actual - lexile_target) > self.tolerance:
+            self.discarded += 1
+            return False
+
+        with self._cond:
+            self._ready.setdefault(user_id, {})[band] = {
+                "words": key,
+                "article": article,
+                "lexileActual": lexile_actual,
+                "createdAt": time.monotonic(),
+            }
+            self._ready.move_to_end(user_id)
+            while len(self._ready) > self.max_users:
+                self._ready.popitem(last=False)
+            self.generated += 1
+        return True
+
+    def schedule(self, user_id, delay=None):
+        if not self.enabled:
+            return
+        with self._cond:
+            self._pending[user_id] = time.monotonic() + (self.delay if delay is None else delay)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._worker, name="article-pool", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _next_user(self):
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                ready = [u for u, at in self._pending.items() if at <= now]
+                if ready:
+                    user_id = min(ready, key=self._pending.get)
+                    del self._pending[user_id]
+                    return user_id
+                timeout = min(self._pending.values()) - now if self._pending else None
+                self._cond.wait(timeout)
+
+    def _worker(self):
+        while True:
+            user_id = self._next_user()
+            try:
+                self.refill(user_id)
+            except llm.LLMBusy:
+                continue
+            except Exception:
+                log.exception("article pre-generation failed for %s", user_id)
+
+    # ---- 單字異動 ----
+
+    def word_changed(self, user_id, word_id):
+        """目標字有異動的預產文章移除；活躍使用者重新排程（下一組到期單字可能改變）"""
+        if not self.enabled:
+            return
+        word = word_id.strip().lower()
+        with self._cond:
+            entries = self._ready.get(user_id)
+            if entries:
+                for band in [b for b, e in entries.items() if word in e["words"]]:
+                    del entries[band]
+            recent = self._recent.get(user_id)
+            active = recent is not None and time.monotonic() - recent[1] <= self.active
+        if active:
+            self.schedule(user_id)
+
+    def clear(self):
+        with self._cond:
+            self._ready.clear()
+            self._recent.clear()
+            self._pending.clear()
+
+    def stats(self) -> dict:
+        with self._cond:
+            ready = sum(len(e) for e in self._ready.values())
+            return {"ready": ready, "pending": len(self._pending), "hits": self.hits, "misses": self.misses,
+                    "generated": self.generated, "discarded": self.discarded}
+
+
+article_pool = ArticlePool()
+
+
+@word_saved.connect
+def _on_word_saved(user_id, word_id, **_):
+    article_pool.word_changed(user_id, word_id)
+
+
+@word_deleted.connect
+def _on_word_deleted(user_id, word_id, **_):
+    article_pool.word_changed(user_id, word_id)
+
+
+@register_collector
+def _pool_samples():
+    stats = article_pool.stats()
+    labels = {"cache": "article_pool"}
+    return [
+        ("cache_entries", "Entries held by in-process caches", labels, stats["ready"]),
+        ("cache_hits", "In-process cache hits since start", labels, stats["hits"]),
+        ("cache_misses", "In-process cache misses since start", labels, stats["misses"]),
+        ("article_pool_generated", "Articles pre-generated since start", None, stats["generated"]),
+        ("article_pool_discarded", "Pre-generated articles discarded for missing the Lexile band", None,
+         stats["discarded"]),
+    ]
@@ -1,106 +1,270 @@
 # backend/articles/routes.py
-import os
-from flask import Blueprint, request, jsonify, g
+import re
+import json
+from flask import Blueprint, request, jsonify, g, Response, stream_with_context, current_app
 from datetime import datetime
-from firebase_admin import firestore
-import openai
+import llm
+from llm import LLMBusy
 from lexile import approximate_lexile as lexile_score
+from wordmatch import WordMatcher
+from pagination import parse_page_args
+from storage import word_store, article_store
+from definitions import normalize_word
 from auth.utils import auth_required
-from sm2 import due_date_from_interval
+from sm2 import due_date_from_interval, user_params
+from signals import word_saved
+from metrics import span
+from article_pool import article_pool
+from vocabulary import vocabulary
+from article_cache import (article_cache, ArticlePayload, article_etag, payload_etag, matching_etag,
+                           content_hash, VALIDATOR_FIELDS)
+from compression import choose_encoding, encode_response, MIN_BYTES as COMPRESS_MIN_BYTES
 
 # 建立 Blueprint 並設定路徑前綴
 bp = Blueprint('articles', __name__, url_prefix='/articles')
-db = firestore.client()
-openai.api_key = os.getenv("OPENAI_API_KEY")
+
+# 文章列表預設回傳的摘要欄位（不含 article 內文與 wordOffsets）
+ARTICLE_SUMMARY_FIELDS = ["createdAt", "lexileTarget", "lexileActual", "targetWords", "wordCounts", "preview"]
+PREVIEW_LENGTH = 80
+NO_TARGET_WORDS = "無法自動選取單字，請手動輸入至少一個單字"
 
 @bp.route('', methods=['POST'])
 @auth_required
 def create_article():
     """
     建立新文章：
-    - 使用 GPT 產文，包含指定單字
+    - 預產池（article_pool）有相同難度區段與單字的文章時直接使用，否則以 GPT 產文，包含指定單字
     - 計算 Lexile 難度
     - 儲存於 Firestore，附帶分析資訊
     """
     user_id = g.user['sub']
     data = request.get_json(force=True)
 
-    lexileTarget = data.get("lexileTarget")
-    targetWords = data.get("targetWords")
+    lexileTarget, targetWords, error = _parse_article_request(user_id, data)
+    if error:
+        return error
 
-    # 驗證欄位
-    if not isinstance(lexileTarget, int):
-        return jsonify(error="Invalid lexileTarget"), 400
+    pooled = article_pool.take(user_id, lexileTarget, targetWords)
+    article_pool.note_request(user_id, lexileTarget)
+    if pooled:
+        result = _analyze_and_store(user_id, lexileTarget, targetWords, pooled["article"], pooled["lexileActual"])
+        return jsonify({**result, "article": pooled["article"]}), 201
+
+    try:
+        article_text = llm.complete("article", article_messages(lexileTarget, targetWords)).strip()
+    except LLMBusy as e:
+        resp = jsonify(error="server busy, please retry")
+        resp.headers["Retry-After"] = str(e.retry_after)
+        return resp, 503
+    except Exception as e:
+        return jsonify(error="GPT generation failed", detail=str(e)), 500
+
+    result = _analyze_and_store(user_id, lexileTarget, targetWords, article_text)
+    return jsonify({**result, "article": article_text}), 201
+
+@bp.route('/stream', methods=['POST'])
+@auth_required
+def create_article_stream():
+    """
+    串流版建立文章（Server-Sent Events）：
+    - event: token  → GPT 產生的文字片段，逐段轉發（預產池命中時整篇一次送出）
+    - event: done   → 產文結束後計算 Lexile、統計單字並儲存，回傳 id 與分析結果
+    - event: error  → 產文、分析或儲存失敗（GPT 忙碌時帶 retryAfter 秒數）
+    請求格式與 POST /articles 相同。
+    """
+    user_id = g.user['sub']
+    data = request.get_json(force=True)
+
+    lexileTarget, targetWords, error = _parse_article_request(user_id, data)
+    if error:
+        return error
+
+    pooled = article_pool.take(user_id, lexileTarget, targetWords)
+    article_pool.note_request(user_id, lexileTarget)
+
+    def generate():
+        lexileActual = None
+        try:
+            if pooled:
+                article_text, lexileActual = pooled["article"], pooled["lexileActual"]
+                yield _sse("token", {"text": article_text})
+            else:
+                chunks = []
+                for delta in llm.stream("article", article_messages(lexileTarget, targetWords)):
+                    chunks.append(delta)
+                    yield _sse("token", {"text": delta})
+                article_text = "".join(chunks).strip()
+        except LLMBusy as e:
+            yield _sse("error", {"error": "server busy, please retry", "retryAfter": e.retry_after})
+            return
+        except Exception as e:
+            yield _sse("error", {"error": "GPT generation failed", "detail": str(e)})
+            return
+
+        # 內文已送出，分析或儲存失敗也要以 error 事件結束，前端才不會一直等 done
+        try:
+            result = _analyze_and_store(user_id, lexileTarget, targetWords, article_text, lexileActual)
+        except Exception as e:
+            yield _sse("error", {"error": "failed to save article", "detail": str(e)})
+            return
+        yield _sse("done", result)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _parse_article_request(user_id, data):
+    """驗證產文參數，未給 targetWords 時從使用者字典自動挑選；回傳 (lexileTarget, targetWords, error)"""
+    lexileTarget, targetWords, message = validate_article_request(data)
+    if message:
+        return None, None, (jsonify(error=message), 400)
 
     # 若未給 targetWords，則從使用者字典中自動挑選
     if not targetWords:
-        docs = db.collection("words")\
-                .where("userId", "==", user_id)\
-                .order_by("dueDate")\
-                .limit(5).stream()
-        targetWords = [doc.id for doc in docs]
+        targetWords = [word_id for word_id, _ in word_store.by_due(user_id, 5)]
 
     if not targetWords:
-        return jsonify(error="無法自動選取單字，請手動輸入至少一個單字"), 400
+        return None, None, (jsonify(error=NO_TARGET_WORDS), 400)
+
+    return lexileTarget, targetWords, None
 
+def validate_article_request(data):
+    """檢查產文參數格式（同步與 async 端點共用），回傳 (lexileTarget, targetWords, error message)"""
+    lexileTarget = data.get("lexileTarget")
+    targetWords = data.get("targetWords")
 
-    # 組 prompt
-    prompt = (
+    # 驗證欄位
+    if not isinstance(lexileTarget, int):
+        return None, None, "Invalid lexileTarget"
+    return lexileTarget, targetWords, None
+
+def article_prompt(lexileTarget, targetWords):
+    return (
         f"Write a short, engaging English story around Lexile level {lexileTarget}. "
         f"Make sure to include these words: {', '.join(targetWords)}. "
         f"Keep it readable for learners, about 150-300 words long."
     )
 
-    try:
-        resp = openai.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=400
-        )
-        article_text = resp.choices[0].message.content.strip()
-    except Exception as e:
-        return jsonify(error="GPT generation failed", detail=str(e)), 500
+def article_messages(lexileTarget, targetWords):
+    return [{"role": "user", "content": article_prompt(lexileTarget, targetWords)}]
+
+def _analyze_and_store(user_id, lexileTarget, targetWords, article_text, lexileActual=None):
+    """計算 Lexile 與單字出現次數並寫入儲存層，回傳不含內文的分析結果"""
+    doc = article_document(user_id, lexileTarget, targetWords, article_text, lexileActual)
+    return article_result(article_store.add(doc), doc)
 
+def article_document(user_id, lexileTarget, targetWords, article_text, lexileActual=None):
+    """計算 Lexile 與 targetWords 出現次數，組成要寫入 Firestore 的文章文件（lexileActual 已評分時沿用）"""
     # 計算 Lexile
-    lexileActual = lexile_score(article_text)
+    if lexileActual is None:
+        with span("readability", "approximate_lexile"):
+            lexileActual = lexile_score(article_text)
 
-    # 統計 targetWords 出現次數
-    counts = {w.lower(): article_text.lower().count(w.lower()) for w in targetWords}
+    # 統計 targetWords 出現次數與位置（以單字為單位，含詞形變化）
+    with span("readability", "word_match"):
+        matched = WordMatcher(targetWords, fold_inflections=True).match(article_text)
 
-    doc_ref = db.collection("articles").document()
-    doc_ref.set({
+    return {
         "userId": user_id,
         "createdAt": datetime.utcnow(),
         "lexileTarget": lexileTarget,
         "lexileActual": lexileActual,
         "targetWords": targetWords,
-        "wordCounts": counts,
-        "article": article_text
-    })
-
-    return jsonify({
-        "id": doc_ref.id,
+        "wordCounts": matched["counts"],
+        "wordOffsets": matched["offsets"],
+        "preview": _article_preview(article_text, targetWords),
         "article": article_text,
-        "lexileTarget": lexileTarget,
-        "lexileActual": lexileActual,
-        "wordCounts": counts
-    }), 201
-    
+        "contentHash": content_hash(article_text)
+    }
+
+def article_result(article_id, doc):
+    """建立文章後回傳給前端的分析結果（不含內文）"""
+    return {
+        "id": article_id,
+        "lexileTarget": doc["lexileTarget"],
+        "lexileActual": doc["lexileActual"],
+        "wordCounts": doc["wordCounts"],
+        "wordOffsets": doc["wordOffsets"]
+    }
+
+def _article_preview(article_text, targetWords):
+    """列表用摘要：第一個包含目標單字的句子，沒有則取第一句"""
+    sentences = re.split(r"(?<=[.?!])\s+", article_text)
+    lowered = [w.lower() for w in targetWords]
+    matched = next((s for s in sentences if any(w in s.lower() for w in lowered)), None)
+    return (matched or sentences[0] or "")[:PREVIEW_LENGTH]
+
+def _sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
 @bp.route('/<article_id>', methods=['GET'])
 @auth_required
 def get_article(article_id):
     """
     取得單篇文章詳情，僅限該使用者自己的文章
+    - 回應帶強 ETag；If-None-Match 相符時回 304，只讀 userId / contentHash / updatedAt 三個欄位
+    - 序列化（與壓縮）後的內容放在行程內 LRU，見 article_cache.py
     """
     user_id = g.user['sub']
-    doc_ref = db.collection("articles").document(article_id)
-    doc = doc_ref.get()
-    if not doc.exists or doc.to_dict().get("userId") != user_id:
+    meta = article_store.get(article_id, fields=VALIDATOR_FIELDS)
+    if meta is None or meta.get("userId") != user_id:
         return jsonify(error="Article not found or unauthorized"), 404
 
-    data = doc.to_dict()
-    data["id"] = doc.id
-    return jsonify(data), 200
+    etag = article_etag(meta)
+    if etag is not None:
+        matched = matching_etag(request.if_none_match, etag)
+        if matched:
+            return _not_modified(matched)
+    payload = article_cache.get(article_id, etag) if etag is not None else None
+
+    if payload is None:
+        data = article_store.get(article_id)
+        if data is None or data.get("userId") != user_id:
+            return jsonify(error="Article not found or unauthorized"), 404
+        data["id"] = article_id
+        body = current_app.json.dumps(data).encode()
+        etag = article_etag(data)
+        if etag is not None:
+            payload = article_cache.put(article_id, etag, body)
+        else:
+            # 沒有 contentHash 的舊文章：以內容雜湊當 ETag，不放入快取
+            payload = ArticlePayload(payload_etag(body), body)
+            matched = matching_etag(request.if_none_match, payload.etag)
+            if matched:
+                return _not_modified(matched)
+
+    resp = current_app.response_class(payload.body, mimetype="application/json")
+    resp.headers["ETag"] = payload.etag
+    resp.headers["Cache-Control"] = "private, no-cache"
+    if len(payload.body) >= COMPRESS_MIN_BYTES:
+        encoding = choose_encoding(request.accept_encodings)
+        encode_response(resp, encoding, payload.encoded(encoding) if encoding else None)
+    return resp
+
+def _not_modified(etag):
+    resp = current_app.response_class(status=304)
+    resp.headers["ETag"] = etag
+    resp.headers["Cache-Control"] = "private, no-cache"
+    resp.vary.add("Accept-Encoding")
+    return resp
+
+@bp.route('/<article_id>/coverage', methods=['GET'])
+@auth_required
+def article_coverage(article_id):
+    """
+    文章對該使用者的字彙覆蓋率：不在使用者單字本（且不在易字表）中的單字清單與密度，
+    用來判斷這篇文章對學習者是否真的讀得懂
+    """
+    user_id = g.user['sub']
+    data = article_store.get(article_id)
+    if data is None or data.get("userId") != user_id:
+        return jsonify(error="Article not found or unauthorized"), 404
+
+    with span("readability", "coverage"):
+        result = vocabulary.coverage(user_id, data.get("article") or "")
+    return jsonify({"id": article_id, **result}), 200
 
 @bp.route('/<article_id>', methods=['PUT'])
 @auth_required
@@ -109,9 +273,8 @@ def update_article(article_id):
     更新文章的 lexileTarget 或 targetWords（只限本人）
     """
     user_id = g.user['sub']
-    doc_ref = db.collection("articles").document(article_id)
-    doc = doc_ref.get()
-    if not doc.exists or doc.to_dict().get("userId") != user_id:
+    article = article_store.get(article_id)
+    if article is None or article.get("userId") != user_id:
         return jsonify(error="Article not found or unauthorized"), 404
 
     data = request.get_json(force=True)
@@ -123,7 +286,8 @@ def update_article(article_id):
     if not update_fields:
         return jsonify(error="No fields to update"), 400
 
-    doc_ref.update(update_fields)
+    article_store.update(article_id, update_fields)
+    article_cache.discard(article_id)
     return jsonify(message="article updated"), 200
 
 @bp.route('/<article_id>', methods=['DELETE'])
@@ -133,48 +297,56 @@ def delete_article(article_id):
     刪除指定文章（只限本人）
     """
     user_id = g.user['sub']
-    doc_ref = db.collection("articles").document(article_id)
-    doc = doc_ref.get()
-    if not doc.exists or doc.to_dict().get("userId") != user_id:
+    article = article_store.get(article_id)
+    if article is None or article.get("userId") != user_id:
         return jsonify(error="Article not found or unauthorized"), 404
 
-    doc_ref.delete()
+    article_store.delete(article_id)
+    article_cache.discard(article_id)
     return '', 204
 @bp.route('', methods=['GET'])
 @auth_required
 def list_articles():
     """
-    列出所有使用者自己的文章，包含目標與實際難度
+    分頁列出使用者自己的文章（依 createdAt 降冪），包含目標與實際難度。
+    預設只回傳摘要欄位（不含內文），需要內文時帶 ?fields=* 或指定 fields。
+    query param: ?limit=100&cursor=...&fields=...
     """
     user_id = g.user['sub']
-    docs = (db.collection("articles")
-              .where("userId", "==", user_id)
-              .order_by("createdAt", direction=firestore.Query.DESCENDING)
-              .stream())
-    articles = [
-        {**doc.to_dict(), "id": doc.id}
-        for doc in docs
-    ]
-    return jsonify(articles=articles), 200
+    try:
+        limit, cursor, fields = parse_page_args(request.args, default_fields=ARTICLE_SUMMARY_FIELDS)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+
+    articles, next_cursor = article_store.page(user_id, limit, cursor, fields, descending=True)
+    return jsonify(articles=articles, nextCursor=next_cursor), 200
 
 @bp.route('/<article_id>/mark_unknown', methods=['POST'])
 @auth_required
 def mark_unknown_word(article_id):
     user_id = g.user['sub']
     data = request.get_json(force=True)
-    word = data.get("word", "").strip().lower()
+    word = normalize_word(data.get("word") or "")
 
     if not word:
         return jsonify(error="Missing word"), 400
 
-    doc_ref = db.collection("words").document(f"{user_id}_{word}")
-    doc_ref.set({
+    # 單字本已有這個字（例如先前 POST /words 查過）時只重設排程，保留翻譯與解釋
+    if word_store.get(user_id, word) is not None:
+        fields = {"lastInterval": 0, "dueDate": due_date_from_interval(0)}
+        word_store.update(user_id, word, fields)
+        word_saved.send(user_id, word_id=word, fields=fields)
+        return jsonify(message="Word marked as unknown and saved"), 200
+
+    new_doc = {
         "userId": user_id,
         "word": word,
         "lastInterval": 0,
-        "easeFactor": 2.5,
+        "easeFactor": user_params(g.user_ctx.get("sm2Params"))["initialEase"],
         "dueDate": due_date_from_interval(0),
         "createdAt": datetime.utcnow()
-    })
+    }
+    word_store.set(user_id, word, new_doc)
+    word_saved.send(user_id, word_id=word, fields=new_doc, created=True)
 
     return jsonify(message="Word marked as unknown and saved"), 200
\ No newline at end of file
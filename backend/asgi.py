@@ -0,0 +1,239 @@
+# backend/asgi.py
+"""
+Async 服務模式（ASGI 入口）：
+    uvicorn asgi:app --workers 2
+
+- POST /articles、POST /words、GET /words/quiz 以原生 async 處理，GPT 經 llm.acomplete
+  （AsyncOpenAI，與同步端點相同的 site 設定、並行上限、期限與重試），儲存層使用
+  Firestore AsyncClient（內嵌儲存後端則在執行緒中存取）；等待 GPT 時不佔用執行緒
+- POST /articles 與同步端點一樣先查文章預產池（article_pool.py）
+- 其他路由透過 asgiref 的 WsgiToAsgi 交給原本的 Flask app，行為與同步模式相同
+- 驗證、prompt、解析、Lexile 分析與文件格式都沿用 blueprint 內的共用函式，兩種模式結果一致
+
+同步模式（gunicorn app:app）不受影響；並行量比較見 benchmarks/bench_async.py。
+"""
+import asyncio
+import json
+import random
+import time
+
+from asgiref.wsgi import WsgiToAsgi
+
+from app import app as flask_app
+from auth.utils import decode_bearer, user_doc
+from articles.routes import (validate_article_request, article_messages, article_document,
+                             article_result, NO_TARGET_WORDS)
+from words.routes import (remark_fields, new_word_document, definition_messages, parse_definition,
+                          build_quiz_questions, quiz_batch_messages, quiz_sentence_messages,
+                          parse_quiz_sentences, QUIZ_MAX_WORKERS, REMARK_QUALITY)
+from definitions import definition_cache
+from signals import word_saved
+from sm2 import user_params
+import review_log
+from storage import async_stores
+from llm import acomplete, LLMBusy
+from article_pool import article_pool
+from distractors import distractor_index
+from metrics import begin_spans, end_spans, observe_request
+
+wsgi_app = WsgiToAsgi(flask_app)
+
+_stores = None
+
+
+def _clients():
+    """async 儲存層需在 event loop 內建立，第一次請求時才初始化"""
+    global _stores
+    if _stores is None:
+        _stores = async_stores()
+    return _stores
+
+
+async def create_article(user_id, data):
+    """async 版 POST /articles"""
+    lexileTarget, targetWords, message = validate_article_request(data)
+    if message:
+        return {"error": message}, 400
+
+    words, articles = _clients()
+    if not targetWords:
+        targetWords = [word_id for word_id, _ in await words.by_due(user_id, 5)]
+    if not targetWords:
+        return {"error": NO_TARGET_WORDS}, 400
+
+    pooled = article_pool.take(user_id, lexileTarget, targetWords)
+    article_pool.note_request(user_id, lexileTarget)
+    if pooled:
+        article_text, lexileActual = pooled["article"], pooled["lexileActual"]
+    else:
+        try:
+            article_text = (await acomplete("article", article_messages(lexileTarget, targetWords))).strip()
+        except LLMBusy as e:
+            return _busy(e)
+        except Exception as e:
+            return {"error": "GPT generation failed", "detail": str(e)}, 500
+        lexileActual = None
+
+    doc = article_document(user_id, lexileTarget, targetWords, article_text, lexileActual)
+    article_id = await articles.add(doc)
+    return {**article_result(article_id, doc), "article": article_text}, 201
+
+
+async def create_or_mark_word(user_id, data):
+    """async 版 POST /words"""
+    word = data.get("word")
+    if not word:
+        return {"error": "word is required"}, 400
+
+    words, _ = _clients()
+    word_data, profile = await asyncio.gather(words.get(user_id, word), asyncio.to_thread(user_doc, user_id))
+    params = user_params(profile.get("sm2Params"))
+
+    if word_data is not None:
+        fields = remark_fields(word_data, params)
+        await words.update(user_id, word, fields)
+        word_saved.send(user_id, word_id=word, fields=fields)
+        events = [review_log.review_event(word, REMARK_QUALITY, word_data, fields)]
+        await asyncio.to_thread(review_log.record, user_id, events)
+        return {
+            "word": word,
+            "short": word_data.get("short", "無翻譯"),
+            "full": word_data.get("full", "無解釋"),
+            "existed": True
+        }, 200
+
+    # 定義快取的持久層是同步 Firestore 呼叫，交給執行緒避免卡住 event loop
+    cached = await asyncio.to_thread(definition_cache.get, word)
+    if cached:
+        short, full = cached["short"], cached["full"]
+    else:
+        try:
+            short, full = parse_definition(await acomplete("definition", definition_messages(word)))
+            await asyncio.to_thread(definition_cache.put, word, short, full)
+        except LLMBusy as e:
+            return _busy(e)
+        except Exception as e:
+            short = "翻譯失敗"
+            full = str(e)
+
+    new_doc = new_word_document(user_id, short, full, params["initialEase"])
+    await words.set(user_id, word, new_doc)
+    word_saved.send(user_id, word_id=word, fields=new_doc, created=True)
+    return {"word": word, "short": short, "full": full, "existed": False}, 201
+
+
+async def generate_quiz(user_id, data):
+    """async 版 GET /words/quiz"""
+    index = await asyncio.to_thread(distractor_index.get, user_id)
+    word_list = index.words()
+    if len(word_list) < 4:
+        return {"error": "需要至少 4 個單字才能生成測驗"}, 400
+
+    selected_words = random.sample(word_list, min(10, len(word_list)))
+    sentences = {}
+    try:
+        content = await acomplete("quiz_batch", quiz_batch_messages(selected_words),
+                                  response_format={"type": "json_object"}, max_tokens=80 * len(selected_words))
+        sentences = parse_quiz_sentences(content, selected_words)
+    except LLMBusy as e:
+        return _busy(e)
+    except Exception:
+        pass
+
+    missing = [w for w in selected_words if w not in sentences]
+    if missing:
+        limit = asyncio.Semaphore(QUIZ_MAX_WORKERS)
+
+        async def one(word):
+            async with limit:
+                return (await acomplete("quiz_sentence", quiz_sentence_messages(word))).strip()
+
+        results = await asyncio.gather(*(one(w) for w in missing), return_exceptions=True)
+        for word, result in zip(missing, results):
+            if isinstance(result, str):
+                sentences[word] = result
+
+    questions = build_quiz_questions(selected_words, sentences, word_list, index)
+    if not questions:
+        return {"error": "GPT generation failed"}, 502
+    return {"questions": questions}, 200
+
+
+def _busy(e):
+    """GPT 名額已滿或限流冷卻中"""
+    return {"error": "server busy, please retry"}, 503, {"retry-after": str(e.retry_after)}
+
+
+ASYNC_ROUTES = {
+    ("POST", "/articles"): create_article,
+    ("POST", "/words"): create_or_mark_word,
+    ("GET", "/words/quiz"): generate_quiz,
+}
+
+
+async def _send_json(send, payload, status, headers=None):
+    body = json.dumps(payload, ensure_ascii=False, default=str).encode()
+    extra = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in (headers or {}).items()]
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()), *extra]
+    })
+    await send({"type": "http.response.body", "body": body})
+    return status
+
+
+async def _dispatch(handler, scope, receive, send):
+    """async 路由的計時與 span 收集（與 Flask 端的 metrics middleware 相同指標）"""
+    start = time.perf_counter()
+    spans, token = begin_spans()
+    status = 500
+    try:
+        status = await _handle(handler, scope, receive, send)
+    finally:
+        end_spans(token)
+        path = scope["path"].rstrip("/")
+        observe_request(scope["method"], path, status, time.perf_counter() - start, spans, path)
+
+
+async def _handle(handler, scope, receive, send):
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+
+    headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+    payload, error = decode_bearer(headers.get("authorization", ""))
+    if error:
+        return await _send_json(send, {"error": error}, 401)
+
+    body = b"".join(chunks)
+    try:
+        data = json.loads(body) if body else {}
+    except ValueError:
+        return await _send_json(send, {"error": "Invalid JSON"}, 400)
+    if not isinstance(data, dict):
+        return await _send_json(send, {"error": "Invalid JSON"}, 400)
+
+    result = await handler(payload["sub"], data)
+    return await _send_json(send, *result)
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    if scope["type"] == "http":
+        handler = ASYNC_ROUTES.get((scope["method"], scope["path"].rstrip("/")))
+        if handler is not None:
+            return await _dispatch(handler, scope, receive, send)
+    await wsgi_app(scope, receive, send)
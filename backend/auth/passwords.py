@@ -0,0 +1,62 @@
+# backend/auth/passwords.py
+"""
+bcrypt 雜湊放到有上限的專用執行緒池：
+- bcrypt 計算期間會釋放 GIL，執行緒即可平行運算；池的大小決定最多佔用幾顆 CPU
+- 等待中的工作數也有上限（back-pressure），滿了直接拋 HasherBusy，
+  讓登入尖峰回 503 而不是佔滿所有 request 執行緒、拖慢 /pick_words 等端點
+  （建議 PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE 小於伺服器的執行緒數）
+- cost 由 BCRYPT_ROUNDS 設定；既有雜湊的 cost 不同時，登入成功後透明重算
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+import bcrypt
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "6"))
+HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "5"))
+
+
+class HasherBusy(Exception):
+    """雜湊池已滿或等待逾時"""
+
+
+class PasswordHasher:
+    def __init__(self, rounds=BCRYPT_ROUNDS, workers=HASH_WORKERS, queue=HASH_QUEUE, timeout=HASH_TIMEOUT):
+        self.rounds = rounds
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(workers + queue)
+        self.rejected = 0
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HasherBusy()
+        future = self._pool.submit(fn, *args)
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            raise HasherBusy()
+
+    def hash(self, password: str) -> str:
+        salt = bcrypt.gensalt(rounds=self.rounds)
+        return self._run(bcrypt.hashpw, password.encode(), salt).decode()
+
+    def verify(self, password: str, pw_hash: str) -> bool:
+        return self._run(bcrypt.checkpw, password.encode(), pw_hash.encode())
+
+    def needs_rehash(self, pw_hash: str) -> bool:
+        """雜湊格式為 $2b$<cost>$...，cost 與目前設定不同即需重算"""
+        try:
+            return int(pw_hash.split("$")[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+hasher = PasswordHasher()
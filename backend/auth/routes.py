@@ -1,13 +1,13 @@
 # backend/auth/routes.py
 import os
-import jwt, bcrypt
+import jwt
 from datetime import datetime, timedelta
 from flask import Blueprint, request, jsonify, g
-from firebase_admin import firestore
-from auth.utils import auth_required
+from storage import user_store
+from auth.utils import auth_required, revoke_token, revoke_user, invalidate_user_ctx
+from auth.passwords import hasher, HasherBusy
 
 bp = Blueprint("auth", __name__, url_prefix="/auth")
-db = firestore.client()
 SECRET_KEY = os.getenv("JWT_SECRET", "replace-with-your-secret")
 
 @bp.route("/signup", methods=["POST"])
@@ -18,12 +18,16 @@ def signup():
     if not email or not pwd:
         return jsonify(error="email and password required"), 400
 
-    pw_hash = bcrypt.hashpw(pwd.encode(), bcrypt.gensalt()).decode()
-    db.collection("users").document(email).set({
+    try:
+        pw_hash = hasher.hash(pwd)
+    except HasherBusy:
+        return _busy()
+    user_store.set(email, {
         "email": email,
         "passwordHash": pw_hash,
         "createdAt": datetime.utcnow()
     })
+    invalidate_user_ctx(email)
     return jsonify(message="signup success"), 201
 
 @bp.route("/login", methods=["POST"])
@@ -34,20 +38,78 @@ def login():
     if not email or not pwd:
         return jsonify(error="email and password required"), 400
 
-    doc = db.collection("users").document(email).get()
-    if not doc.exists:
-        return jsonify(error="invalid credentials"), 401
-    user = doc.to_dict()
-    if not bcrypt.checkpw(pwd.encode(), user["passwordHash"].encode()):
+    user = user_store.get(email)
+    if user is None:
         return jsonify(error="invalid credentials"), 401
+    try:
+        if not hasher.verify(pwd, user["passwordHash"]):
+            return jsonify(error="invalid credentials"), 401
+    except HasherBusy:
+        return _busy()
+    # BCRYPT_ROUNDS 調整後，登入成功時以新 cost 重算雜湊；雜湊池已滿時略過，下次登入再重算
+    if hasher.needs_rehash(user["passwordHash"]):
+        try:
+            user_store.update(email, {"passwordHash": hasher.hash(pwd)})
+            invalidate_user_ctx(email)
+        except HasherBusy:
+            pass
+
+    return jsonify(token=_issue_token(email)), 200
 
-    token = jwt.encode({
+def _issue_token(email):
+    now = datetime.utcnow()
+    return jwt.encode({
         "sub": email,
-        "exp": datetime.utcnow() + timedelta(hours=2)
+        "iat": now,
+        "exp": now + timedelta(hours=2)
     }, SECRET_KEY, algorithm="HS256")
-    return jsonify(token=token), 200
+
+def _busy():
+    """雜湊池已滿：請用戶端稍後重試"""
+    resp = jsonify(error="server busy, please retry")
+    resp.headers["Retry-After"] = "1"
+    return resp, 503
 
 @bp.route("/me", methods=["GET"])
 @auth_required
 def me():
-    return jsonify(email=g.user["sub"]), 200
\ No newline at end of file
+    return jsonify(email=g.user["sub"]), 200
+
+@bp.route("/password", methods=["POST"])
+@auth_required
+def change_password():
+    """
+    修改密碼：
+    - body: { "oldPassword": "...", "newPassword": "..." }
+    - 成功回傳 { token }：新的 token；此前簽發給該使用者的 token 一律撤銷
+    - 舊密碼錯誤 401，雜湊池已滿 503（Retry-After）
+    撤銷與 /auth/logout 相同只在處理請求的 worker 生效，其他 worker 仍接受舊 token 直到過期（2 小時）
+    """
+    data = request.get_json(force=True)
+    email = g.user["sub"]
+    old, new = data.get("oldPassword"), data.get("newPassword")
+    if not old or not new:
+        return jsonify(error="oldPassword and newPassword required"), 400
+
+    user = user_store.get(email)
+    if user is None:
+        return jsonify(error="invalid credentials"), 401
+    try:
+        if not hasher.verify(old, user["passwordHash"]):
+            return jsonify(error="invalid credentials"), 401
+        user_store.update(email, {"passwordHash": hasher.hash(new)})
+    except HasherBusy:
+        return _busy()
+    revoke_user(email)
+    return jsonify(token=_issue_token(email)), 200
+
+@bp.route("/logout", methods=["POST"])
+@auth_required
+def logout():
+    """
+    登出：撤銷目前的 token，回傳 { message }。
+    撤銷只在處理這個請求的 worker 生效；多個 worker（gunicorn.conf.py 預設 2 個）時，
+    其他 worker 仍接受這個 token 直到 exp（最多 2 小時），用戶端登出時也應刪除本地保存的 token。
+    """
+    revoke_token(request.headers["Authorization"].split(" ", 1)[1])
+    return jsonify(message="logged out"), 200
@@ -1,24 +1,182 @@
 # backend/auth/utils.py
 import os
+import time
+import hashlib
+import threading
 import jwt
+from collections import OrderedDict
 from flask import request, jsonify, g
 from functools import wraps
 
 SECRET_KEY = os.getenv("JWT_SECRET", "replace-with-your-secret")
 
+# 已驗證 token 快取（key 為 token 的 SHA-256，項目在 token 的 exp 到期）
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+# users/{email} 文件在請求之間共用的秒數
+USER_CTX_TTL = float(os.getenv("USER_CTX_TTL", "30"))
+USER_CTX_CACHE_SIZE = int(os.getenv("USER_CTX_CACHE_SIZE", "5000"))
+
+_lock = threading.Lock()
+_tokens = OrderedDict()        # digest -> payload
+_revoked_tokens = {}           # digest -> exp
+_revoked_users = {}            # sub -> 撤銷時間（整數秒；iat 早於此秒的 token 一律拒絕）
+_user_docs = OrderedDict()     # sub -> (載入時間, 文件內容)
+_stats = {"hits": 0, "misses": 0, "userDocLoads": 0}
+
+
+def _digest(token):
+    return hashlib.sha256(token.encode()).digest()
+
+
+def _is_revoked(digest, payload):
+    if digest in _revoked_tokens:
+        return True
+    revoked_at = _revoked_users.get(payload.get("sub"))
+    # iat 為整數秒：撤銷當下那一秒簽發的 token（例如改密碼後立即核發的新 token）仍有效
+    return revoked_at is not None and payload.get("iat", 0) < revoked_at
+
+
+def decode_bearer(header):
+    """
+    驗證 Authorization header，回傳 (payload, error)；
+    同步（Flask）與 async（asgi.py）路徑共用。
+    驗證過的 token 放入 LRU，之後只需一次雜湊查表與 exp 比對，不再重跑 HMAC 與 claim 驗證。
+    """
+    if not header.startswith("Bearer "):
+        return None, "Missing token"
+    token = header.split(" ", 1)[1]
+    digest = _digest(token)
+    now = time.time()
+
+    with _lock:
+        payload = _tokens.get(digest)
+        if payload is not None:
+            if payload.get("exp", 0) <= now:
+                del _tokens[digest]
+                return None, "Token expired"
+            if _is_revoked(digest, payload):
+                return None, "Token revoked"
+            _tokens.move_to_end(digest)
+            _stats["hits"] += 1
+            return payload, None
+
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
+    except jwt.ExpiredSignatureError:
+        return None, "Token expired"
+    except jwt.InvalidTokenError:
+        return None, "Invalid token"
+
+    with _lock:
+        _stats["misses"] += 1
+        if _is_revoked(digest, payload):
+            return None, "Token revoked"
+        # 沒有 exp 的 token 不快取，每次都完整驗證
+        if "exp" in payload:
+            _tokens[digest] = payload
+            while len(_tokens) > TOKEN_CACHE_SIZE:
+                _tokens.popitem(last=False)
+    return payload, None
+
+
+def revoke_token(token):
+    """撤銷單一 token（例如登出）；記錄保留到 token 本身過期為止"""
+    digest = _digest(token)
+    try:
+        exp = jwt.decode(token, options={"verify_signature": False}).get("exp", time.time())
+    except jwt.InvalidTokenError:
+        exp = time.time()
+    with _lock:
+        _tokens.pop(digest, None)
+        _revoked_tokens[digest] = exp
+        _purge_revocations()
+
+
+def revoke_user(sub):
+    """
+    撤銷某使用者目前所有 token（改密碼見 POST /auth/password），並清除其 user context 快取。
+    與 revoke_token 相同只在本行程生效，其他 worker 仍接受舊 token 直到 exp。
+    """
+    with _lock:
+        _revoked_users[sub] = int(time.time())
+        _user_docs.pop(sub, None)
+        for digest in [d for d, p in _tokens.items() if p.get("sub") == sub]:
+            del _tokens[digest]
+        _purge_revocations()
+
+
+def invalidate_user_ctx(sub):
+    """users/{email} 文件更新後呼叫，下一個請求重新讀取"""
+    with _lock:
+        _user_docs.pop(sub, None)
+
+
+def _purge_revocations(max_token_age=24 * 3600):
+    now = time.time()
+    for digest in [d for d, exp in _revoked_tokens.items() if exp <= now]:
+        del _revoked_tokens[digest]
+    for sub in [s for s, t in _revoked_users.items() if now - t > max_token_age]:
+        del _revoked_users[sub]
+
+
+def auth_stats():
+    with _lock:
+        return {**_stats, "cachedTokens": len(_tokens), "cachedUsers": len(_user_docs)}
+
+
+class UserContext:
+    """
+    請求範圍的使用者資料（g.user_ctx）：
+    第一次存取 .doc 時才讀取 users/{email}，同一請求內只讀一次，
+    並在 USER_CTX_TTL 秒內與其他請求共用。
+    """
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.user_id = payload["sub"]
+        self._doc = None
+
+    @property
+    def doc(self) -> dict:
+        if self._doc is None:
+            self._doc = _load_user_doc(self.user_id)
+        return self._doc
+
+    def get(self, key, default=None):
+        return self.doc.get(key, default)
+
+
+def user_doc(sub) -> dict:
+    """與 g.user_ctx.doc 共用快取的 users/{email} 文件，給沒有請求範圍的呼叫端（async 模式、背景工作）"""
+    return _load_user_doc(sub)
+
+
+def _load_user_doc(sub):
+    now = time.monotonic()
+    with _lock:
+        cached = _user_docs.get(sub)
+        if cached is not None and now - cached[0] < USER_CTX_TTL:
+            _user_docs.move_to_end(sub)
+            return cached[1]
+
+    from storage import user_store
+    doc = user_store.get(sub) or {}
+
+    with _lock:
+        _stats["userDocLoads"] += 1
+        _user_docs[sub] = (now, doc)
+        while len(_user_docs) > USER_CTX_CACHE_SIZE:
+            _user_docs.popitem(last=False)
+    return doc
+
+
 def auth_required(f):
     @wraps(f)
     def wrapper(*args, **kwargs):
-        header = request.headers.get("Authorization", "")
-        if not header.startswith("Bearer "):
-            return jsonify(error="Missing token"), 401
-        token = header.split(" ", 1)[1]
-        try:
-            payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-        except jwt.ExpiredSignatureError:
-            return jsonify(error="Token expired"), 401
-        except jwt.InvalidTokenError:
-            return jsonify(error="Invalid token"), 401
+        payload, error = decode_bearer(request.headers.get("Authorization", ""))
+        if error:
+            return jsonify(error=error), 401
         g.user = payload  # payload['sub'] 就是 userId/email
+        g.user_ctx = UserContext(payload)
         return f(*args, **kwargs)
-    return wrapper
\ No newline at end of file
+    return wrapper
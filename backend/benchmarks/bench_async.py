@@ -0,0 +1,184 @@
+# backend/benchmarks/bench_async.py
+"""
+同步 vs async 服務模式的並行量比較
+
+以真正的端點比較兩種服務模式，GPT 換成固定延遲的假回覆（內容由 benchmarks.fakes.reply_for 產生，可被端點正常解析），
+儲存層使用 memory 後端：
+- sync ：create_app() 的 Flask app，由 --threads 條執行緒各自以 test client 送出（等同 gunicorn gthread 的
+  workers × threads），llm.complete 以 time.sleep 模擬，等待 GPT 期間佔住執行緒
+- async：asgi.app 由 httpx.ASGITransport 在單一 event loop 中驅動，llm.acomplete 以 asyncio.sleep 模擬，
+  同時送出的請求數上限為 --concurrency
+端點：POST /articles（含 Lexile 分析與寫入）、GET /words/quiz（含 NumPy 干擾選項）。
+回報總耗時、吞吐量、p50 / p99 延遲、同時進行中的 GPT 呼叫峰值與狀態碼分佈。
+假回覆直接取代 llm.complete / llm.acomplete，GPT 閘道的並行上限（llm.SITES）不在量測範圍內；
+memory 後端在 async 模式下於執行緒中呼叫，不模擬 Firestore 延遲（見 bench_e2e.py）。
+
+用法（於 backend/ 目錄）：
+    python -m benchmarks.bench_async --requests 300 --latency 1 --threads 16
+"""
+import argparse
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import httpx
+import jwt
+
+import asgi
+import llm
+from app import create_app
+from article_pool import article_pool
+from auth.utils import SECRET_KEY
+from benchmarks.bench_e2e import percentile
+from benchmarks.fakes import reply_for
+from storage import word_store
+
+SCENARIOS = {
+    "articles": ("POST", "/articles", {"lexileTarget": 700}),
+    "words_quiz": ("GET", "/words/quiz", None),
+}
+
+
+class InFlight:
+    def __init__(self):
+        self.now = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        with self._lock:
+            self.now += 1
+            self.peak = max(self.peak, self.now)
+
+    def __exit__(self, *exc):
+        with self._lock:
+            self.now -= 1
+
+    def reset(self):
+        with self._lock:
+            self.now = self.peak = 0
+
+
+def fake_llm(latency, gauge):
+    """回傳 (complete, acomplete)：等待 latency 秒後回覆，期間計入 gauge"""
+
+    def complete(site_name, messages, **options):
+        with gauge:
+            time.sleep(latency)               # 阻塞式 openai.chat.completions.create
+        return reply_for(messages, options.get("response_format"))
+
+    async def acomplete(site_name, messages, **options):
+        with gauge:
+            await asyncio.sleep(latency)      # await AsyncOpenAI().chat.completions.create
+        return reply_for(messages, options.get("response_format"))
+
+    return complete, acomplete
+
+
+def seed_users(users, words_per_user):
+    """每位使用者 words_per_user 個已到期的單字，回傳 {user: Authorization header}"""
+    now = datetime.utcnow()
+    headers = {}
+    for u in range(users):
+        user = f"async{u}@example.com"
+        for i in range(words_per_user):
+            word_store.set(user, f"word{i}x{u}", {
+                "userId": user, "createdAt": now, "lastInterval": 1, "easeFactor": 2.5,
+                "dueDate": now - timedelta(days=1, minutes=i), "short": "測試", "full": "n. 測試", "reviewCount": 0
+            })
+        token = jwt.encode({"sub": user, "iat": int(time.time()), "exp": int(time.time()) + 86400},
+                           SECRET_KEY, algorithm="HS256")
+        headers[user] = {"Authorization": f"Bearer {token}"}
+    return headers
+
+
+def summarize(latencies, statuses, wall, n, peak):
+    latencies = sorted(x * 1000 for x in latencies)
+    counts = {}
+    for status in statuses:
+        counts[status] = counts.get(status, 0) + 1
+    return {"wall": wall, "throughput": n / wall, "p50Ms": percentile(latencies, 0.50),
+            "p99Ms": percentile(latencies, 0.99), "peak": peak, "statuses": counts}
+
+
+def run_sync(app, headers, scenario, n, threads, gauge):
+    method, path, body = SCENARIOS[scenario]
+    users = list(headers)
+    local = threading.local()
+
+    def handle(i):
+        if not hasattr(local, "client"):
+            local.client = app.test_client()
+        start = time.perf_counter()
+        resp = local.client.open(path, method=method, json=body, headers=headers[users[i % len(users)]])
+        resp.get_data()
+        return time.perf_counter() - start, resp.status_code
+
+    gauge.reset()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(handle, range(n)))
+    wall = time.perf_counter() - start
+    return summarize([r[0] for r in results], [r[1] for r in results], wall, n, gauge.peak)
+
+
+def run_async(headers, scenario, n, concurrency, gauge):
+    method, path, body = SCENARIOS[scenario]
+    users = list(headers)
+
+    async def main():
+        asgi._stores = None               # async 儲存層綁定建立時的 event loop
+        limit = asyncio.Semaphore(concurrency)
+        transport = httpx.ASGITransport(app=asgi.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as http:
+            async def handle(i):
+                async with limit:
+                    start = time.perf_counter()
+                    resp = await http.request(method, path, json=body, headers=headers[users[i % len(users)]])
+                    return time.perf_counter() - start, resp.status_code
+            return await asyncio.gather(*(handle(i) for i in range(n)))
+
+    gauge.reset()
+    start = time.perf_counter()
+    results = asyncio.run(main())
+    wall = time.perf_counter() - start
+    return summarize([r[0] for r in results], [r[1] for r in results], wall, n, gauge.peak)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=1.0, help="模擬 GPT 回應秒數")
+    parser.add_argument("--threads", type=int, default=16, help="同步模式的執行緒數（workers × threads）")
+    parser.add_argument("--concurrency", type=int, default=1000, help="async 模式的同時請求上限")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--words", type=int, default=20, help="每位使用者的單字數")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="只跑指定情境（可重複），預設全部")
+    args = parser.parse_args()
+
+    app = create_app({"STORAGE_BACKEND": "memory", "TESTING": True})
+    article_pool.enabled = False
+    headers = seed_users(args.users, args.words)
+    gauge = InFlight()
+    llm.complete, asgi.acomplete = fake_llm(args.latency, gauge)
+
+    print(f"requests={args.requests} latency={args.latency}s users={args.users}")
+    for scenario in args.scenario or sorted(SCENARIOS):
+        # 預熱：載入 CMU 字典、NumPy 與各使用者的單字索引
+        run_sync(app, headers, scenario, args.users, args.threads, gauge)
+        run_async(headers, scenario, args.users, args.concurrency, gauge)
+        for name, result in (
+            (f"sync  ({args.threads} threads)", run_sync(app, headers, scenario, args.requests, args.threads, gauge)),
+            (f"async (limit {args.concurrency})",
+             run_async(headers, scenario, args.requests, args.concurrency, gauge)),
+        ):
+            print(f"{scenario:10s} {name:20s} wall {result['wall']:7.2f}s  {result['throughput']:8.1f} req/s  "
+                  f"p50 {result['p50Ms']:8.1f}ms  p99 {result['p99Ms']:8.1f}ms  "
+                  f"peak GPT in-flight {result['peak']:4d}  {result['statuses']}")
+
+
+if __name__ == "__main__":
+    main()
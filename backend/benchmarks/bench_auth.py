@@ -0,0 +1,43 @@
+# backend/benchmarks/bench_auth.py
+"""
+auth_required 的驗證成本：每次完整 jwt.decode vs 已驗證 token 快取
+
+用法（於 backend/ 目錄）：
+    python -m benchmarks.bench_auth --iterations 20000
+"""
+import argparse
+import time
+import warnings
+
+import jwt
+from auth import utils
+
+
+def per_call_us(fn, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) * 1e6 / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    warnings.simplefilter("ignore")
+
+    token = jwt.encode({"sub": "bench@example.com", "exp": time.time() + 3600},
+                       utils.SECRET_KEY, algorithm="HS256")
+    header = f"Bearer {token}"
+
+    full = per_call_us(lambda: jwt.decode(token, utils.SECRET_KEY, algorithms=["HS256"]), args.iterations)
+    utils.decode_bearer(header)
+    cached = per_call_us(lambda: utils.decode_bearer(header), args.iterations)
+
+    print(f"jwt.decode every request: {full:7.2f} µs/call")
+    print(f"cached decode_bearer:     {cached:7.2f} µs/call")
+    print(f"stats: {utils.auth_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+# backend/benchmarks/bench_e2e.py
+"""
+端對端延遲壓測：以 Flask test client 驅動真正的 app（create_app），儲存層使用 memory 後端
+並加上模擬的 Firestore round trip（fakes.LatencyStore），GPT 改用 fakes.FakeOpenAI。
+
+涵蓋端點：/pick_words、/review/feedback、POST /words（新字、既有字）、/words/quiz、
+POST /articles、POST /articles/stream。每個情境回報：
+- p50 / p95 / p99 延遲與吞吐量（--concurrency 條執行緒同時送出）
+- 每個請求的儲存層與 GPT 呼叫次數
+- 配置量：另以 tracemalloc 逐一執行 --alloc-requests 個請求，記錄每個請求的峰值配置（KiB）
+  與請求結束後仍存活的記憶體區塊數（sys.getallocatedblocks，快取成長或洩漏會反映在這裡）
+
+--article-pool 開啟文章預產池，並在量測前替每位使用者預產一篇（背景預產的 GPT 呼叫也計入 llm/req）；
+--users 不少於 --requests + --warmup 時，每個產文請求都是第一次產文，可量到命中路徑的延遲。
+--out 寫出 JSON 基準，--compare 與舊基準比較，p99 或吞吐量退化超過 --tolerance % 時以非零狀態結束。
+benchmarks/baseline.json 為提交進版本庫的基準（meta.revision 為量測時的 commit）：
+修改本檔、fakes.py 或量測到的程式路徑後，以下列指令重新產生並一起提交。
+
+用法（於 backend/ 目錄）：
+    python -m benchmarks.bench_e2e --requests 200 --concurrency 8 --out benchmarks/baseline.json
+    python -m benchmarks.bench_e2e --compare benchmarks/baseline.json
+"""
+import argparse
+import gc
+import itertools
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import jwt
+
+import clients
+import storage
+from app import create_app
+from article_pool import article_pool
+from auth.utils import SECRET_KEY
+from benchmarks.fakes import LatencyStore, FakeOpenAI
+
+
+class Context:
+    """壓測資料：users × words，並提供各情境需要的隨機參數"""
+
+    def __init__(self, users, words_per_user, seed):
+        self.rng = random.Random(seed)
+        self.users = [f"bench{u}@example.com" for u in range(users)]
+        self.words = {u: [f"word{i}x{n}" for i in range(words_per_user)] for n, u in enumerate(self.users)}
+        self.tokens = {
+            u: "Bearer " + jwt.encode({"sub": u, "iat": int(time.time()), "exp": int(time.time()) + 86400},
+                                      SECRET_KEY, algorithm="HS256")
+            for u in self.users
+        }
+        self._new = itertools.count()
+        self._lock = threading.Lock()
+
+    def user(self):
+        with self._lock:
+            return self.rng.choice(self.users)
+
+    def word_of(self, user):
+        with self._lock:
+            return self.rng.choice(self.words[user])
+
+    def new_word(self):
+        return f"fresh{next(self._new)}"
+
+    def seed_store(self, words_store):
+        now = datetime.utcnow()
+        for user in self.users:
+            for i, word in enumerate(self.words[user]):
+                words_store.set(user, word, {
+                    "userId": user,
+                    "createdAt": now - timedelta(days=60, minutes=-i),
+                    "lastInterval": self.rng.choice([0, 1, 6, 15]),
+                    "easeFactor": round(self.rng.uniform(1.3, 2.8), 2),
+                    "dueDate": now + timedelta(days=self.rng.uniform(-10, 10)),
+                    "short": "測試",
+                    "full": "n. 測試",
+                    "reviewCount": 0
+                })
+
+
+def _pick_words(ctx):
+    user = ctx.user()
+    return user, "GET", "/pick_words?limit=10", None
+
+
+def _review_feedback(ctx):
+    user = ctx.user()
+    return user, "POST", "/review/feedback", {"wordId": ctx.word_of(user), "quality": ctx.rng.randint(0, 5)}
+
+
+def _words_new(ctx):
+    return ctx.user(), "POST", "/words", {"word": ctx.new_word()}
+
+
+def _words_existing(ctx):
+    user = ctx.user()
+    return user, "POST", "/words", {"word": ctx.word_of(user)}
+
+
+def _words_quiz(ctx):
+    return ctx.user(), "GET", "/words/quiz", None
+
+
+def _articles(ctx):
+    return ctx.user(), "POST", "/articles", {"lexileTarget": 700}
+
+
+def _articles_stream(ctx):
+    return ctx.user(), "POST", "/articles/stream", {"lexileTarget": 700}
+
+
+SCENARIOS = {
+    "pick_words": _pick_words,
+    "review_feedback": _review_feedback,
+    "words_new": _words_new,
+    "words_existing": _words_existing,
+    "words_quiz": _words_quiz,
+    "articles": _articles,
+    "articles_stream": _articles_stream,
+}
+
+
+def _revision():
+    """量測時的 git commit，比較基準時可確認兩邊量的是哪一版程式"""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))]
+
+
+class Runner:
+    def __init__(self, app, ctx, stores, llm):
+        self.app = app
+        self.ctx = ctx
+        self.stores = stores
+        self.llm = llm
+        self._local = threading.local()
+
+    def _client(self):
+        if not hasattr(self._local, "client"):
+            self._local.client = self.app.test_client()
+        return self._local.client
+
+    def request(self, scenario):
+        user, method, path, body = SCENARIOS[scenario](self.ctx)
+        start = time.perf_counter()
+        resp = self._client().open(path, method=method, json=body,
+                                   headers={"Authorization": self.ctx.tokens[user]})
+        resp.get_data()  # 串流回應需讀完才算結束
+        return time.perf_counter() - start, resp.status_code
+
+    def _calls(self):
+        return sum(s.calls for s in self.stores), self.llm.calls
+
+    def run(self, scenario, requests, concurrency, warmup, alloc_requests):
+        for _ in range(warmup):
+            self.request(scenario)
+
+        store_before, llm_before = self._calls()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(lambda _: self.request(scenario), range(requests)))
+        wall = time.perf_counter() - start
+        store_after, llm_after = self._calls()
+
+        latencies = sorted(r[0] * 1000 for r in results)
+        statuses = {}
+        for _, status in results:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        return {
+            "requests": requests,
+            "p50Ms": round(percentile(latencies, 0.50), 3),
+            "p95Ms": round(percentile(latencies, 0.95), 3),
+            "p99Ms": round(percentile(latencies, 0.99), 3),
+            "meanMs": round(statistics.fmean(latencies), 3),
+            "throughput": round(requests / wall, 2),
+            "statuses": statuses,
+            "errors": sum(n for s, n in statuses.items() if s.startswith("5")),
+            "storeCallsPerRequest": round((store_after - store_before) / requests, 2),
+            "llmCallsPerRequest": round((llm_after - llm_before) / requests, 2),
+            **self.allocations(scenario, alloc_requests)
+        }
+
+    def allocations(self, scenario, n):
+        """逐一執行 n 個請求：tracemalloc 峰值與存活區塊數（不計入延遲統計）"""
+        if n <= 0:
+            return {}
+        peaks = []
+        gc.collect()
+        blocks = sys.getallocatedblocks()
+        tracemalloc.start()
+        try:
+            for _ in range(n):
+                tracemalloc.reset_peak()
+                base, _ = tracemalloc.get_traced_memory()
+                self.request(scenario)
+                peaks.append(tracemalloc.get_traced_memory()[1] - base)
+        finally:
+            tracemalloc.stop()
+        gc.collect()
+        blocks = sys.getallocatedblocks() - blocks
+        return {
+            "allocPeakKiB": round(statistics.median(peaks) / 1024, 1),
+            "retainedBlocksPerRequest": round(blocks / n, 1),
+        }
+
+
+def compare(baseline, current, tolerance):
+    """印出與基準的差異，回傳是否有超過容忍度的退化"""
+    regressed = False
+    print(f"\n{'scenario':<18}{'p99 base':>10}{'p99 now':>10}{'Δ%':>8}{'rps base':>10}{'rps now':>10}{'Δ%':>8}")
+    for name, now in current.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        d_p99 = (now["p99Ms"] - base["p99Ms"]) / base["p99Ms"] * 100 if base["p99Ms"] else 0.0
+        d_rps = (now["throughput"] - base["throughput"]) / base["throughput"] * 100 if base["throughput"] else 0.0
+        flag = ""
+        if d_p99 > tolerance or d_rps < -tolerance:
+            regressed = True
+            flag = "  REGRESSION"
+        print(f"{name:<18}{base['p99Ms']:10.1f}{now['p99Ms']:10.1f}{d_p99:8.1f}"
+              f"{base['throughput']:10.1f}{now['throughput']:10.1f}{d_rps:8.1f}{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="逗號分隔")
+    parser.add_argument("--requests", type=int, default=200, help="每個情境的量測請求數")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--alloc-requests", type=int, default=20, help="配置量測的請求數（0 關閉）")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--words", type=int, default=60, help="每位使用者的單字數")
+    parser.add_argument("--store-latency", type=float, default=5.0, help="每次儲存層呼叫的延遲（毫秒）")
+    parser.add_argument("--store-jitter", type=float, default=2.0, help="延遲的隨機上限（毫秒）")
+    parser.add_argument("--llm-latency", type=float, default=200.0, help="GPT 首字延遲（毫秒）")
+    parser.add_argument("--token-delay", type=float, default=2.0, help="每個 token 的產生時間（毫秒）")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--article-pool", action="store_true",
+                        help="開啟文章預產池（預設關閉，與未開啟的基準比較時才可比）")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="寫出 JSON 基準的路徑")
+    parser.add_argument("--compare", help="要比較的 JSON 基準")
+    parser.add_argument("--tolerance", type=float, default=20.0, help="容許的退化百分比")
+    args = parser.parse_args()
+    warnings.simplefilter("ignore")
+
+    names = [n.strip() for n in args.scenarios.split(",") if n.strip()]
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    app = create_app({"STORAGE_BACKEND": "memory", "TESTING": True})
+    ctx = Context(args.users, args.words, args.seed)
+    raw = storage.current_stores()
+    ctx.seed_store(raw[0])
+    stores = [LatencyStore(s, args.store_latency / 1000, args.store_jitter / 1000, seed=args.seed) for s in raw]
+    storage.use_stores(stores, backend="bench")
+    llm = FakeOpenAI(args.llm_latency / 1000, args.token_delay / 1000, args.llm_error_rate, seed=args.seed)
+    clients.use_openai(llm)
+    article_pool.enabled = args.article_pool
+    article_pool.delay = 0
+    if args.article_pool:
+        # 模擬使用者上次產文後已過了一段時間：先替每位使用者預產一篇
+        for user in ctx.users:
+            article_pool.note_request(user, 700)
+            article_pool.refill(user)
+
+    runner = Runner(app, ctx, stores, llm)
+    results = {}
+    print(f"{'scenario':<18}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}{'5xx':>6}"
+          f"{'store/req':>11}{'llm/req':>9}{'KiB/req':>9}{'blocks/req':>12}")
+    for name in names:
+        r = runner.run(name, args.requests, args.concurrency, args.warmup, args.alloc_requests)
+        results[name] = r
+        print(f"{name:<18}{r['p50Ms']:9.1f}{r['p95Ms']:9.1f}{r['p99Ms']:9.1f}{r['throughput']:9.1f}"
+              f"{r['errors']:6d}{r['storeCallsPerRequest']:11.2f}{r['llmCallsPerRequest']:9.2f}"
+              f"{r.get('allocPeakKiB', 0):9.1f}{r.get('retainedBlocksPerRequest', 0):12.1f}")
+
+    if args.out:
+        report = {
+            "meta": {
+                "createdAt": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+                "revision": _revision(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "args": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+            },
+            "scenarios": results,
+        }
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nbaseline written to {args.out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["scenarios"]
+        if compare(baseline, results, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
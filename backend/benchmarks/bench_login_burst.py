@@ -0,0 +1,77 @@
+# backend/benchmarks/bench_login_burst.py
+"""
+登入尖峰對輕量端點尾延遲的影響：bcrypt 直接在 request 執行緒計算 vs 有上限的雜湊池
+
+以一組執行緒模擬伺服器（gunicorn gthread）：同時湧入一波登入（bcrypt.checkpw），
+期間持續送出輕量請求（模擬從 due_queue 記憶體取字的 /pick_words），量測輕量請求的 p50/p99。
+
+用法（於 backend/ 目錄）：
+    python -m benchmarks.bench_login_burst --threads 16 --logins 64 --rounds 12
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+from auth.passwords import PasswordHasher, HasherBusy
+
+
+def light_request():
+    """模擬 /pick_words：純記憶體的小量計算"""
+    return sorted(range(2000), key=lambda x: -x)[:10]
+
+
+def run(server_threads, logins, light, interval, verify):
+    server = ThreadPoolExecutor(max_workers=server_threads)
+    rejected = [0]
+
+    def login():
+        try:
+            verify()
+        except HasherBusy:
+            rejected[0] += 1
+
+    def timed(submitted):
+        light_request()
+        return time.perf_counter() - submitted
+
+    for _ in range(logins):
+        server.submit(login)
+    futures = []
+    for _ in range(light):
+        futures.append(server.submit(timed, time.perf_counter()))
+        time.sleep(interval)
+    latencies = sorted(f.result() * 1000 for f in futures)
+    server.shutdown(wait=True)
+    p = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+    return p(0.50), p(0.99), rejected[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=16, help="伺服器 request 執行緒數")
+    parser.add_argument("--logins", type=int, default=64, help="同時湧入的登入數")
+    parser.add_argument("--light", type=int, default=200, help="輕量請求數")
+    parser.add_argument("--interval", type=float, default=0.005, help="輕量請求間隔（秒）")
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--queue", type=int, default=6)
+    args = parser.parse_args()
+
+    password = b"correct horse battery staple"
+    pw_hash = bcrypt.hashpw(password, bcrypt.gensalt(rounds=args.rounds))
+    hasher = PasswordHasher(rounds=args.rounds, workers=args.workers, queue=args.queue)
+
+    inline = run(args.threads, args.logins, args.light, args.interval,
+                 lambda: bcrypt.checkpw(password, pw_hash))
+    pooled = run(args.threads, args.logins, args.light, args.interval,
+                 lambda: hasher.verify(password.decode(), pw_hash.decode()))
+    hasher.shutdown()
+
+    print(f"{'mode':<22}{'p50 ms':>10}{'p99 ms':>10}{'503s':>8}")
+    print(f"{'bcrypt inline':<22}{inline[0]:10.2f}{inline[1]:10.2f}{inline[2]:8d}")
+    print(f"{'bounded hash pool':<22}{pooled[0]:10.2f}{pooled[1]:10.2f}{pooled[2]:8d}")
+
+
+if __name__ == "__main__":
+    main()
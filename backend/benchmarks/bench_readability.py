@@ -0,0 +1,73 @@
+# backend/benchmarks/bench_readability.py
+"""
+可讀性評分微基準：textstat 四次獨立計算 vs readability 單次掃描
+
+用法（於 backend/ 目錄）：
+    python -m benchmarks.bench_readability --articles 500
+"""
+import argparse
+import random
+import time
+
+import textstat
+import lexile
+import readability
+
+SENTENCES = [
+    "The old fisherman rowed his small boat past the lighthouse every morning.",
+    "Photosynthesis converts electromagnetic radiation into chemical energy.",
+    "The children played outside while their mother prepared lunch.",
+    "Scientists carefully measured the temperature of the ancient glacier.",
+    "She opened the mysterious letter and read it twice before answering.",
+    "Economic uncertainty encouraged the community to support local businesses.",
+    "A gentle wind carried the smell of fresh bread across the village square.",
+    "The committee postponed the decision until additional evidence was available.",
+]
+
+
+def make_corpus(n, seed=0):
+    rnd = random.Random(seed)
+    return [" ".join(rnd.choice(SENTENCES) for _ in range(rnd.randint(10, 20))) for _ in range(n)]
+
+
+def textstat_lexile(text):
+    avg_grade = (textstat.flesch_kincaid_grade(text)
+                 + textstat.gunning_fog(text)
+                 + textstat.dale_chall_readability_score(text)
+                 + textstat.smog_index(text)) / 4.0
+    return lexile.grade_to_lexile(avg_grade)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--articles", type=int, default=500)
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.articles)
+    # 預先載入兩邊的字典，只量測評分本身
+    textstat_lexile(corpus[0])
+    lexile.approximate_lexile(corpus[0])
+    # textstat 內部以 lru_cache 記憶整段文本，先清空避免重複文本被直接命中
+    textstat.textstat._cache_clear()
+
+    old, t_old = timed(lambda: [textstat_lexile(t) for t in corpus])
+    new, t_new = timed(lambda: lexile.approximate_lexile_many(corpus))
+    max_diff = max(abs(a - b) for a, b in zip(old, new))
+
+    n = len(corpus)
+    print(f"articles:            {n}")
+    print(f"textstat (4 passes): {t_old * 1000 / n:8.3f} ms/article")
+    print(f"single pass (batch): {t_new * 1000 / n:8.3f} ms/article")
+    print(f"speedup:             {t_old / t_new:8.1f}x")
+    print(f"max |ΔLexile|:       {max_diff}")
+    print(f"syllable table:      {readability.syllable_count.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
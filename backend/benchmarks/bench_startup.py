@@ -0,0 +1,75 @@
+# backend/benchmarks/bench_startup.py
+"""
+冷啟動時間：以 python -X importtime 量測 `from app import create_app; create_app()`，
+列出累積匯入時間最久的模組，並檢查較重的套件沒有在啟動時被匯入。
+
+超過 --budget-ms 或匯入了 --forbid 指定的模組時以非零狀態結束，可放進 CI 抓啟動時間退化。
+
+用法（於 backend/ 目錄）：
+    python -m benchmarks.bench_startup --repeat 5 --top 15 --budget-ms 1000
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+DEFAULT_FORBID = "openai,textstat,numpy,google.cloud.firestore_v1,grpc"
+
+SCRIPT = (
+    "import sys, time\n"
+    "t = time.perf_counter()\n"
+    "from app import create_app\n"
+    "create_app({'STORAGE_BACKEND': 'memory'})\n"
+    "print(f'{(time.perf_counter() - t) * 1000:.1f}')\n"
+    "print(','.join(sorted(sys.modules)))\n"
+)
+
+
+def run_once():
+    """回傳 (啟動毫秒, 已匯入模組集合, [(模組, self µs, 累積 µs)])"""
+    env = {**os.environ, "STORAGE_BACKEND": "memory"}
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", SCRIPT],
+                          capture_output=True, text=True, env=env, check=True)
+    elapsed, modules = proc.stdout.strip().splitlines()[-2:]
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return float(elapsed), set(modules.split(",")), rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=None, help="啟動時間上限（中位數）")
+    parser.add_argument("--forbid", default=DEFAULT_FORBID, help="啟動時不得匯入的模組（逗號分隔）")
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.repeat)]
+    times = [t for t, _, _ in runs]
+    _, modules, rows = runs[-1]
+    median = statistics.median(times)
+
+    print(f"create_app() cold start: median {median:.1f} ms  (min {min(times):.1f}, max {max(times):.1f}, n={len(times)})")
+    print(f"modules imported: {len(modules)}")
+    print(f"\n{'cumulative ms':>14}{'self ms':>10}  module")
+    for name, self_us, cumulative_us in sorted(rows, key=lambda r: -r[2])[:args.top]:
+        print(f"{cumulative_us / 1000:14.1f}{self_us / 1000:10.1f}  {name}")
+
+    failed = False
+    forbidden = [m for m in args.forbid.split(",") if m and m in modules]
+    if forbidden:
+        print(f"\nFAIL: heavy modules imported at startup: {', '.join(forbidden)}")
+        failed = True
+    if args.budget_ms is not None and median > args.budget_ms:
+        print(f"\nFAIL: startup {median:.1f} ms exceeds budget {args.budget_ms:.1f} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# backend/benchmarks/fakes.py
+"""
+壓測用的替身：
+- LatencyStore：包住儲存層（通常是 memory 後端），每次呼叫先等一段模擬的 Firestore round trip
+- FakeOpenAI：介面同 OpenAI client 的 chat.completions.create，可設定首字延遲、
+  每個 token 的產生時間（含串流）與錯誤率；回覆內容依目前各端點的 prompt 產生，可被正常解析
+"""
+import json
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+_BATCH_WORDS_RE = re.compile(r"belongs: (.+?)\. Respond")
+_SINGLE_WORD_RE = re.compile(r"using the word '(.+?)'")
+_ARTICLE_WORDS_RE = re.compile(r"include these words: (.+?)\. Keep")
+
+FILLER = ("Every morning the children walked past the old market near the river. "
+          "They liked to watch the boats and talk about the places they wanted to visit. ")
+
+
+class LatencyStore:
+    """store 的每個方法呼叫前先 sleep(latency + uniform(0, jitter))，並計算呼叫次數"""
+
+    def __init__(self, store, latency=0.005, jitter=0.002, seed=None):
+        self._store = store
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        attr = getattr(self._store, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            with self._lock:
+                self.calls += 1
+                delay = self.latency + self._rng.uniform(0, self.jitter)
+            time.sleep(delay)
+            return attr(*args, **kwargs)
+        return call
+
+
+class FakeOpenAIError(Exception):
+    """模擬的 API 錯誤（如 500 / 429）"""
+
+    def __init__(self, message, status_code=500):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class FakeOpenAI:
+    """
+    latency：回應第一個 token 前的等待（秒）
+    token_delay：每個 token 的產生時間；非串流呼叫會等完整段落產生完才回傳
+    error_rate：每次呼叫失敗的機率
+    """
+
+    def __init__(self, latency=0.3, token_delay=0.005, error_rate=0.0, seed=None):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.error_rate = error_rate
+        self.calls = 0
+        self.errors = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model=None, messages=(), max_tokens=None, stream=False, response_format=None,
+                timeout=None, stream_options=None, **_):
+        with self._lock:
+            self.calls += 1
+            failed = self._rng.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        time.sleep(self.latency)
+        if failed:
+            raise FakeOpenAIError("simulated upstream error")
+
+        content = reply_for(messages, response_format)
+        tokens = re.findall(r"\S+\s*", content)
+        prompt_tokens = sum(len(m["content"].split()) for m in messages)
+        usage = SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=len(tokens),
+                                total_tokens=prompt_tokens + len(tokens))
+        if stream:
+            include_usage = bool(stream_options and stream_options.get("include_usage"))
+            return self._stream(tokens, usage if include_usage else None)
+        time.sleep(self.token_delay * len(tokens))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=usage)
+
+    def _stream(self, tokens, usage):
+        for token in tokens:
+            time.sleep(self.token_delay)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token))], usage=None)
+        if usage is not None:
+            # 同 OpenAI：include_usage 時最後多一個 choices 為空、帶 usage 的 chunk
+            yield SimpleNamespace(choices=[], usage=usage)
+
+
+def reply_for(messages, response_format=None):
+    """依 prompt 類型產生可被端點解析的回覆"""
+    prompt = " ".join(m["content"] for m in messages)
+    if response_format and response_format.get("type") == "json_object" and "Words:\n" in prompt:
+        words = prompt.split("Words:\n", 1)[1].splitlines()
+        return json.dumps({"definitions": {w: {"short": "測試翻譯", "full": "n. 測試用的解釋"} for w in words}})
+    if response_format and response_format.get("type") == "json_object":
+        match = _BATCH_WORDS_RE.search(prompt)
+        words = [w.strip() for w in match.group(1).split(",")] if match else []
+        return json.dumps({"sentences": {w: f"The manager asked us to ____ ({w}) the report." for w in words}})
+    match = _SINGLE_WORD_RE.search(prompt)
+    if match:
+        return f"The manager asked us to ____ ({match.group(1)}) the report."
+    match = _ARTICLE_WORDS_RE.search(prompt)
+    if match:
+        words = [w.strip() for w in match.group(1).split(",")]
+        sentences = [f"One day a girl learned the word {w} and used it in a story." for w in words]
+        return " ".join(sentences) + " " + FILLER * 3
+    if "dictionary" in prompt:
+        return "測試翻譯---n. 測試用的解釋，說明這個單字的意思。"
+    return "OK"
@@ -0,0 +1,84 @@
+# backend/clients.py
+"""
+行程內共用的外部 client，第一次使用時才建立：
+- 匯入本模組不會載入 openai（約 0.8 秒），也不會建立任何連線
+- 每個行程（gunicorn worker）只有一個 OpenAI client，所有 blueprint 共用其連線池
+- pre-fork 預載（gunicorn.conf.py）時，master 只先匯入模組與字典，client 由各 worker fork 後自行建立
+- 連線池上限為 OPENAI_MAX_CONNECTIONS；SDK 自帶的重試關閉（max_retries=0），
+  重試、逾時與並行上限統一由 llm.py 處理，避免兩層重試疊加
+- 端點程式不直接使用這些 client，一律透過 llm.py
+"""
+import os
+import threading
+
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "64"))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+
+_lock = threading.Lock()
+_openai = None
+_async_openai = None
+
+
+def _pool_options(http_client_cls):
+    import httpx
+    limits = httpx.Limits(max_connections=OPENAI_MAX_CONNECTIONS,
+                          max_keepalive_connections=OPENAI_MAX_CONNECTIONS)
+    return {
+        "api_key": os.getenv("OPENAI_API_KEY"),
+        "max_retries": 0,
+        "timeout": OPENAI_TIMEOUT,
+        "http_client": http_client_cls(limits=limits),
+    }
+
+
+def openai_client():
+    """共用的同步 OpenAI client"""
+    global _openai
+    if _openai is None:
+        with _lock:
+            if _openai is None:
+                from openai import OpenAI, DefaultHttpxClient
+                from metrics import instrument_openai
+                _openai = instrument_openai(OpenAI(**_pool_options(DefaultHttpxClient)))
+    return _openai
+
+
+def async_openai_client():
+    """共用的 AsyncOpenAI client（asgi.py）；連線綁定 event loop，第一次在 loop 內使用時才建立"""
+    global _async_openai
+    if _async_openai is None:
+        with _lock:
+            if _async_openai is None:
+                from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+                from metrics import instrument_async_openai
+                _async_openai = instrument_async_openai(AsyncOpenAI(**_pool_options(DefaultAsyncHttpxClient)))
+    return _async_openai
+
+
+def use_openai(client):
+    """換上指定的 client（例如壓測用的 FakeOpenAI），同樣記錄 llm span 與 token"""
+    global _openai
+    from metrics import instrument_openai
+    with _lock:
+        _openai = instrument_openai(client)
+
+
+def preload():
+    """
+    在 fork 前匯入較重的模組並載入唯讀字典，worker 以 copy-on-write 共用；
+    不建立任何連線或執行緒（gRPC / httpx 連線在 fork 後不可共用）。
+    """
+    import openai  # noqa: F401
+    import numpy  # noqa: F401
+    import readability
+    readability.preload()
+
+
+def reset():
+    """fork 後丟棄繼承自 master 的 client，讓 worker 重新建立"""
+    global _openai, _async_openai
+    import storage
+    with _lock:
+        _openai = None
+        _async_openai = None
+    storage.reset()
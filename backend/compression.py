@@ -0,0 +1,77 @@
+# backend/compression.py
+"""
+JSON 回應壓縮：超過 COMPRESS_MIN_BYTES 的 JSON 回應依 Accept-Encoding 以 br（有安裝 brotli 時）或 gzip 壓縮，
+並加上 Vary: Accept-Encoding。以下回應不處理：串流（SSE）、已設定 Content-Encoding、非 200、HEAD。
+帶強 ETag 的回應壓縮後 ETag 加上編碼後綴（"<etag>-gzip"），同一資源不同編碼不共用強 ETag；
+比對 If-None-Match 時以 base_etag() 去掉後綴。
+
+brotli 為選用套件：未安裝時只提供 gzip。
+"""
+import gzip
+import os
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "5"))
+
+
+def encodings():
+    """可用的編碼，依偏好排序"""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def choose_encoding(accept_encodings):
+    """依 request.accept_encodings 選擇編碼，都不接受時回傳 None"""
+    for encoding in encodings():
+        if accept_encodings[encoding]:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def base_etag(etag: str) -> str:
+    """去掉編碼後綴，取得未壓縮表示的 ETag"""
+    for encoding in ("br", "gzip"):
+        if etag.endswith(f"-{encoding}"):
+            return etag[:-len(encoding) - 1]
+    return etag
+
+
+def encode_response(resp, encoding, body=None):
+    """
+    以 encoding 就地壓縮 resp（encoding 為 None 時不動）；body 為已壓縮好的內容
+    （呼叫端有快取時傳入，避免重複壓縮），為 None 時壓縮 resp 目前的內容
+    """
+    resp.vary.add("Accept-Encoding")
+    if encoding is None:
+        return
+    resp.set_data(body if body is not None else compress(resp.get_data(), encoding))
+    resp.headers["Content-Encoding"] = encoding
+    etag, weak = resp.get_etag()
+    if etag and not weak:
+        resp.set_etag(f"{etag}-{encoding}")
+
+
+def init_app(app):
+    """註冊 after_request：壓縮較大的 JSON 回應"""
+    from flask import request
+
+    @app.after_request
+    def _compress(resp):
+        if (request.method == "HEAD" or resp.status_code != 200 or resp.is_streamed
+                or resp.direct_passthrough or "Content-Encoding" in resp.headers
+                or not resp.is_json):
+            return resp
+        if resp.content_length is not None and resp.content_length >= MIN_BYTES:
+            encode_response(resp, choose_encoding(request.accept_encodings))
+        return resp
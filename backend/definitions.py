@@ -0,0 +1,183 @@
+# backend/definitions.py
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from storage import definition_store, naive_utc
+
+# 修改字典 prompt 後調高版本號，舊定義即視為失效
+DEFINITION_VERSION = int(os.getenv("DEFINITION_VERSION", "1"))
+DEFINITION_TTL_DAYS = int(os.getenv("DEFINITION_TTL_DAYS", "90"))
+DEFINITION_CACHE_SIZE = int(os.getenv("DEFINITION_CACHE_SIZE", "5000"))
+
+
+def normalize_word(word: str) -> str:
+    """快取鍵：去除前後空白、轉小寫、合併連續空白"""
+    return " ".join(word.strip().lower().split())
+
+
+class DefinitionCache:
+    """
+    跨使用者共用的單字定義快取（short / full）：
+    - 第一層：行程內有上限的 LRU
+    - 第二層：儲存層的 definitions 集合，文件 id 為正規化後的單字
+    每筆定義帶有 version 與 createdAt，版本不符或超過 TTL 即視為未命中。
+    """
+
+    def __init__(self, maxsize=DEFINITION_CACHE_SIZE, ttl_days=DEFINITION_TTL_DAYS,
+                 version=DEFINITION_VERSION, store=None):
+        self.maxsize = maxsize
+        self.ttl = timedelta(days=ttl_days)
+        self.version = version
+        self._store = store or definition_store
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = {"memory": 0, "persistent": 0}
+        self.misses = 0
+
+    def _fresh(self, entry) -> bool:
+        return (entry.get("version") == self.version
+                and entry.get("createdAt") is not None
+                and naive_utc(entry["createdAt"]) + self.ttl > datetime.utcnow())
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._lru[key] = entry
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.maxsize:
+                self._lru.popitem(last=False)
+
+    def get(self, word):
+        """回傳 {"short", "full"}；兩層都未命中時回傳 None"""
+        key = normalize_word(word)
+        if not key:
+            return None
+
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None:
+                if self._fresh(entry):
+                    self._lru.move_to_end(key)
+                    self.hits["memory"] += 1
+                    return {"short": entry["short"], "full": entry["full"]}
+                del self._lru[key]
+
+        entry = None
+        if "/" not in key:
+            try:
+                entry = self._store.get(key)
+            except Exception:
+                entry = None
+
+        if entry is not None and self._fresh(entry):
+            self._remember(key, entry)
+            with self._lock:
+                self.hits["persistent"] += 1
+            return {"short": entry["short"], "full": entry["full"]}
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def get_many(self, words) -> dict:
+        """
+        多個單字一次查詢，回傳 {word: {"short", "full"}}（只含命中的單字）；
+        行程內未命中的以一次 get_many 查持久層
+        """
+        found, missing = {}, []
+        with self._lock:
+            for word in words:
+                key = normalize_word(word)
+                if not key:
+                    continue
+                entry = self._lru.get(key)
+                if entry is not None and self._fresh(entry):
+                    self._lru.move_to_end(key)
+                    self.hits["memory"] += 1
+                    found[word] = {"short": entry["short"], "full": entry["full"]}
+                    continue
+                self._lru.pop(key, None)
+                missing.append((word, key))
+
+        keys = [key for _, key in missing if "/" not in key]
+        try:
+            entries = self._store.get_many(keys) if keys else {}
+        except Exception:
+            entries = {}
+
+        for word, key in missing:
+            entry = entries.get(key)
+            if entry is not None and self._fresh(entry):
+                self._remember(key, entry)
+                found[word] = {"short": entry["short"], "full": entry["full"]}
+                with self._lock:
+                    self.hits["persistent"] += 1
+            else:
+                with self._lock:
+                    self.misses += 1
+        return found
+
+    def put(self, word, short, full):
+        """寫入兩層快取（只應存放成功產生的定義）"""
+        key = normalize_word(word)
+        if not key:
+            return
+        entry = {
+            "word": key,
+            "short": short,
+            "full": full,
+            "version": self.version,
+            "createdAt": datetime.utcnow()
+        }
+        self._remember(key, entry)
+        if "/" not in key:
+            try:
+                self._store.set(key, entry)
+            except Exception:
+                pass
+
+    def put_many(self, definitions):
+        """{word: (short, full)} 寫入兩層快取，持久層以一次批次寫入"""
+        now = datetime.utcnow()
+        entries = {}
+        for word, (short, full) in definitions.items():
+            key = normalize_word(word)
+            if key:
+                entries[key] = {"word": key, "short": short, "full": full, "version": self.version, "createdAt": now}
+        for key, entry in entries.items():
+            self._remember(key, entry)
+        try:
+            self._store.set_many({k: e for k, e in entries.items() if "/" not in k})
+        except Exception:
+            pass
+
+    def invalidate(self, word=None):
+        """
+        清除行程內快取；指定 word 時同時刪除持久層文件。
+        全面失效請調高 DEFINITION_VERSION。
+        """
+        with self._lock:
+            if word is None:
+                self._lru.clear()
+                return
+            key = normalize_word(word)
+            self._lru.pop(key, None)
+        if key and "/" not in key:
+            self._store.delete(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.hits["memory"] + self.hits["persistent"]
+            total = hits + self.misses
+            return {
+                "size": len(self._lru),
+                "maxsize": self.maxsize,
+                "version": self.version,
+                "memoryHits": self.hits["memory"],
+                "persistentHits": self.hits["persistent"],
+                "misses": self.misses,
+                "hitRate": hits / total if total else 0.0
+            }
+
+
+definition_cache = DefinitionCache()
@@ -0,0 +1,230 @@
+# backend/distractors.py
+"""
+測驗干擾選項：每位使用者一份預先算好的單字索引，以向量化相似度挑出「像答案」的選項
+
+索引內容（每個單字一列）：
+- 字母 n-gram 向量：前後加上邊界符號後的 2、3-gram，以 crc32 雜湊到 NGRAM_DIM 維並做 L2 正規化
+- 長度
+- 詞性：從 full 解釋中解析（n.、v.、adj. …），解析不到為空字串
+分數 = n-gram 餘弦相似度 + 同詞性加分 + 長度接近程度，整個單字本一次矩陣運算；
+以 argpartition 取前 CANDIDATE_FACTOR × k 名，再隨機抽 k 個（同一個答案每次的選項不會完全相同）。
+每題都對整個單字本計分，選取為 O(n) 線性掃描（不是次線性的近鄰索引）；
+單字本數千字時仍只是一次矩陣運算，目前的規模不需要額外的索引結構。
+單字數少於 MIN_INDEX_WORDS 時直接隨機挑選。
+
+NumPy 只在第一次出題時才載入（words/routes.py 延後匯入本模組）。
+索引在第一次出題時以 for_user(fields=["full"]) 載入，之後由 signals 增量維護；
+使用者數以 LRU 限制（DISTRACTOR_MAX_USERS），另有 TTL（DISTRACTOR_TTL）。
+"""
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+from metrics import register_collector
+from signals import word_saved, word_deleted
+from storage import word_store
+
+MAX_USERS = int(os.getenv("DISTRACTOR_MAX_USERS", "2000"))
+TTL_SECONDS = int(os.getenv("DISTRACTOR_TTL", "600"))
+NGRAM_DIM = 256
+MIN_INDEX_WORDS = 10
+CANDIDATE_FACTOR = 2
+
+# 分數權重：n-gram 相似度為主，詞性相同與長度接近為輔
+POS_WEIGHT = 0.5
+LENGTH_WEIGHT = 0.3
+
+_POS_RE = re.compile(r"(?<![A-Za-z])(n|v|vt|vi|adj|adv|prep|conj|pron|interj|int|phr|aux|det|num)\.", re.IGNORECASE)
+_POS_ALIASES = {"vt": "v", "vi": "v", "interj": "int"}
+_POS_CODES = {pos: i for i, pos in enumerate(("", "n", "v", "adj", "adv", "prep", "conj", "pron", "int", "phr",
+                                              "aux", "det", "num"))}
+
+
+def parse_pos(full) -> str:
+    """full 解釋中第一個詞性標記（如 "n. 測試" → "n"），沒有時回傳空字串"""
+    match = _POS_RE.search(full or "")
+    if not match:
+        return ""
+    pos = match.group(1).lower()
+    return _POS_ALIASES.get(pos, pos)
+
+
+def ngram_vector(word: str, dim=NGRAM_DIM) -> np.ndarray:
+    padded = f"^{word.lower()}$"
+    vec = np.zeros(dim, dtype=np.float32)
+    for n in (2, 3):
+        for i in range(len(padded) - n + 1):
+            vec[zlib.crc32(padded[i:i + n].encode()) % dim] += 1
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+class WordIndex:
+    """
+    單一使用者的單字索引；ids 為單字文件 id，也就是單字本身（測驗選項與答案沿用 id）。
+    新增、刪除只改 Python 清單，下次出題時才重建 NumPy 陣列（連續新增多個單字只重建一次）。
+    """
+
+    def __init__(self, entries=()):
+        self.ids = []
+        self._rows = {}
+        self._vectors = []
+        self._lengths = []
+        self._pos = []
+        self._lock = threading.Lock()
+        for word_id, term, pos in entries:
+            self._append(word_id, term, pos)
+        self._freeze()
+        self.loaded_at = time.monotonic()
+
+    def _append(self, word_id, term, pos):
+        self._rows[word_id] = len(self.ids)
+        self.ids.append(word_id)
+        self._vectors.append(ngram_vector(term))
+        self._lengths.append(len(term))
+        self._pos.append(_POS_CODES.get(pos, 0))
+
+    def _freeze(self):
+        self._stale = False
+        self.vectors = np.vstack(self._vectors) if self._vectors else np.zeros((0, NGRAM_DIM), dtype=np.float32)
+        self.lengths = np.asarray(self._lengths, dtype=np.float32)
+        self.pos = np.asarray(self._pos, dtype=np.int8)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def words(self) -> list:
+        with self._lock:
+            return list(self.ids)
+
+    def add(self, word_id, term, pos):
+        with self._lock:
+            if word_id not in self._rows:
+                self._append(word_id, term, pos)
+                self._stale = True
+
+    def remove(self, word_id):
+        with self._lock:
+            row = self._rows.pop(word_id, None)
+            if row is None:
+                return
+            for values in (self.ids, self._vectors, self._lengths, self._pos):
+                del values[row]
+            self._rows = {w: i for i, w in enumerate(self.ids)}
+            self._stale = True
+
+    def scores(self, word_id) -> np.ndarray:
+        """word_id 與每個單字的相似度分數（自己為 -inf）；呼叫端需持有 _lock"""
+        if self._stale:
+            self._freeze()
+        row = self._rows[word_id]
+        scores = self.vectors @ self.vectors[row]
+        if self.pos[row]:
+            scores += POS_WEIGHT * (self.pos == self.pos[row])
+        longest = np.maximum(self.lengths, self.lengths[row])
+        scores += LENGTH_WEIGHT * (1 - np.abs(self.lengths - self.lengths[row]) / longest)
+        scores[row] = -np.inf
+        return scores
+
+    def distractors(self, word_id, k=3, rng=random):
+        """回傳 k 個干擾選項（不含 word_id 本身）"""
+        with self._lock:
+            if len(self) < max(MIN_INDEX_WORDS, k + 2) or word_id not in self._rows:
+                return random_distractors(self.ids, word_id, k, rng)
+            scores = self.scores(word_id)
+            top = min(len(self) - 1, CANDIDATE_FACTOR * k)
+            candidates = np.argpartition(-scores, top - 1)[:top]
+            return [self.ids[i] for i in rng.sample(list(candidates), k)]
+
+
+def random_distractors(word_list, target, k=3, rng=random):
+    """隨機挑 k 個不等於 target 的單字（多抽一個再排除答案，不必複製整個清單）"""
+    picked = rng.sample(word_list, min(k + 1, len(word_list)))
+    return [w for w in picked if w != target][:k]
+
+
+class DistractorIndexCache:
+    def __init__(self, max_users=MAX_USERS, ttl=TTL_SECONDS, store=None):
+        self.max_users = max_users
+        self.ttl = ttl
+        self._store = store or word_store
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+
+    def get(self, user_id) -> WordIndex:
+        with self._lock:
+            index = self._users.get(user_id)
+            if index is not None and time.monotonic() - index.loaded_at > self.ttl:
+                del self._users[user_id]
+                index = None
+            if index is not None:
+                self._users.move_to_end(user_id)
+                self.hits += 1
+                return index
+
+        docs = self._store.for_user(user_id, fields=["full"])
+        index = WordIndex((word_id, word_id, parse_pos(data.get("full")))
+                          for word_id, data in docs)
+        with self._lock:
+            self.loads += 1
+            self._users[user_id] = index
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        return index
+
+    def add(self, user_id, word_id, data):
+        with self._lock:
+            index = self._users.get(user_id)
+            if index is not None:
+                index.add(word_id, word_id, parse_pos(data.get("full")))
+
+    def remove(self, user_id, word_id):
+        with self._lock:
+            index = self._users.get(user_id)
+            if index is not None:
+                index.remove(word_id)
+
+    def invalidate(self, user_id=None):
+        with self._lock:
+            if user_id is None:
+                self._users.clear()
+            else:
+                self._users.pop(user_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"users": len(self._users), "hits": self.hits, "loads": self.loads}
+
+
+distractor_index = DistractorIndexCache()
+
+
+@word_saved.connect
+def _on_word_saved(user_id, word_id, fields, created=False, **_):
+    if created:
+        distractor_index.add(user_id, word_id, fields)
+
+
+@word_deleted.connect
+def _on_word_deleted(user_id, word_id, **_):
+    distractor_index.remove(user_id, word_id)
+
+
+@register_collector
+def _index_samples():
+    stats = distractor_index.stats()
+    labels = {"cache": "distractors"}
+    return [
+        ("cache_entries", "Entries held by in-process caches", labels, stats["users"]),
+        ("cache_hits", "In-process cache hits since start", labels, stats["hits"]),
+        ("cache_misses", "In-process cache misses since start", labels, stats["loads"]),
+    ]
@@ -0,0 +1,184 @@
+# backend/due_queue.py
+"""
+每位使用者的複習佇列快取（依 dueDate 排序的 heap）
+
+/pick_words 與 /review/due 每次開 App 都會跑相同的 userId == X AND dueDate <= now 查詢。
+第一次存取時依 dueDate 載入該使用者最多 MAX_WORDS_PER_USER 個單字，之後直接由記憶體回應；
+單字寫入路徑透過 signals 更新或失效快取。
+- 使用者數以 LRU 限制（MAX_USERS），每位使用者的快取另有 TTL（DUE_QUEUE_TTL 秒）
+- signals 只在同一行程內傳遞：多個 worker（gunicorn.conf.py 預設 2 個）時，
+  另一個 worker 處理的複習不會更新本行程的快取，剛複習完的單字最多在 TTL 內仍顯示為到期。
+  因此預設 TTL 只有數秒，涵蓋同一次開啟畫面的連續請求與分頁；單一 worker 部署可調高
+- 單字數超過上限時只保留最早到期的部分，查詢時間超過已載入範圍就重新載入
+"""
+import heapq
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from signals import word_saved, word_deleted
+from storage import word_store, Increment, naive_utc
+
+MAX_USERS = int(os.getenv("DUE_QUEUE_MAX_USERS", "2000"))
+MAX_WORDS_PER_USER = int(os.getenv("DUE_QUEUE_MAX_WORDS", "2000"))
+TTL_SECONDS = float(os.getenv("DUE_QUEUE_TTL", "5"))
+
+
+def _key(due) -> float:
+    """dueDate 轉為可比較的 UTC timestamp（Firestore 回傳帶時區，程式寫入為 naive UTC）"""
+    if due is None:
+        return 0.0
+    return (naive_utc(due) - datetime(1970, 1, 1)).total_seconds()
+
+
+class _UserQueue:
+    def __init__(self, docs, complete):
+        self.entries = {}   # word_id -> 文件內容
+        self.heap = []      # (dueDate key, word_id)，過期的項目延遲清除
+        self.stale = 0
+        self.complete = complete
+        self.loaded_at = time.monotonic()
+        for word_id, data in docs:
+            self.entries[word_id] = data
+            self.heap.append((_key(data.get("dueDate")), word_id))
+        heapq.heapify(self.heap)
+        # 未完整載入時，只有排在最後一筆已載入單字（含）之前的資料可信
+        self.horizon = max(self.heap) if self.heap and not complete else None
+
+    def put(self, word_id, data):
+        old = self.entries.get(word_id)
+        if old is not None:
+            self.stale += 1
+        self.entries[word_id] = data
+        heapq.heappush(self.heap, (_key(data.get("dueDate")), word_id))
+        self._compact()
+
+    def remove(self, word_id):
+        if self.entries.pop(word_id, None) is not None:
+            self.stale += 1
+            self._compact()
+
+    def _compact(self):
+        if self.stale > len(self.entries):
+            self.heap = [(_key(d.get("dueDate")), w) for w, d in self.entries.items()]
+            heapq.heapify(self.heap)
+            self.stale = 0
+
+    def _valid(self, item):
+        data = self.entries.get(item[1])
+        return data is not None and _key(data.get("dueDate")) == item[0]
+
+    def due(self, now_key, limit, after=None):
+        """
+        回傳 (items, truncated)：items 為 dueDate <= now 的 [(word_id, data)]，依 (dueDate, id) 排序，
+        可從 after 之後接續；truncated 代表筆數不足且可能有未載入的到期單字。
+        """
+        candidates = self.heap if after is None else [x for x in self.heap if x > after]
+        items = [x for x in heapq.nsmallest(limit + self.stale, candidates) if self._valid(x)][:limit]
+        items = [x for x in items if x[0] <= now_key]
+        truncated = False
+        if self.horizon is not None:
+            items = [x for x in items if x <= self.horizon]
+            truncated = len(items) < limit and now_key >= self.horizon[0]
+        return [(w, self.entries[w]) for _, w in items], truncated
+
+
+class DueQueueCache:
+    def __init__(self, max_users=MAX_USERS, max_words=MAX_WORDS_PER_USER, ttl=TTL_SECONDS, store=None):
+        self.max_users = max_users
+        self.max_words = max_words
+        self.ttl = ttl
+        self._store = store or word_store
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+
+    def _load(self, user_id):
+        docs = self._store.by_due(user_id, self.max_words + 1)
+        complete = len(docs) <= self.max_words
+        return _UserQueue(docs[:self.max_words], complete)
+
+    def _query(self, user_id, now, limit, after):
+        """快取只載入部分單字時，超出範圍的查詢直接問儲存層（不寫入快取）"""
+        return self._store.by_due(user_id, limit, until=now, after=after)
+
+    def due_words(self, user_id, now=None, limit=10, after=None):
+        """
+        取出 dueDate <= now 的單字 [(word_id, data)]（依 dueDate 升冪）。
+        after 為 (dueDate, word_id)，用於游標分頁。
+        """
+        now = now or datetime.utcnow()
+        now_key = _key(now)
+        after_key = (_key(after[0]), after[1]) if after else None
+        with self._lock:
+            queue = self._users.get(user_id)
+            if queue is not None and time.monotonic() - queue.loaded_at > self.ttl:
+                del self._users[user_id]
+                queue = None
+            if queue is not None:
+                self._users.move_to_end(user_id)
+                self.hits += 1
+                items, truncated = queue.due(now_key, limit, after_key)
+
+        if queue is None:
+            queue = self._load(user_id)
+            with self._lock:
+                self.loads += 1
+                self._users[user_id] = queue
+                self._users.move_to_end(user_id)
+                while len(self._users) > self.max_users:
+                    self._users.popitem(last=False)
+                items, truncated = queue.due(now_key, limit, after_key)
+
+        if truncated:
+            return self._query(user_id, now, limit, after)
+        return items
+
+    def update(self, user_id, word_id, fields, created=False):
+        """套用寫入；只有部分欄位且快取中沒有該單字時，整個使用者失效重新載入"""
+        with self._lock:
+            queue = self._users.get(user_id)
+            if queue is None:
+                return
+            old = queue.entries.get(word_id)
+            if old is None and not created:
+                del self._users[user_id]
+                return
+            data = {} if created or old is None else dict(old)
+            for k, v in fields.items():
+                if isinstance(v, Increment):
+                    v = (data.get(k) or 0) + v.value
+                data[k] = v
+            queue.put(word_id, data)
+
+    def remove(self, user_id, word_id):
+        with self._lock:
+            queue = self._users.get(user_id)
+            if queue is not None:
+                queue.remove(word_id)
+
+    def invalidate(self, user_id=None):
+        with self._lock:
+            if user_id is None:
+                self._users.clear()
+            else:
+                self._users.pop(user_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"users": len(self._users), "hits": self.hits, "loads": self.loads}
+
+
+due_queue = DueQueueCache()
+
+
+@word_saved.connect
+def _on_word_saved(user_id, word_id, fields, created=False, **_):
+    due_queue.update(user_id, word_id, fields, created)
+
+
+@word_deleted.connect
+def _on_word_deleted(user_id, word_id, **_):
+    due_queue.remove(user_id, word_id)
@@ -0,0 +1,256 @@
+# backend/fit_sm2.py
+"""
+離線擬合每位使用者的 SM-2 參數（sm2.DEFAULT_PARAMS 的四個值），結果寫入 users/{uid}.sm2Params
+
+於 backend/ 目錄執行（儲存後端依 STORAGE_BACKEND，預設 Firestore，需 GOOGLE_APPLICATION_CREDENTIALS）：
+    python -m fit_sm2                   # 擬合並寫回
+    python -m fit_sm2 --dry-run         # 只輸出統計，不寫入
+    python -m fit_sm2 --target 0.85     # 目標記憶保留率（預設 SM2_TARGET_RETENTION=0.9）
+
+流程：
+1. review_log_store.scan() 讀入全部複習事件，逐批放進 array.array 緩衝，最後一次轉成 NumPy 陣列
+   （使用者、單字以整數編碼，時間以天為單位的 float64）
+2. 以 user_store.get_many 讀取各使用者目前的 sm2Params
+3. fit()：依 (單字, 時間) 排序後整個陣列一起計算，以 np.bincount 依使用者彙總
+4. 複習數達 --min-reviews 的使用者以 merge_many 批次寫回；其餘維持預設值
+擬合本身只有陣列運算，數百萬筆事件在單核心上數秒內完成；主要時間花在讀取紀錄。
+"""
+import argparse
+import math
+import os
+import time
+from array import array
+from datetime import datetime
+
+import numpy as np
+
+from sm2 import DEFAULT_PARAMS, user_params
+
+TARGET_RETENTION = float(os.getenv("SM2_TARGET_RETENTION", "0.9"))
+MIN_REVIEWS = int(os.getenv("SM2_FIT_MIN_REVIEWS", "30"))
+# 收縮強度：相當於多少筆「剛好符合預設值」的虛擬複習
+PRIOR_REVIEWS = 50
+PRIOR_WORDS = 20
+MIN_WORD_REVIEWS = 3       # 單字至少複習這麼多次，目前的 EF 才納入 initialEase 的中位數
+MAX_LATENESS = 4.0         # 實際間隔 / 排定間隔的上限，避免久未開 App 的複習主導估計
+SAVE_CHUNK = 2000
+
+# 各參數的合理範圍
+RANGES = {
+    "initialEase": (1.3, 3.0),
+    "minEase": (1.1, 1.6),
+    "quickBonus": (0.01, 0.1),
+    "intervalModifier": (0.5, 2.0),
+}
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _days(dt) -> float:
+    """datetime → 1970 起的天數；Firestore 回傳帶時區的時間，程式寫入為 naive UTC"""
+    if dt is None:
+        return math.nan
+    if dt.tzinfo is not None:
+        return dt.timestamp() / 86400
+    return (dt - _EPOCH).total_seconds() / 86400
+
+
+def load_events(batches):
+    """
+    batches：可迭代的 (user_id, [event, ...])（ReviewLogStore.scan()）
+    回傳 (events, user_ids)：events 為等長陣列的 dict
+    （user、word、t、quality、prevInterval、prevEase、prevDue、easeFactor），user_ids[user] 為原本的 id
+    """
+    user_codes, word_codes = {}, {}
+    cols = {"user": array("i"), "word": array("i"), "t": array("d"), "quality": array("b"),
+            "prevInterval": array("i"), "prevEase": array("d"), "prevDue": array("d"), "easeFactor": array("d")}
+    default_ease = DEFAULT_PARAMS["initialEase"]
+    for user_id, events in batches:
+        user = user_codes.setdefault(user_id, len(user_codes))
+        for e in events:
+            cols["user"].append(user)
+            cols["word"].append(word_codes.setdefault((user, e["wordId"]), len(word_codes)))
+            cols["t"].append(_days(e["reviewedAt"]))
+            cols["quality"].append(e["quality"])
+            cols["prevInterval"].append(e.get("prevInterval") or 0)
+            cols["prevEase"].append(e.get("prevEase") or default_ease)
+            cols["prevDue"].append(_days(e.get("prevDue")))
+            cols["easeFactor"].append(e.get("easeFactor") or default_ease)
+    events = {name: np.frombuffer(buf, dtype=buf.typecode) if len(buf) else np.zeros(0, dtype=buf.typecode)
+              for name, buf in cols.items()}
+    return events, list(user_codes)
+
+
+def current_params(stored_by_user, user_ids):
+    """各使用者目前的參數陣列；fittedAt 為上次擬合的時間（天），沒有時為 -inf"""
+    params = {key: np.empty(len(user_ids)) for key in (*DEFAULT_PARAMS, "fittedAt")}
+    for i, user_id in enumerate(user_ids):
+        stored = (stored_by_user.get(user_id) or {}).get("sm2Params") or {}
+        for key, value in user_params(stored).items():
+            params[key][i] = value
+        fitted = stored.get("fittedAt")
+        params["fittedAt"][i] = _days(fitted) if isinstance(fitted, datetime) else -math.inf
+    return params
+
+
+def _rate(users, fails, exposure, mask, n_users, prior_rate, prior_weight=PRIOR_REVIEWS):
+    """
+    各使用者的遺忘率 k（記得的機率 R = exp(-k·x)）：失敗比例 p 與平均 x，k = -ln(1 - p) / x̄；
+    另加 prior_weight 筆 x = 1、遺忘率為 prior_rate 的虛擬複習，資料少時接近 prior_rate
+    """
+    n = np.bincount(users[mask], minlength=n_users)
+    f = np.bincount(users[mask], weights=fails[mask], minlength=n_users)
+    e = np.bincount(users[mask], weights=exposure[mask], minlength=n_users)
+    p = (f + prior_weight * -np.expm1(-prior_rate)) / (n + prior_weight)
+    return -np.log1p(-p) * (n + prior_weight) / (e + prior_weight)
+
+
+def _group_median(groups, values, n_groups):
+    """每組的中位數與筆數；沒有資料的組為 nan"""
+    order = np.lexsort((values, groups))
+    values = values[order]
+    counts = np.bincount(groups, minlength=n_groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    medians = np.full(n_groups, np.nan)
+    has = counts > 0
+    lo, hi = starts + (counts - 1) // 2, starts + counts // 2
+    medians[has] = (values[lo[has]] + values[hi[has]]) / 2
+    return medians, counts
+
+
+def fit(events, current, target=TARGET_RETENTION):
+    """
+    回傳 (params, reviews)：params 為四個參數的陣列 dict，reviews 為各使用者用於擬合的複習數。
+
+    每筆複習的 x = 距上次複習的天數 / 排定的間隔（prevInterval）；上次複習時間取同一單字的前一筆事件，
+    沒有時以 prevDue - prevInterval 推算。遺忘模型 R = exp(-k·x)，目標是在排定的日期 R = target，
+    也就是 k0 = -ln(target)。只用上次擬合之後的複習（在目前參數下的表現），以比例修正目前的參數，
+    重複擬合會收斂而不會來回擺盪：
+    - intervalModifier × k0 / k：整體忘得比目標快就縮短間隔
+    - minEase：EF 已在下限的單字（最難的單字）另估 k_floor，成長幅度 (minEase - 1) × k / k_floor
+    - quickBonus：短間隔就答 5 之後的那次複習另估 k_quick，quickBonus × k / k_quick
+    - initialEase：複習過 MIN_WORD_REVIEWS 次以上的單字目前 EF 的中位數，向預設值收縮
+    """
+    n_users = len(current["fittedAt"])
+    order = np.lexsort((events["t"], events["word"]))
+    users = events["user"][order]
+    words = events["word"][order]
+    t = events["t"][order]
+    quality = events["quality"][order]
+    prev_interval = events["prevInterval"][order].astype(np.float64)
+    prev_ease = events["prevEase"][order]
+    ease = events["easeFactor"][order]
+
+    same_word = np.zeros(t.size, dtype=bool)
+    same_word[1:] = words[1:] == words[:-1]
+    last_review = np.full(t.size, np.nan)
+    last_review[1:] = t[:-1]
+    with np.errstate(invalid="ignore"):
+        inferred = np.where(prev_interval > 0, events["prevDue"][order] - prev_interval, np.nan)
+        elapsed = t - np.where(same_word, last_review, inferred)
+        scheduled = (prev_interval >= 1) & (elapsed > 0)
+    exposure = np.zeros(t.size)
+    exposure[scheduled] = np.minimum(elapsed[scheduled] / prev_interval[scheduled], MAX_LATENESS)
+    fails = (quality < 3).astype(np.float64)
+    live = scheduled & (t > current["fittedAt"][users])
+
+    k0 = -math.log(target)
+    k = _rate(users, fails, exposure, live, n_users, k0)
+    reviews = np.bincount(users[live], minlength=n_users)
+
+    at_floor = live & (prev_ease <= current["minEase"][users] + 1e-6)
+    k_floor = _rate(users, fails, exposure, at_floor, n_users, k)
+    after_quick = np.zeros(t.size, dtype=bool)
+    after_quick[1:] = (quality[:-1] == 5) & (prev_interval[:-1] < 6)
+    k_quick = _rate(users, fails, exposure, live & same_word & after_quick, n_users, k)
+
+    params = {
+        "intervalModifier": current["intervalModifier"] * k0 / k,
+        "minEase": 1 + (current["minEase"] - 1) * k / k_floor,
+        "quickBonus": current["quickBonus"] * k / k_quick,
+    }
+
+    last_of_word = np.ones(t.size, dtype=bool)
+    last_of_word[:-1] = ~same_word[1:]
+    word_reviews = np.bincount(words, minlength=int(words.max()) + 1 if words.size else 0)
+    settled = last_of_word & (word_reviews[words] >= MIN_WORD_REVIEWS)
+    medians, counts = _group_median(users[settled], ease[settled], n_users)
+    default = DEFAULT_PARAMS["initialEase"]
+    params["initialEase"] = (np.where(counts > 0, medians, default) * counts + default * PRIOR_WORDS) \
+        / (counts + PRIOR_WORDS)
+
+    for key, (low, high) in RANGES.items():
+        params[key] = np.clip(params[key], low, high)
+    params["initialEase"] = np.maximum(params["initialEase"], params["minEase"])
+    return params, reviews
+
+
+def results(params, reviews, user_ids, min_reviews=MIN_REVIEWS, now=None):
+    """複習數達 min_reviews 的使用者 → {user_id: sm2Params}"""
+    now = now or datetime.utcnow()
+    fitted = {}
+    for i in np.flatnonzero(reviews >= min_reviews):
+        fitted[user_ids[i]] = {
+            **{key: round(float(params[key][i]), 4) for key in DEFAULT_PARAMS},
+            "reviews": int(reviews[i]),
+            "fittedAt": now
+        }
+    return fitted
+
+
+def run(review_log, users, target=TARGET_RETENTION, min_reviews=MIN_REVIEWS, dry_run=False):
+    """讀取、擬合、寫回；回傳統計 dict"""
+    started = time.perf_counter()
+    events, user_ids = load_events(review_log.scan())
+    loaded = time.perf_counter()
+
+    stored = {}
+    for i in range(0, len(user_ids), SAVE_CHUNK):
+        stored.update(users.get_many(user_ids[i:i + SAVE_CHUNK], fields=["sm2Params"]))
+    params, reviews = fit(events, current_params(stored, user_ids), target)
+    fitted = results(params, reviews, user_ids, min_reviews)
+    computed = time.perf_counter()
+
+    if not dry_run:
+        items = list(fitted.items())
+        for i in range(0, len(items), SAVE_CHUNK):
+            users.merge_many({user_id: {"sm2Params": p} for user_id, p in items[i:i + SAVE_CHUNK]})
+    return {
+        "events": int(events["t"].size),
+        "users": len(user_ids),
+        "fitted": len(fitted),
+        "loadSeconds": round(loaded - started, 2),
+        "fitSeconds": round(computed - loaded, 2),
+        "saveSeconds": round(time.perf_counter() - computed, 2),
+        "params": fitted,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="依複習紀錄擬合每位使用者的 SM-2 參數")
+    parser.add_argument("--target", type=float, default=TARGET_RETENTION, help="目標記憶保留率（0~1）")
+    parser.add_argument("--min-reviews", type=int, default=MIN_REVIEWS, help="至少需要的複習數")
+    parser.add_argument("--dry-run", action="store_true", help="只統計，不寫入")
+    args = parser.parse_args()
+    if not 0 < args.target < 1:
+        parser.error("--target must be between 0 and 1")
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    from storage import review_log_store, user_store
+
+    stats = run(review_log_store, user_store, args.target, args.min_reviews, args.dry_run)
+    fitted = stats.pop("params")
+    rate = stats["events"] / stats["loadSeconds"] if stats["loadSeconds"] else 0.0
+    print(f"events {stats['events']}  users {stats['users']}  fitted {stats['fitted']}  "
+          f"load {stats['loadSeconds']}s ({rate:.0f} events/s)  fit {stats['fitSeconds']}s  "
+          f"save {stats['saveSeconds']}s")
+    if fitted:
+        for key in DEFAULT_PARAMS:
+            values = np.asarray([p[key] for p in fitted.values()])
+            print(f"{key:18s} p10 {np.percentile(values, 10):.3f}  median {np.median(values):.3f}  "
+                  f"p90 {np.percentile(values, 90):.3f}")
+
+
+if __name__ == "__main__":
+    main()
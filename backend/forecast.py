@@ -0,0 +1,158 @@
+# backend/forecast.py
+"""
+複習量預測：以 NumPy 向量化模擬 SM-2 排程
+
+對使用者（或全站）所有單字同時推進 sm2.next_interval / due_date_from_interval 的動態，
+每天只做一次陣列運算，估計未來每天的複習次數。回答品質依給定的機率分布抽樣，
+可用多次試驗（trials）取平均降低變異。
+
+離線容量規劃（於 backend/ 目錄，需 GOOGLE_APPLICATION_CREDENTIALS）：
+    python -m forecast --days 90 --trials 5
+"""
+import argparse
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from sm2 import DEFAULT_PARAMS
+from storage import naive_utc
+
+# quality 0~5 的預設機率分布
+DEFAULT_QUALITY_PROBS = (0.05, 0.05, 0.10, 0.20, 0.35, 0.25)
+MAX_DAYS = 365
+
+
+def next_interval_array(intervals, qualities, efs, params=None):
+    """
+    向量化版 sm2.next_interval，三個等長陣列逐元素計算，結果與純量版完全一致。
+    回傳 (new_intervals: int64 陣列, new_efs: float64 陣列)
+    """
+    params = params or DEFAULT_PARAMS
+    modifier = params["intervalModifier"]
+    intervals = np.asarray(intervals, dtype=np.int64)
+    qualities = np.asarray(qualities, dtype=np.int64)
+    efs = np.asarray(efs, dtype=np.float64)
+
+    grown = np.maximum((intervals * efs * modifier).astype(np.int64), intervals + 1)  # int() 對正數即為無條件捨去
+    new_intervals = np.where(intervals == 0, 1, np.where(intervals == 1, max(int(6 * modifier), 2), grown))
+    new_intervals = np.where(qualities < 3, 1, new_intervals)
+
+    miss = 5 - qualities
+    new_efs = efs + (0.1 - miss * (0.08 + miss * 0.02))
+    new_efs = np.where((qualities == 5) & (intervals < 6), efs + params["quickBonus"], new_efs)
+    new_efs = np.maximum(new_efs, params["minEase"])
+    return new_intervals, new_efs
+
+
+def parse_quality_probs(spec):
+    """'0.05,0.05,0.1,0.2,0.35,0.25' → 正規化後的 6 個機率；格式錯誤拋 ValueError"""
+    if not spec:
+        return np.asarray(DEFAULT_QUALITY_PROBS)
+    probs = np.asarray([float(p) for p in spec.split(",")], dtype=np.float64)
+    if probs.shape != (6,) or not np.isfinite(probs).all() or (probs < 0).any() or probs.sum() <= 0:
+        raise ValueError("quality must be 6 finite non-negative numbers for quality 0~5")
+    return probs / probs.sum()
+
+
+def simulate(last_intervals, efs, due_in_days, days=30, quality_probs=DEFAULT_QUALITY_PROBS,
+             trials=1, seed=None, params=None):
+    """
+    模擬未來 days 天每天的預期複習數（trials 次平均）。
+    - last_intervals / efs：各單字目前的 lastInterval、easeFactor
+    - due_in_days：距今幾天到期（可為負，逾期單字在第 0 天複習）
+    - params：SM-2 參數（sm2.DEFAULT_PARAMS 或使用者擬合的結果）
+    回傳長度為 days 的 float64 陣列
+    """
+    rng = np.random.default_rng(seed)
+    probs = np.asarray(quality_probs, dtype=np.float64)
+    probs = probs / probs.sum()
+
+    # 每次試驗複製一份狀態，一起向量化推進
+    intervals = np.tile(np.asarray(last_intervals, dtype=np.int64), trials)
+    ef = np.tile(np.asarray(efs, dtype=np.float64), trials)
+    due = np.tile(np.maximum(np.floor(np.asarray(due_in_days, dtype=np.float64)), 0).astype(np.int64), trials)
+
+    counts = np.zeros(days, dtype=np.float64)
+    for day in range(days):
+        idx = np.flatnonzero(due == day)
+        if idx.size == 0:
+            continue
+        counts[day] = idx.size
+        qualities = rng.choice(6, size=idx.size, p=probs)
+        new_intervals, new_efs = next_interval_array(intervals[idx], qualities, ef[idx], params)
+        intervals[idx] = new_intervals
+        ef[idx] = new_efs
+        due[idx] = day + new_intervals
+
+    return counts / trials
+
+
+def word_state_arrays(word_dicts, now=None):
+    """把 Firestore 單字文件轉為 simulate 所需的三個陣列"""
+    now = now or datetime.utcnow()
+    intervals, efs, due_in_days = [], [], []
+    for w in word_dicts:
+        intervals.append(w.get("lastInterval") or 0)
+        efs.append(w.get("easeFactor") or 2.5)
+        due = w.get("dueDate")
+        if due is None:
+            due_in_days.append(0.0)
+            continue
+        due_in_days.append((naive_utc(due) - now).total_seconds() / 86400)
+    return (np.asarray(intervals, dtype=np.int64),
+            np.asarray(efs, dtype=np.float64),
+            np.asarray(due_in_days, dtype=np.float64))
+
+
+def forecast_days(counts, start=None):
+    """模擬結果轉為 [{"date": "YYYY-MM-DD", "reviews": n}, ...]"""
+    start = (start or datetime.utcnow()).date()
+    return [
+        {"date": (start + timedelta(days=i)).isoformat(), "reviews": round(float(c), 2)}
+        for i, c in enumerate(counts)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="全站複習量預測（容量規劃）")
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--trials", type=int, default=3)
+    parser.add_argument("--quality", default=None, help="6 個機率，對應 quality 0~5")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    import os
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    if not firebase_admin._apps:
+        firebase_admin.initialize_app(credentials.Certificate(os.getenv("GOOGLE_APPLICATION_CREDENTIALS")))
+    db = firestore.client()
+
+    # users/{uid}/words 與遷移期間仍存在的舊 words 集合同屬 "words" collection group；
+    # 同一使用者的同一單字以新路徑為準
+    from storage.base import legacy_word_id
+    docs = db.collection_group("words").select(["userId", "lastInterval", "easeFactor", "dueDate"]).stream()
+    by_key = {}
+    for d in docs:
+        data = d.to_dict()
+        user_id = data.get("userId") or ""
+        key = (user_id, legacy_word_id(user_id, d.id))
+        if key not in by_key or d.reference.parent.parent is not None:
+            by_key[key] = data
+    words = list(by_key.values())
+    users = {w.get("userId") for w in words}
+    intervals, efs, due_in_days = word_state_arrays(words)
+    counts = simulate(intervals, efs, due_in_days, min(args.days, MAX_DAYS),
+                      parse_quality_probs(args.quality), args.trials, args.seed)
+
+    print(f"users: {len(users)}  words: {len(words)}")
+    for row in forecast_days(counts):
+        print(f"{row['date']}  {row['reviews']:10.1f}")
+    print(f"peak: {counts.max():.1f}/day  mean: {counts.mean():.1f}/day")
+
+
+if __name__ == "__main__":
+    main()
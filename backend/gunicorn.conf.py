@@ -0,0 +1,29 @@
+# backend/gunicorn.conf.py
+"""
+正式環境同步模式：
+    gunicorn -c gunicorn.conf.py app:app
+
+preload_app 讓 master 先匯入 app 與較重的模組（openai、NumPy、CMU 字典），
+worker 以 copy-on-write 共用，fork 後不必各自再花數秒載入。
+Firestore / OpenAI 連線在 fork 前不會建立（gRPC 與 httpx 連線不可跨 fork 共用），
+post_fork 再保險清除一次，由各 worker 第一次使用時建立。
+"""
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+
+
+def on_starting(server):
+    if preload_app:
+        from clients import preload
+        preload()
+
+
+def post_fork(server, worker):
+    from clients import reset
+    reset()
@@ -1,5 +1,10 @@
 # backend/lexile.py
-import textstat
+from readability import analyze, analyze_many
+
+# 根據實證研究的線性映射參數
+SLOPE = (1010 - 850) / (8.9 - 5.9)  # 約 53.33
+INTERCEPT = 850 - SLOPE * 5.9        # 約 535.3
+
 
 def approximate_lexile(text: str) -> int:
     """
@@ -20,21 +25,17 @@ def approximate_lexile(text: str) -> int:
       DOI:10.1053/j.ajkd.2014.11.025 (Source: PubMed)
 
     注意: Lexile Framework 的原始算法為專利，本函式僅根據公開研究做近似映射。
+    四個指標由 readability.analyze 單次掃描計算。
     """
-    # 1. 計算各指標年級等級
-    fk_grade = textstat.flesch_kincaid_grade(text)
-    fog_index = textstat.gunning_fog(text)
-    dale_chall = textstat.dale_chall_readability_score(text)
-    smog = textstat.smog_index(text)
-
-    # 2. 計算平均年級等級
-    avg_grade = (fk_grade + fog_index + dale_chall + smog) / 4.0
-
-    # 3. 根據實證研究映射
-    slope = (1010 - 850) / (8.9 - 5.9)  # 約 53.33
-    intercept = 850 - slope * 5.9        # 約 535.3
-    lexile = int(avg_grade * slope + intercept)
-
-    # 4. 限制結果範圍
-    lexile = max(200, min(2000, lexile))
-    return lexile
\ No newline at end of file
+    return grade_to_lexile(analyze(text)["grade"])
+
+
+def approximate_lexile_many(texts) -> list:
+    """批次版 approximate_lexile，適合重新評分整個文章庫"""
+    return [grade_to_lexile(s["grade"]) for s in analyze_many(texts)]
+
+
+def grade_to_lexile(avg_grade: float) -> int:
+    """將平均年級等級映射為 Lexile 分數，並限制在 200–2000"""
+    lexile = int(avg_grade * SLOPE + INTERCEPT)
+    return max(200, min(2000, lexile))
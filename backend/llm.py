@@ -0,0 +1,377 @@
+# backend/llm.py
+"""
+所有 GPT 呼叫的單一出口（同步 blueprint 與 asgi.py 共用）
+
+- 每個呼叫點（site）有自己的 model、max_tokens、並行上限、期限與是否 hedge，
+  可用環境變數覆寫，例如 LLM_DEFINITION_MODEL、LLM_ARTICLE_MAX_TOKENS、
+  LLM_QUIZ_SENTENCE_CONCURRENCY、LLM_ARTICLE_DEADLINE、LLM_DEFINITION_HEDGE=0
+- 並行上限：每個 site 一個 semaphore，等待超過 LLM_QUEUE_WAIT 秒仍拿不到名額就拋 LLMBusy，
+  由端點回 503 + Retry-After，而不是讓 request 執行緒一直卡在 GPT 前面
+- 期限：整次呼叫（含重試與退避）的總時間上限，每次嘗試的 timeout 取剩餘時間
+- 429 / 5xx / 連線逾時以 full jitter 指數退避重試（最多 LLM_MAX_RETRIES 次）；
+  429 時該 model 進入冷卻（優先採用 Retry-After），冷卻期間的新呼叫若等不到冷卻結束就直接拋 LLMBusy，
+  限流風暴時快速失敗，不會堆積被卡住的 worker
+- hedge：開啟的 site 在呼叫超過該 site 近期 p95 延遲仍未回應時，再送一個相同請求，取先完成者；
+  hedge 請求數另有上限（LLM_HEDGE_WORKERS），只用在短小的呼叫（定義、單題句子），串流不 hedge
+
+連線池與 SDK 設定（關閉 SDK 自帶的重試，改由本模組負責）見 clients.py。
+"""
+import asyncio
+import contextvars
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, TimeoutError as FutureTimeout, wait
+
+import clients
+from metrics import register_collector, LLM_RETRIES, LLM_REJECTED, LLM_HEDGES
+
+QUEUE_WAIT = float(os.getenv("LLM_QUEUE_WAIT", "2"))
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+BACKOFF_CAP = float(os.getenv("LLM_BACKOFF_CAP", "8"))
+HEDGE_WORKERS = int(os.getenv("LLM_HEDGE_WORKERS", "16"))
+HEDGE_MIN_SAMPLES = 20       # 累積足夠樣本後才估 p95 並開始 hedge
+LATENCY_WINDOW = 200         # p95 取最近幾次成功呼叫
+MIN_ATTEMPT_SECONDS = 0.5    # 剩餘期限不足此值就不再重試
+
+
+class LLMBusy(Exception):
+    """並行名額已滿或 model 正在限流冷卻；retry_after 為建議的重試秒數"""
+
+    def __init__(self, retry_after=1.0):
+        super().__init__("LLM busy")
+        self.retry_after = max(1, int(retry_after + 0.999))
+
+
+class Site:
+    def __init__(self, name, model="gpt-4o", max_tokens=400, concurrency=8, deadline=30.0, hedge=False):
+        prefix = f"LLM_{name.upper()}_"
+        self.name = name
+        self.model = os.getenv(prefix + "MODEL", model)
+        self.max_tokens = int(os.getenv(prefix + "MAX_TOKENS", max_tokens))
+        self.concurrency = int(os.getenv(prefix + "CONCURRENCY", concurrency))
+        self.deadline = float(os.getenv(prefix + "DEADLINE", deadline))
+        self.hedge = os.getenv(prefix + "HEDGE", "1" if hedge else "0") == "1"
+        self.slots = threading.BoundedSemaphore(self.concurrency)
+        self.in_flight = 0
+        self._async_slots = None
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._p95 = None
+        self._lock = threading.Lock()
+
+    def async_slots(self):
+        """asyncio.Semaphore 綁定 event loop，第一次在 loop 內使用時才建立"""
+        if self._async_slots is None:
+            self._async_slots = asyncio.Semaphore(self.concurrency)
+        return self._async_slots
+
+    def observe(self, seconds):
+        with self._lock:
+            self._latencies.append(seconds)
+            # 每 10 筆重算一次 p95，排序 200 個數字的成本不必每次付
+            if len(self._latencies) >= HEDGE_MIN_SAMPLES and len(self._latencies) % 10 == 0:
+                ordered = sorted(self._latencies)
+                self._p95 = ordered[int(len(ordered) * 0.95) - 1]
+
+    def hedge_delay(self):
+        """送出 hedge 前等待的秒數；未開啟或樣本不足時為 None"""
+        return self._p95 if self.hedge else None
+
+
+SITES = {site.name: site for site in (
+    Site("article", max_tokens=400, concurrency=8, deadline=60),
+    # 背景預產文章（article_pool.py）：並行上限低，不與即時請求搶 GPT 名額
+    Site("article_prefetch", max_tokens=400, concurrency=2, deadline=60),
+    Site("definition", max_tokens=150, concurrency=16, deadline=20, hedge=True),
+    # 單字匯入（word_import.py）：一次定義一組單字，max_tokens 依單字數另外指定
+    Site("definition_batch", max_tokens=4000, concurrency=4, deadline=90),
+    Site("quiz_batch", max_tokens=800, concurrency=8, deadline=15),
+    Site("quiz_sentence", max_tokens=80, concurrency=16, deadline=15, hedge=True),
+)}
+
+_cooldowns = {}          # model -> 冷卻結束的 time.monotonic()
+_hedge_slots = threading.BoundedSemaphore(HEDGE_WORKERS)
+_hedge_pool = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="llm-hedge")
+
+
+# ---- 重試、冷卻與名額 ----
+
+def _status(exc):
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status
+
+
+def _retry_reason(exc):
+    """可重試的錯誤回傳原因標籤（429 / 5xx / timeout），否則 None"""
+    status = _status(exc)
+    if status == 429:
+        return "429"
+    if status is not None:
+        return "5xx" if status >= 500 else None
+    openai = sys.modules.get("openai")
+    if openai is not None and isinstance(exc, openai.APIConnectionError):
+        return "timeout"
+    if isinstance(exc, (TimeoutError, ConnectionError, FutureTimeout, asyncio.TimeoutError)):
+        return "timeout"
+    return None
+
+
+def _retry_after(exc):
+    """讀取 429 回應的 Retry-After（秒）；沒有時回傳 None"""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return float(value) * scale
+        except ValueError:
+            continue
+    return None
+
+
+def _retry_delay(site, exc, attempt, deadline):
+    """
+    決定是否重試：回傳退避秒數，不重試時回傳 None。
+    429 會讓 model 進入冷卻，其他呼叫也會等到冷卻結束（或直接拋 LLMBusy）。
+    """
+    reason = _retry_reason(exc)
+    if reason is None or attempt >= MAX_RETRIES:
+        return None
+    delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+    if reason == "429":
+        hinted = _retry_after(exc)
+        if hinted is not None:
+            delay = max(delay, hinted)
+        _cooldowns[site.model] = max(_cooldowns.get(site.model, 0), time.monotonic() + delay)
+    if time.monotonic() + delay + MIN_ATTEMPT_SECONDS > deadline:
+        return None
+    LLM_RETRIES.inc(1, site.name, reason)
+    return delay
+
+
+def _cooldown_wait(site, deadline):
+    """model 冷卻中時回傳需等待的秒數；等不到冷卻結束就拋 LLMBusy"""
+    wait_for = _cooldowns.get(site.model, 0) - time.monotonic()
+    if wait_for <= 0:
+        return 0
+    if time.monotonic() + wait_for + MIN_ATTEMPT_SECONDS > deadline:
+        LLM_REJECTED.inc(1, site.name, "cooldown")
+        raise LLMBusy(wait_for)
+    return wait_for
+
+
+def _acquire(site, deadline):
+    wait_for = min(QUEUE_WAIT, max(0, deadline - time.monotonic()))
+    if not site.slots.acquire(timeout=wait_for):
+        LLM_REJECTED.inc(1, site.name, "concurrency")
+        raise LLMBusy(QUEUE_WAIT)
+    with site._lock:
+        site.in_flight += 1
+
+
+def _release(site):
+    with site._lock:
+        site.in_flight -= 1
+    site.slots.release()
+
+
+def _request(site, messages, options):
+    request = {"model": site.model, "messages": messages, "max_tokens": site.max_tokens}
+    request.update(options)
+    return request
+
+
+# ---- 同步 ----
+
+def _create(site, request, timeout):
+    start = time.monotonic()
+    response = clients.openai_client().chat.completions.create(**request, timeout=timeout)
+    site.observe(time.monotonic() - start)
+    return response.choices[0].message.content
+
+
+def _submit(fn, *args):
+    """在 hedge 執行緒池執行（保留目前請求的 metrics span）；池已滿時回傳 None"""
+    if not _hedge_slots.acquire(blocking=False):
+        return None
+    future = _hedge_pool.submit(contextvars.copy_context().run, fn, *args)
+    future.add_done_callback(lambda _: _hedge_slots.release())
+    return future
+
+
+def _hedged(site, request, deadline):
+    """單次嘗試；超過 p95 仍未回應時再送一個相同請求，取先成功者"""
+    remaining = deadline - time.monotonic()
+    delay = site.hedge_delay()
+    primary = None
+    if delay is not None and delay < remaining:
+        primary = _submit(_create, site, request, remaining)
+    if primary is None:
+        return _create(site, request, remaining)
+
+    try:
+        return primary.result(timeout=delay)
+    except FutureTimeout:
+        pass
+    backup = _submit(_create, site, request, deadline - time.monotonic())
+    if backup is None:
+        return primary.result(timeout=max(0, deadline - time.monotonic()))
+    LLM_HEDGES.inc(1, site.name)
+
+    pending = {primary, backup}
+    while pending:
+        done, pending = wait(pending, timeout=max(0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+        if not done:
+            raise FutureTimeout()
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+    return primary.result()
+
+
+def _with_retries(site, deadline, attempt_fn):
+    attempt = 0
+    while True:
+        pause = _cooldown_wait(site, deadline)
+        if pause:
+            time.sleep(pause)
+        try:
+            return attempt_fn()
+        except Exception as e:
+            delay = _retry_delay(site, e, attempt, deadline)
+            if delay is None:
+                raise
+        attempt += 1
+        time.sleep(delay)
+
+
+def complete(site_name, messages, **options):
+    """
+    呼叫 chat completions 並回傳文字內容。
+    options 會覆寫 site 的預設值（例如 max_tokens、response_format）。
+    名額已滿或限流冷卻中拋 LLMBusy；重試用盡時拋出最後一次的錯誤。
+    """
+    site = SITES[site_name]
+    deadline = time.monotonic() + site.deadline
+    request = _request(site, messages, options)
+    _cooldown_wait(site, deadline)
+    _acquire(site, deadline)
+    try:
+        return _with_retries(site, deadline, lambda: _hedged(site, request, deadline))
+    finally:
+        _release(site)
+
+
+def stream(site_name, messages, **options):
+    """
+    串流版 complete：依序產生文字片段。
+    名額與期限在第一次取值時才檢查；重試只發生在收到任何片段之前。
+    """
+    site = SITES[site_name]
+    deadline = time.monotonic() + site.deadline
+    request = _request(site, messages, options)
+    request.update(stream=True, stream_options={"include_usage": True})
+    _cooldown_wait(site, deadline)
+    _acquire(site, deadline)
+    try:
+        chunks = _with_retries(site, deadline, lambda: clients.openai_client().chat.completions.create(
+            **request, timeout=max(0, deadline - time.monotonic())))
+        for chunk in chunks:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
+    finally:
+        _release(site)
+
+
+# ---- async（asgi.py） ----
+
+async def _acreate(site, request, timeout):
+    start = time.monotonic()
+    response = await clients.async_openai_client().chat.completions.create(**request, timeout=timeout)
+    site.observe(time.monotonic() - start)
+    return response.choices[0].message.content
+
+
+async def _ahedged(site, request, deadline):
+    remaining = deadline - time.monotonic()
+    delay = site.hedge_delay()
+    primary = asyncio.ensure_future(_acreate(site, request, remaining))
+    if delay is None or delay >= remaining:
+        return await primary
+
+    done, _ = await asyncio.wait({primary}, timeout=delay)
+    if done:
+        return primary.result()
+    LLM_HEDGES.inc(1, site.name)
+    backup = asyncio.ensure_future(_acreate(site, request, deadline - time.monotonic()))
+    pending = {primary, backup}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, timeout=max(0, deadline - time.monotonic()),
+                                               return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                raise asyncio.TimeoutError()
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+        return primary.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def acomplete(site_name, messages, **options):
+    """async 版 complete；等待 GPT 與退避時不佔用執行緒"""
+    site = SITES[site_name]
+    deadline = time.monotonic() + site.deadline
+    request = _request(site, messages, options)
+    _cooldown_wait(site, deadline)
+    slots = site.async_slots()
+    try:
+        await asyncio.wait_for(slots.acquire(), min(QUEUE_WAIT, max(0, deadline - time.monotonic())))
+    except asyncio.TimeoutError:
+        LLM_REJECTED.inc(1, site.name, "concurrency")
+        raise LLMBusy(QUEUE_WAIT)
+    with site._lock:
+        site.in_flight += 1
+    try:
+        attempt = 0
+        while True:
+            pause = _cooldown_wait(site, deadline)
+            if pause:
+                await asyncio.sleep(pause)
+            try:
+                return await _ahedged(site, request, deadline)
+            except Exception as e:
+                delay = _retry_delay(site, e, attempt, deadline)
+                if delay is None:
+                    raise
+            attempt += 1
+            await asyncio.sleep(delay)
+    finally:
+        with site._lock:
+            site.in_flight -= 1
+        slots.release()
+
+
+@register_collector
+def _site_samples():
+    samples = []
+    for site in SITES.values():
+        labels = {"site": site.name, "model": site.model}
+        samples.append(("llm_in_flight", "OpenAI calls in progress per call site", labels, site.in_flight))
+        samples.append(("llm_concurrency_limit", "Concurrency limit per call site", labels, site.concurrency))
+        if site._p95 is not None:
+            samples.append(("llm_latency_p95_seconds", "Recent p95 latency per call site (hedge threshold)",
+                            labels, round(site._p95, 4)))
+    return samples
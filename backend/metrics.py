@@ -0,0 +1,396 @@
+# backend/metrics.py
+"""
+請求計時與熱點 span，以 Prometheus 文字格式輸出於 GET /metrics。
+
+- 每個請求：http_request_duration_seconds{method, endpoint, status}
+  （endpoint 為路由規則，如 /articles/<article_id>，避免標籤基數失控；串流回應計到送完為止）
+- 子 span：span_duration_seconds{kind, op}
+  kind = storage（每次儲存層呼叫）、llm（每次 OpenAI 呼叫）、readability（Lexile 評分、單字比對）
+- OpenAI token：llm_tokens_total{model, type=prompt|completion}、llm_requests_total{model, outcome}
+- LLM gateway（llm.py）：llm_retries_total{site, reason}、llm_rejected_total{site, reason}、llm_hedged_total{site}
+- 行程內快取狀態（due_queue、definition_cache、token 快取、文章預產池）以 gauge 輸出
+
+SLOW_REQUEST_MS > 0 時，超過門檻的請求會以 WARNING 記錄到 logger "slow_requests"，
+內容為各 span 的次數與總耗時。METRICS_TOKEN 有設定時，/metrics 需帶 Authorization: Bearer <token>。
+
+數值存在各行程記憶體中；gunicorn 多個 worker 時每個 worker 各自回報自己的數字。
+每次記錄只做一次 bisect 與加法（持有鎖的時間極短），可在正式環境常開。
+"""
+import bisect
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Response, g, request
+
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_LE_INF = 'le="+Inf"'
+
+slow_log = logging.getLogger("slow_requests")
+
+# 目前請求的 span 清單 [(kind, op, 秒)]；不在請求中時為 None
+_spans = contextvars.ContextVar("metrics_spans", default=None)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, *label_values):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_labels(self.labels, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}   # label 值 -> [各 bucket 次數..., +Inf 次數, 總和]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            series[i] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for key, series in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, series):
+                cumulative += n
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_labels(self.labels, key, le)} {cumulative}")
+            cumulative += series[len(self.buckets)]
+            lines.append(f"{self.name}_bucket{_labels(self.labels, key, _LE_INF)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+REQUESTS = Histogram("http_request_duration_seconds", "HTTP request latency", ("method", "endpoint", "status"))
+SPANS = Histogram("span_duration_seconds", "Time spent in storage, LLM and readability calls", ("kind", "op"))
+LLM_TOKENS = Counter("llm_tokens_total", "OpenAI tokens used", ("model", "type"))
+LLM_REQUESTS = Counter("llm_requests_total", "OpenAI calls", ("model", "outcome"))
+LLM_RETRIES = Counter("llm_retries_total", "OpenAI calls retried by the gateway", ("site", "reason"))
+LLM_REJECTED = Counter("llm_rejected_total", "OpenAI calls rejected by the gateway (LLMBusy)", ("site", "reason"))
+LLM_HEDGES = Counter("llm_hedged_total", "Hedged OpenAI requests sent", ("site",))
+SLOW_REQUESTS = Counter("http_slow_requests_total", "Requests slower than SLOW_REQUEST_MS", ("endpoint",))
+
+_collectors = []
+
+
+def register_collector(fn):
+    """fn() 回傳 [(metric 名稱, help, {label: 值} 或 None, 數值)]，於 /metrics 時以 gauge 輸出"""
+    _collectors.append(fn)
+    return fn
+
+
+def render() -> str:
+    lines = []
+    for metric in (REQUESTS, SPANS, LLM_TOKENS, LLM_REQUESTS, LLM_RETRIES, LLM_REJECTED, LLM_HEDGES,
+                   SLOW_REQUESTS):
+        lines.extend(metric.render())
+    # 同名 gauge 可能來自不同 collector，依名稱歸組後輸出（Prometheus 要求同一 metric 的樣本相鄰）
+    gauges = {}
+    for fn in _collectors:
+        try:
+            samples = fn()
+        except Exception:
+            continue
+        for name, help_text, labels, value in samples:
+            group = gauges.setdefault(name, [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"])
+            label_str = _labels(labels.keys(), labels.values()) if labels else ""
+            group.append(f"{name}{label_str} {value}")
+    for group in gauges.values():
+        lines.extend(group)
+    return "\n".join(lines) + "\n"
+
+
+# ---- span ----
+
+def record_span(kind, op, seconds):
+    SPANS.observe(seconds, kind, op)
+    spans = _spans.get()
+    if spans is not None:
+        spans.append((kind, op, seconds))
+
+
+@contextmanager
+def span(kind, op):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(kind, op, time.perf_counter() - start)
+
+
+def record_llm_usage(model, usage):
+    """usage 為 OpenAI 回應的 usage 物件（可能為 None）"""
+    if usage is None:
+        return
+    LLM_TOKENS.inc(getattr(usage, "prompt_tokens", 0) or 0, model, "prompt")
+    LLM_TOKENS.inc(getattr(usage, "completion_tokens", 0) or 0, model, "completion")
+
+
+class _InstrumentedStore:
+    """store 代理：每個方法呼叫記一個 storage span（包裝後的方法快取在實例上，之後沒有額外查找成本）"""
+
+    def __init__(self, store, collection):
+        self._store = store
+        self._collection = collection
+
+    def __getattr__(self, name):
+        attr = getattr(self._store, name)
+        if not callable(attr) or name.startswith("_"):
+            return attr
+        op = f"{self._collection}.{name}"
+
+        def call(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return attr(*args, **kwargs)
+            finally:
+                record_span("storage", op, time.perf_counter() - start)
+        self.__dict__[name] = call
+        return call
+
+
+class _InstrumentedAsyncStore(_InstrumentedStore):
+    def __getattr__(self, name):
+        attr = getattr(self._store, name)
+        if not callable(attr) or name.startswith("_"):
+            return attr
+        op = f"{self._collection}.{name}"
+
+        async def call(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await attr(*args, **kwargs)
+            finally:
+                record_span("storage", op, time.perf_counter() - start)
+        self.__dict__[name] = call
+        return call
+
+
+def instrument_store(store, collection):
+    return _InstrumentedStore(store, collection)
+
+
+def instrument_async_store(store, collection):
+    return _InstrumentedAsyncStore(store, collection)
+
+
+# ---- OpenAI ----
+
+def _timed_stream(stream, model, start):
+    """串流回應：span 計到最後一個 chunk；有 usage chunk（stream_options.include_usage）時記錄 token"""
+    outcome = "error"
+    try:
+        for chunk in stream:
+            usage = getattr(chunk, "usage", None)
+            if usage is not None:
+                record_llm_usage(model, usage)
+            yield chunk
+        outcome = "ok"
+    finally:
+        LLM_REQUESTS.inc(1, model, outcome)
+        record_span("llm", f"chat:{model}", time.perf_counter() - start)
+
+
+class _Completions:
+    def __init__(self, completions):
+        self._completions = completions
+
+    def create(self, *args, **kwargs):
+        model = kwargs.get("model", "unknown")
+        start = time.perf_counter()
+        try:
+            result = self._completions.create(*args, **kwargs)
+        except Exception:
+            LLM_REQUESTS.inc(1, model, "error")
+            record_span("llm", f"chat:{model}", time.perf_counter() - start)
+            raise
+        if kwargs.get("stream"):
+            return _timed_stream(result, model, start)
+        LLM_REQUESTS.inc(1, model, "ok")
+        record_llm_usage(model, getattr(result, "usage", None))
+        record_span("llm", f"chat:{model}", time.perf_counter() - start)
+        return result
+
+
+class _AsyncCompletions(_Completions):
+    async def create(self, *args, **kwargs):
+        model = kwargs.get("model", "unknown")
+        start = time.perf_counter()
+        try:
+            result = await self._completions.create(*args, **kwargs)
+        except Exception:
+            LLM_REQUESTS.inc(1, model, "error")
+            record_span("llm", f"chat:{model}", time.perf_counter() - start)
+            raise
+        LLM_REQUESTS.inc(1, model, "ok")
+        record_llm_usage(model, getattr(result, "usage", None))
+        record_span("llm", f"chat:{model}", time.perf_counter() - start)
+        return result
+
+
+class _InstrumentedOpenAI:
+    """只包裝 chat.completions.create，其餘屬性轉給原本的 client"""
+
+    def __init__(self, client, completions_cls):
+        self._client = client
+        self.chat = type("Chat", (), {})()
+        self.chat.completions = completions_cls(client.chat.completions)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def instrument_openai(client):
+    return _InstrumentedOpenAI(client, _Completions)
+
+
+def instrument_async_openai(client):
+    return _InstrumentedOpenAI(client, _AsyncCompletions)
+
+
+# ---- 請求 ----
+
+def _summarize(spans):
+    summary = {}
+    for kind, op, seconds in spans:
+        entry = summary.setdefault(f"{kind}:{op}", {"count": 0, "ms": 0.0})
+        entry["count"] += 1
+        entry["ms"] += seconds * 1000
+    for entry in summary.values():
+        entry["ms"] = round(entry["ms"], 2)
+    return summary
+
+
+def observe_request(method, endpoint, status, seconds, spans=None, path=None, slow_ms=None):
+    """記錄一個請求（Flask middleware 與 asgi.py 共用）"""
+    REQUESTS.observe(seconds, method, endpoint, str(status))
+    slow_ms = SLOW_REQUEST_MS if slow_ms is None else slow_ms
+    if slow_ms > 0 and seconds * 1000 >= slow_ms:
+        SLOW_REQUESTS.inc(1, endpoint)
+        slow_log.warning(json.dumps({
+            "method": method,
+            "path": path or endpoint,
+            "status": status,
+            "ms": round(seconds * 1000, 2),
+            "spans": _summarize(spans or [])
+        }, ensure_ascii=False))
+
+
+def begin_spans():
+    """開始收集目前請求的 span，回傳清單與 reset 用的 token"""
+    spans = []
+    return spans, _spans.set(spans)
+
+
+def end_spans(token):
+    _spans.reset(token)
+
+
+def _cache_samples():
+    """行程內快取的大小與命中數"""
+    from due_queue import due_queue
+    from definitions import definition_cache
+    from auth.utils import auth_stats
+    dq, dc, auth = due_queue.stats(), definition_cache.stats(), auth_stats()
+    return [
+        ("cache_entries", "Entries held by in-process caches", {"cache": "due_queue"}, dq["users"]),
+        ("cache_entries", "Entries held by in-process caches", {"cache": "definitions"}, dc["size"]),
+        ("cache_hits", "In-process cache hits since start", {"cache": "due_queue"}, dq["hits"]),
+        ("cache_hits", "In-process cache hits since start", {"cache": "definitions"},
+         dc["memoryHits"] + dc["persistentHits"]),
+        ("cache_hits", "In-process cache hits since start", {"cache": "auth_tokens"}, auth["hits"]),
+        ("cache_misses", "In-process cache misses since start", {"cache": "due_queue"}, dq["loads"]),
+        ("cache_misses", "In-process cache misses since start", {"cache": "definitions"}, dc["misses"]),
+        ("cache_misses", "In-process cache misses since start", {"cache": "auth_tokens"}, auth["misses"]),
+    ]
+
+
+def _endpoint():
+    return request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+
+
+def init_app(app):
+    """註冊計時 middleware 與 GET /metrics"""
+    if _cache_samples not in _collectors:
+        register_collector(_cache_samples)
+    slow_ms = float(app.config.get("SLOW_REQUEST_MS", SLOW_REQUEST_MS))
+    token = app.config.get("METRICS_TOKEN", METRICS_TOKEN)
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_start = time.perf_counter()
+        g._metrics_spans, _ = begin_spans()
+
+    def _finish(start, status, spans, method, endpoint, path):
+        _spans.set(None)
+        observe_request(method, endpoint, status, time.perf_counter() - start, spans, path, slow_ms)
+
+    @app.after_request
+    def _remember_status(response):
+        g._metrics_status = response.status_code
+        if response.is_streamed and "_metrics_start" in g:
+            # 串流回應：送完（WSGI 關閉回應）時才結束計時，串流中的 span 也會計入
+            args = (g.pop("_metrics_start"), response.status_code, g.pop("_metrics_spans"),
+                    request.method, _endpoint(), request.path)
+            response.call_on_close(lambda: _finish(*args))
+        return response
+
+    @app.teardown_request
+    def _stop_timer(exc):
+        start = g.pop("_metrics_start", None)
+        if start is None:
+            return
+        status = g.pop("_metrics_status", 500 if exc else 200)
+        _finish(start, status, g.pop("_metrics_spans", []), request.method, _endpoint(), request.path)
+
+    @app.route("/metrics")
+    def metrics_endpoint():
+        if token and request.headers.get("Authorization", "") != f"Bearer {token}":
+            return Response("unauthorized\n", status=401, mimetype="text/plain")
+        return Response(render(), mimetype="text/plain; version=0.0.4")
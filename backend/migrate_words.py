@@ -0,0 +1,192 @@
+# backend/migrate_words.py
+"""
+單字遷移：舊版全域 words 集合 → users/{uid}/words/{word}
+
+於 backend/ 目錄執行（需 GOOGLE_APPLICATION_CREDENTIALS）：
+    python -m migrate_words              # 從上次中斷處接續
+    python -m migrate_words --restart    # 忽略進度從頭開始
+    python -m migrate_words --dry-run    # 只統計使用者與文件數，不寫入
+
+流程：
+- 舊集合依 (userId, __name__) 排序分頁讀取，同一使用者的文件一定相鄰
+- 每位使用者的文件先去重（"<uid>_<word>" 與以單字為 id 的文件對應到同一個單字時，前者優先），
+  再以 BulkWriter.create() 寫到新路徑；新路徑已有文件（服務在遷移期間的雙寫）時 create 失敗，
+  視為略過，不會以舊資料蓋掉較新的寫入
+- 每頁 flush 後，才在該頁已完整寫完的使用者 users/{uid} 寫入 wordsLayout=2；
+  服務（WORD_LAYOUT=dual）看到標記後只讀新路徑；寫入舊集合前服務一律重新讀取標記（不使用快取），
+  標記寫入後不會再有 worker 寫舊集合，不需等待快取到期
+- 進度（最後完成的使用者與累計數量）存在 _migrations/words_v2，中斷後重跑即從下一位使用者接續；
+  任何寫入在重試後仍失敗時中止且不推進進度，重跑時已寫入的文件會被略過
+- 每頁輸出累計筆數與吞吐量（docs/s）
+
+全部遷移完成後，服務改設 WORD_LAYOUT=user，之後即可刪除舊的 words 集合與 userId 複合索引。
+"""
+import argparse
+import threading
+import time
+from datetime import datetime
+
+from storage.base import legacy_word_id
+
+CHECKPOINT = ("_migrations", "words_v2")
+PAGE_SIZE = 500
+MAX_ATTEMPTS = 10
+_ALREADY_EXISTS = 6   # grpc.StatusCode.ALREADY_EXISTS
+
+
+class MigrationFailed(RuntimeError):
+    pass
+
+
+class _Progress:
+    """BulkWriter 的回呼在背景執行緒執行，計數以鎖保護"""
+
+    def __init__(self, state):
+        self.users = state.get("users", 0)
+        self.copied = state.get("copied", 0)
+        self.skipped = state.get("skipped", 0)
+        self.failed = []
+        self.started = time.monotonic()
+        self.base = self.copied + self.skipped
+        self._lock = threading.Lock()
+
+    def on_result(self, reference, result, writer):
+        with self._lock:
+            self.copied += 1
+
+    def on_error(self, failure, writer) -> bool:
+        if failure.code == _ALREADY_EXISTS:
+            with self._lock:
+                self.skipped += 1
+            return False
+        if failure.attempts < MAX_ATTEMPTS:
+            return True
+        with self._lock:
+            self.failed.append(f"{failure.operation.reference.path}: {failure.message}")
+        return False
+
+    def rate(self) -> float:
+        elapsed = time.monotonic() - self.started
+        return (self.copied + self.skipped - self.base) / elapsed if elapsed else 0.0
+
+    def report(self, last_user):
+        print(f"users {self.users:7d}  copied {self.copied:9d}  skipped {self.skipped:7d}  "
+              f"{self.rate():8.1f} docs/s  last: {last_user}", flush=True)
+
+
+def dedupe(user_id, docs) -> dict:
+    """同一使用者的舊文件 → {word_id: data}"""
+    words = {}
+    for doc in sorted(docs, key=lambda d: d.id != legacy_word_id(user_id, d.id)):
+        words[legacy_word_id(user_id, doc.id)] = doc.to_dict()
+    return words
+
+
+def _mark_migrated(db, user_ids):
+    """只標記 users 集合中存在的使用者（沒有帳號的舊資料不建立空的 users 文件）"""
+    from storage.firestore_store import LAYOUT_FIELD, LAYOUT_VERSION
+    users = db.collection("users")
+    refs = [users.document(uid) for uid in user_ids]
+    for i in range(0, len(refs), PAGE_SIZE):
+        batch = db.batch()
+        existing = [snap.reference for snap in db.get_all(refs[i:i + PAGE_SIZE], field_paths=[]) if snap.exists]
+        for ref in existing:
+            batch.update(ref, {LAYOUT_FIELD: LAYOUT_VERSION})
+        if existing:
+            batch.commit()
+
+
+def migrate(db, page_size=PAGE_SIZE, restart=False, dry_run=False, ops_per_second=500):
+    """回傳 _Progress；寫入失敗拋 MigrationFailed"""
+    from google.cloud.firestore_v1.bulk_writer import BulkWriterOptions
+
+    checkpoint = db.collection(CHECKPOINT[0]).document(CHECKPOINT[1])
+    state = {} if restart or dry_run else (checkpoint.get().to_dict() or {})
+    if state.get("done"):
+        print(f"already done at {state.get('updatedAt')}; use --restart to run again")
+        return _Progress(state)
+    progress = _Progress(state)
+
+    writer = None
+    if not dry_run:
+        writer = db.bulk_writer(BulkWriterOptions(initial_ops_per_second=ops_per_second,
+                                                  max_ops_per_second=ops_per_second))
+        writer.on_write_result(progress.on_result)
+        writer.on_write_error(progress.on_error)
+
+    query = db.collection("words").order_by("userId").order_by("__name__")
+    if state.get("lastUser"):
+        query = query.where("userId", ">", state["lastUser"])
+
+    def finish(user_id, docs, finished):
+        words = dedupe(user_id, docs)
+        if dry_run:
+            progress.copied += len(words)
+        else:
+            col = db.collection("users").document(user_id).collection("words")
+            for word_id, data in words.items():
+                writer.create(col.document(word_id), data)
+        progress.users += 1
+        finished.append(user_id)
+
+    current, buffered, last_doc = None, [], None
+    while True:
+        page_query = query.start_after(last_doc) if last_doc is not None else query
+        docs = list(page_query.limit(page_size).stream())
+        finished = []
+        for doc in docs:
+            user_id = doc.get("userId")
+            if user_id != current:
+                if current is not None:
+                    finish(current, buffered, finished)
+                current, buffered = user_id, []
+            buffered.append(doc)
+        exhausted = len(docs) < page_size
+        if exhausted and current is not None:
+            finish(current, buffered, finished)
+            current, buffered = None, []
+        if docs:
+            last_doc = docs[-1]
+
+        if not dry_run and finished:
+            writer.flush()
+            if progress.failed:
+                writer.close()
+                raise MigrationFailed("; ".join(progress.failed[:5]))
+            _mark_migrated(db, finished)
+            checkpoint.set({
+                "lastUser": finished[-1], "users": progress.users, "copied": progress.copied,
+                "skipped": progress.skipped, "done": False, "updatedAt": datetime.utcnow()
+            })
+        if finished:
+            progress.report(finished[-1])
+        if exhausted:
+            break
+
+    if not dry_run:
+        writer.close()
+        checkpoint.set({"done": True, "updatedAt": datetime.utcnow()}, merge=True)
+    return progress
+
+
+def main():
+    parser = argparse.ArgumentParser(description="words 集合遷移到 users/{uid}/words")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    parser.add_argument("--ops-per-second", type=int, default=500, help="BulkWriter 寫入速率上限")
+    parser.add_argument("--restart", action="store_true", help="忽略既有進度從頭開始")
+    parser.add_argument("--dry-run", action="store_true", help="只統計，不寫入")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    from firebase_admin import firestore
+    from storage.firestore_store import ensure_app
+
+    load_dotenv()
+    ensure_app()
+    progress = migrate(firestore.client(), args.page_size, args.restart, args.dry_run, args.ops_per_second)
+    print(f"done: users {progress.users}  copied {progress.copied}  skipped {progress.skipped}  "
+          f"{progress.rate():.1f} docs/s")
+
+
+if __name__ == "__main__":
+    main()
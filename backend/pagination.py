@@ -0,0 +1,94 @@
+# backend/pagination.py
+"""
+列表端點共用的游標分頁與欄位投影：
+- ?limit=N       每頁筆數（預設 DEFAULT_PAGE_SIZE，上限 MAX_PAGE_SIZE）
+- ?cursor=...    上一頁回傳的 nextCursor（不透明字串）
+- ?fields=a,b    只回傳指定欄位（Firestore select()），fields=* 回傳全部
+
+游標內容為最後一筆的排序欄位值與文件 id，搭配 order_by(field).order_by("__name__")
+以 start_after 接續，不需額外讀取文件。
+"""
+import base64
+import json
+import re
+from datetime import datetime
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+_FIELD_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def parse_page_args(args, default_fields=None):
+    """
+    解析 limit / cursor / fields，格式錯誤拋 ValueError。
+    回傳 (limit, cursor, fields)；fields 為 None 代表不投影。
+    """
+    limit = int(args.get("limit", DEFAULT_PAGE_SIZE))
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be 1~{MAX_PAGE_SIZE}")
+
+    cursor = args.get("cursor")
+    if cursor:
+        cursor = decode_cursor(cursor)
+
+    spec = args.get("fields")
+    if spec is None:
+        fields = list(default_fields) if default_fields else None
+    elif spec.strip() == "*":
+        fields = None
+    else:
+        fields = [f.strip() for f in spec.split(",") if f.strip()]
+        if not fields or not all(_FIELD_RE.match(f) for f in fields):
+            raise ValueError("fields must be a comma-separated list of field names")
+    return limit, cursor, fields
+
+
+def encode_cursor(value, doc_id) -> str:
+    if isinstance(value, datetime):
+        payload = {"t": "dt", "v": value.isoformat(), "id": doc_id}
+    else:
+        payload = {"v": value, "id": doc_id}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """回傳 (排序欄位值, 文件 id)"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        value = payload["v"]
+        if payload.get("t") == "dt":
+            value = datetime.fromisoformat(value)
+        return value, str(payload["id"])
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("invalid cursor")
+
+
+def paginate(query, order_field, limit, cursor=None, fields=None, descending=False):
+    """
+    對已套用 where 條件的 query 取一頁，回傳 (items, next_cursor)。
+    items 為 {**欄位, "id": 文件 id}；沒有下一頁時 next_cursor 為 None。
+    """
+    # 等同 firestore.Query.DESCENDING / ASCENDING，不必為此匯入 Firestore
+    direction = "DESCENDING" if descending else "ASCENDING"
+    query = query.order_by(order_field, direction=direction).order_by("__name__", direction=direction)
+    if fields is not None:
+        # 排序欄位一定要取回，才能產生下一頁游標
+        query = query.select(list(dict.fromkeys([*fields, order_field])))
+    if cursor is not None:
+        value, doc_id = cursor
+        query = query.start_after({order_field: value, "__name__": doc_id})
+
+    # 多取一筆判斷是否還有下一頁
+    docs = list(query.limit(limit + 1).stream())
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+
+    items = [{**doc.to_dict(), "id": doc.id} for doc in docs]
+    next_cursor = None
+    if has_more and docs:
+        last = docs[-1]
+        next_cursor = encode_cursor(last.to_dict().get(order_field), last.id)
+    return items, next_cursor
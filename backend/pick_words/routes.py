@@ -1,11 +1,10 @@
 # backend/pick_words/routes.py
 from flask import Blueprint, request, jsonify, g
 from datetime import datetime
-from firebase_admin import firestore
 from auth.utils import auth_required
+from due_queue import due_queue
 
 bp = Blueprint('pick_words', __name__, url_prefix='/pick_words')
-db = firestore.client()
 @bp.route('', methods=['GET'])
 @auth_required
 def pick_words():
@@ -16,21 +15,14 @@ def pick_words():
     user_id = g.user['sub']
     limit = int(request.args.get('limit', 10))
     now = datetime.utcnow()
-    docs = (
-        db.collection("words")
-          .where("userId", "==", user_id)
-          .where("dueDate", "<=", now)
-          .order_by("dueDate")
-          .limit(limit)
-          .stream()
-    )
+    # 由行程內的複習佇列快取回應，第一次存取才查 Firestore
+    docs = due_queue.due_words(user_id, now, limit)
 
     words = []
-    for doc in docs:
-        data = doc.to_dict()
+    for word_id, data in docs:
         words.append({
-            "id": doc.id,
-            "word": doc.id,
+            "id": word_id,
+            "word": word_id,
             "interval": data.get("lastInterval"),
             "easiness": data.get("easeFactor"),
             "next_review": data.get("dueDate").isoformat() if data.get("dueDate") else None,
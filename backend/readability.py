@@ -0,0 +1,150 @@
+# backend/readability.py
+r"""
+單次掃描的可讀性分析：
+文本只切一次句子與單字，Flesch–Kincaid、Gunning Fog、Dale–Chall、SMOG
+四個指標共用同一份統計（句數、字數、音節數、多音節字數、難字數）。
+
+計數規則沿用 textstat 0.7（lexile.py 原本的實作）：
+- 句子：r'\b[^.!?]+[.!?]*'，字數 <= 2 的句子不計
+- 單字：移除標點後以空白切分（連字號、撇號會併入單字）
+- 音節：優先查 CMU 發音字典，查不到再用 Pyphen 斷字
+- 難字：不在 Dale–Chall 易字表中的「不重複」單字；Fog 另要求 >= 3 音節
+與 textstat 的差異：中間值不做四捨五入，結果差距由 tests/test_readability.py 控管。
+易字表與 CMU 字典都在第一次計算時才載入（不匯入 textstat 本身），匯入本模組幾乎沒有成本。
+"""
+
+import re
+import math
+import importlib.util
+from functools import lru_cache
+from pathlib import Path
+
+_SENTENCE_RE = re.compile(r"\b[^.!?]+[.!?]*", re.UNICODE)
+_PUNCT_RE = re.compile(r"[^\w\s]")
+
+SYLLABLE_CACHE_SIZE = 65536
+
+
+_easy_words = None
+_cmu = None
+_pyphen = None
+
+
+def _load_easy_words() -> frozenset:
+    """
+    載入 textstat 隨附的 Dale–Chall 易字表；縮寫同時收錄去撇號的寫法。
+    只以 find_spec 找出檔案位置，不執行 textstat 的匯入（約 1 秒）。
+    """
+    spec = importlib.util.find_spec("textstat")
+    path = Path(spec.origin).parent / "resources" / "en" / "easy_words.txt"
+    words = {ln.strip() for ln in path.read_text("utf-8").splitlines() if ln.strip()}
+    return frozenset(words | {_PUNCT_RE.sub("", w) for w in words})
+
+
+def easy_words() -> frozenset:
+    global _easy_words
+    if _easy_words is None:
+        _easy_words = _load_easy_words()
+    return _easy_words
+
+
+def __getattr__(name):
+    # 相容原本的模組常數 readability.EASY_WORDS
+    if name == "EASY_WORDS":
+        return easy_words()
+    raise AttributeError(name)
+
+
+def _dictionaries():
+    """CMU 字典載入約需 1 秒，延後到第一次計算音節時才載入"""
+    global _cmu, _pyphen
+    if _cmu is None:
+        import cmudict
+        from pyphen import Pyphen
+        _pyphen = Pyphen(lang="en_US")
+        _cmu = cmudict.dict()
+    return _cmu, _pyphen
+
+
+@lru_cache(maxsize=SYLLABLE_CACHE_SIZE)
+def syllable_count(word: str) -> int:
+    """單一（已小寫、去標點）單字的音節數，結果以 LRU 表記憶"""
+    cmu, pyphen = _dictionaries()
+    phones = cmu.get(word)
+    if phones:
+        return sum(1 for p in phones[0] if p[-1].isdigit())
+    return len(pyphen.positions(word)) + 1
+
+
+def text_counts(text: str) -> dict:
+    """掃描一次文本，回傳四個指標所需的共用統計"""
+    sentences = 0
+    words = 0
+    syllables = 0
+    polysyllables = 0
+    distinct = set()
+
+    for chunk in _SENTENCE_RE.findall(text):
+        tokens = _PUNCT_RE.sub("", chunk).lower().split()
+        if len(tokens) > 2:
+            sentences += 1
+        words += len(tokens)
+        for token in tokens:
+            n = syllable_count(token)
+            syllables += n
+            if n >= 3:
+                polysyllables += 1
+            distinct.add(token)
+
+    easy = easy_words()
+    difficult = [w for w in distinct if w not in easy]
+    return {
+        "sentences": max(1, sentences),
+        "words": words,
+        "syllables": syllables,
+        "polysyllables": polysyllables,
+        "difficultWords": len(difficult),
+        "fogDifficultWords": sum(1 for w in difficult if syllable_count(w) >= 3)
+    }
+
+
+def scores_from_counts(c: dict) -> dict:
+    """由共用統計計算四個年級指標（公式與 textstat 相同）"""
+    if c["words"] == 0:
+        return {"fleschKincaid": 0.0, "gunningFog": 0.0, "daleChall": 0.0, "smog": 0.0}
+
+    asl = c["words"] / c["sentences"]
+    spw = c["syllables"] / c["words"]
+
+    fk = 0.39 * asl + 11.8 * spw - 15.59
+
+    fog = 0.4 * (asl + c["fogDifficultWords"] / c["words"] * 100)
+
+    pct_difficult = c["difficultWords"] / c["words"] * 100
+    dale_chall = 0.1579 * pct_difficult + 0.0496 * asl
+    if pct_difficult > 5:
+        dale_chall += 3.6365
+
+    smog = 0.0
+    if c["sentences"] >= 3:
+        smog = 1.043 * math.sqrt(30 * c["polysyllables"] / c["sentences"]) + 3.1291
+
+    return {"fleschKincaid": fk, "gunningFog": fog, "daleChall": dale_chall, "smog": smog}
+
+
+def analyze(text: str) -> dict:
+    """單篇文本的四個指標與平均年級"""
+    s = scores_from_counts(text_counts(text))
+    s["grade"] = (s["fleschKincaid"] + s["gunningFog"] + s["daleChall"] + s["smog"]) / 4.0
+    return s
+
+
+def preload():
+    """預先載入易字表與 CMU 字典（gunicorn 預載時於 fork 前呼叫）"""
+    easy_words()
+    _dictionaries()
+
+
+def analyze_many(texts) -> list:
+    """批次評分：音節表與易字表在整批文本間共用"""
+    return [analyze(t) for t in texts]
@@ -1,25 +1,76 @@
 # backend/review/routes.py
 from flask import Blueprint, request, jsonify, g
 from datetime import datetime
-from firebase_admin import firestore
-from sm2 import next_interval, due_date_from_interval
+from storage import word_store, Increment
+from sm2 import next_interval, due_date_from_interval, user_params
 from auth.utils import auth_required
+from pagination import parse_page_args, encode_cursor
+from due_queue import due_queue
+from signals import word_saved
+import review_log
 
 bp = Blueprint("review", __name__, url_prefix="/review")
-db = firestore.client()
+
+MAX_BATCH_SIZE = 500  # Firestore WriteBatch 單次上限
 
 @bp.route("/due", methods=["GET"])
 @auth_required
 def list_due_words():
-    """取出今天該做複習的單字清單"""
+    """
+    取出今天該做複習的單字清單（依 dueDate 升冪分頁）
+    query param: ?limit=100&cursor=...&fields=short,dueDate
+    """
     user_id = g.user["sub"]
-    today = datetime.utcnow()
-    docs = (db.collection("words")
-              .where("userId", "==", user_id)
-              .where("dueDate", "<=", today)
-              .stream())
-    words = [{**doc.to_dict(), "id": doc.id} for doc in docs]
-    return jsonify(words=words), 200
+    try:
+        limit, cursor, fields = parse_page_args(request.args)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    # 游標格式正確但排序值不是時間（例如其他列表端點的游標）時，due_queue 無法比較
+    if cursor is not None and not (cursor[0] is None or isinstance(cursor[0], datetime)):
+        return jsonify(error="invalid cursor"), 400
+
+    # 由行程內的複習佇列快取回應（與 /pick_words 共用），多取一筆判斷是否還有下一頁
+    docs = due_queue.due_words(user_id, datetime.utcnow(), limit + 1, after=cursor)
+    page = docs[:limit]
+    words = [
+        {**({k: data[k] for k in fields if k in data} if fields is not None else data), "id": word_id}
+        for word_id, data in page
+    ]
+    next_cursor = None
+    if len(docs) > limit:
+        word_id, data = page[-1]
+        next_cursor = encode_cursor(data.get("dueDate"), word_id)
+    return jsonify(words=words, nextCursor=next_cursor), 200
+
+@bp.route("/forecast", methods=["GET"])
+@auth_required
+def review_forecast():
+    """
+    預測未來每天的複習量：?days=30&trials=3&quality=p0,p1,p2,p3,p4,p5
+    以 NumPy 向量化模擬使用者所有單字的 SM-2 排程（見 forecast.py），使用該使用者擬合的參數
+    """
+    import forecast  # NumPy 只在預測時才需要，延後匯入以加快 worker 啟動
+
+    user_id = g.user["sub"]
+    try:
+        days = int(request.args.get("days", 30))
+        trials = int(request.args.get("trials", 3))
+        quality_probs = forecast.parse_quality_probs(request.args.get("quality"))
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    if not 1 <= days <= forecast.MAX_DAYS or not 1 <= trials <= 20:
+        return jsonify(error=f"days must be 1~{forecast.MAX_DAYS}, trials 1~20"), 400
+
+    docs = word_store.for_user(user_id, fields=["lastInterval", "easeFactor", "dueDate"])
+    intervals, efs, due_in_days = forecast.word_state_arrays(data for _, data in docs)
+    counts = forecast.simulate(intervals, efs, due_in_days, days, quality_probs, trials,
+                               params=user_params(g.user_ctx.get("sm2Params")))
+
+    return jsonify(
+        words=int(intervals.size),
+        days=forecast.forecast_days(counts),
+        total=round(float(counts.sum()), 2)
+    ), 200
 
 @bp.route("/feedback", methods=["POST"])
 @auth_required
@@ -27,7 +78,7 @@ def review_feedback():
     """
     回報一次複習：
     body: { "wordId": "...", "quality": 0~5 }
-    回傳更新後的間隔與下次複習日期
+    回傳更新後的間隔與下次複習日期；複習事件附加到複習紀錄（review_log.py）
     """
     user_id = g.user["sub"]
     data = request.get_json(force=True)
@@ -36,29 +87,102 @@ def review_feedback():
     if word_id is None or quality is None:
         return jsonify(error="wordId and quality required"), 400
 
-    doc_ref = db.collection("words").document(word_id)
-    doc = doc_ref.get()
-    if not doc.exists or doc.to_dict().get("userId") != user_id:
+    w = word_store.get(user_id, word_id)
+    if w is None:
         return jsonify(error="Not found or unauthorized"), 404
 
-    w = doc.to_dict()
+    params = user_params(g.user_ctx.get("sm2Params"))
     old_interval = w.get("lastInterval", 0)
-    ef = w.get("easeFactor", 2.5)
+    ef = w.get("easeFactor", params["initialEase"])
 
-    new_interval, new_ef = next_interval(old_interval, quality, ef)
+    new_interval, new_ef = next_interval(old_interval, quality, ef, params)
     next_due = due_date_from_interval(new_interval)
 
-    doc_ref.update({
+    fields = {
         "lastInterval": new_interval,
         "easeFactor":   new_ef,
         "dueDate":      next_due,
-        "reviewCount": firestore.Increment(1)
-
-    })
+        "reviewCount": Increment(1)
+    }
+    word_store.update(user_id, word_id, fields)
+    word_saved.send(user_id, word_id=word_id, fields=fields)
+    review_log.record(user_id, [review_log.review_event(word_id, quality, w, fields)])
 
     return jsonify(
       wordId=word_id,
       interval=new_interval,
       easeFactor=new_ef,
       nextDue=next_due.isoformat()
-    ), 200
\ No newline at end of file
+    ), 200
+
+@bp.route("/feedback/batch", methods=["POST"])
+@auth_required
+def review_feedback_batch():
+    """
+    一次回報整個複習階段（離線同步用）：
+    body: { "items": [ { "wordId": "...", "quality": 0~5 }, ... ] }（也接受直接傳陣列）
+    - 以一次 get_many 讀取所有單字，一次批次寫回
+    - 同一單字出現多次時依序套用
+    - 回傳逐筆結果，無權限或格式錯誤的項目以 error 標示，不影響其他項目
+    - 每筆有效的複習依序附加到複習紀錄
+    """
+    user_id = g.user["sub"]
+    data = request.get_json(force=True)
+    items = data.get("items") if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return jsonify(error="items required"), 400
+    if len(items) > MAX_BATCH_SIZE:
+        return jsonify(error=f"at most {MAX_BATCH_SIZE} items per batch"), 400
+
+    results = [None] * len(items)
+    valid = []
+    for i, item in enumerate(items):
+        word_id = item.get("wordId") if isinstance(item, dict) else None
+        quality = item.get("quality") if isinstance(item, dict) else None
+        if not isinstance(word_id, str) or not word_id \
+                or not isinstance(quality, int) or isinstance(quality, bool) or not 0 <= quality <= 5:
+            results[i] = {"wordId": word_id, "error": "wordId and quality (0~5) required"}
+            continue
+        valid.append((i, word_id, quality))
+
+    params = user_params(g.user_ctx.get("sm2Params"))
+    states = {}
+    for word_id, w in word_store.get_many(user_id, (word_id for _, word_id, _ in valid)).items():
+        states[word_id] = {"interval": w.get("lastInterval", 0), "ef": w.get("easeFactor", params["initialEase"]),
+                           "due": w.get("dueDate"), "reviews": 0}
+
+    now = datetime.utcnow()
+    events = []
+    # 依送出順序套用，同一單字重複出現時以前一筆的結果為起點
+    for i, word_id, quality in valid:
+        state = states.get(word_id)
+        if state is None:
+            results[i] = {"wordId": word_id, "error": "Not found or unauthorized"}
+            continue
+        new_interval, new_ef = next_interval(state["interval"], quality, state["ef"], params)
+        next_due = due_date_from_interval(new_interval)
+        prev = {"lastInterval": state["interval"], "easeFactor": state["ef"], "dueDate": state["due"]}
+        events.append(review_log.review_event(word_id, quality, prev,
+                                              {"lastInterval": new_interval, "easeFactor": new_ef}, now))
+        state.update(interval=new_interval, ef=new_ef, due=next_due, reviews=state["reviews"] + 1)
+        results[i] = {
+            "wordId": word_id,
+            "interval": new_interval,
+            "easeFactor": new_ef,
+            "nextDue": next_due.isoformat()
+        }
+
+    updates = {}
+    for word_id, state in states.items():
+        updates[word_id] = {
+            "lastInterval": state["interval"],
+            "easeFactor":   state["ef"],
+            "dueDate":      state["due"],
+            "reviewCount": Increment(state["reviews"])
+        }
+    word_store.update_many(user_id, updates)
+    for word_id, fields in updates.items():
+        word_saved.send(user_id, word_id=word_id, fields=fields)
+    review_log.record(user_id, events)
+
+    return jsonify(results=results), 200
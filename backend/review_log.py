@@ -0,0 +1,44 @@
+# backend/review_log.py
+"""
+複習紀錄：每次複習（/review/feedback、/review/feedback/batch、POST /words 再次點擊已有的單字）
+附加一筆事件到 review_log_store，內容為單字、quality、時間與複習前後的排程：
+    {wordId, quality, reviewedAt, prevInterval, prevEase, prevDue, interval, easeFactor}
+紀錄只新增不修改，供 fit_sm2 離線擬合每位使用者的 SM-2 參數（結果存在 users/{uid}.sm2Params，
+路由以 g.user_ctx 讀取，見 sm2.user_params）。
+
+寫入在單字更新成功之後；紀錄寫入失敗只記 log，不影響複習本身。
+"""
+import logging
+from datetime import datetime, timedelta
+
+from storage import review_log_store
+
+log = logging.getLogger(__name__)
+
+
+def review_event(word_id, quality, prev, fields, at=None) -> dict:
+    """prev 為複習前的單字文件，fields 為寫回的 lastInterval / easeFactor"""
+    return {
+        "wordId": word_id,
+        "quality": quality,
+        "reviewedAt": at or datetime.utcnow(),
+        "prevInterval": prev.get("lastInterval", 0),
+        "prevEase": prev.get("easeFactor"),
+        "prevDue": prev.get("dueDate"),
+        "interval": fields["lastInterval"],
+        "easeFactor": fields["easeFactor"]
+    }
+
+
+def record(user_id, events):
+    """
+    附加事件；同一次寫入的事件時間依序錯開 1 微秒，同一批次內重複複習的單字仍保有先後順序
+    （Firestore 的 ArrayUnion 也不會把內容相同的兩筆合併）
+    """
+    if not events:
+        return
+    events = [{**e, "reviewedAt": e["reviewedAt"] + timedelta(microseconds=i)} for i, e in enumerate(events)]
+    try:
+        review_log_store.append(user_id, events)
+    except Exception:
+        log.exception("review log append failed for %s (%d events)", user_id, len(events))
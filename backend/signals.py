@@ -0,0 +1,15 @@
+# backend/signals.py
+"""
+單字資料異動通知（blinker，Flask 已內建依賴）
+寫入路徑在 Firestore 寫入成功後送出，各種行程內快取自行訂閱以更新或失效。
+
+- word_saved.send(user_id, word_id=..., fields={...}, created=bool)
+    created=True 代表 set() 了完整文件；False 代表 update() 了部分欄位
+- word_deleted.send(user_id, word_id=...)
+"""
+from blinker import Namespace
+
+_signals = Namespace()
+
+word_saved = _signals.signal("word-saved")
+word_deleted = _signals.signal("word-deleted")
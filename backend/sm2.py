@@ -1,31 +1,51 @@
 from datetime import datetime, timedelta
 
-def next_interval(old_interval: int, quality: int, ef: float) -> (int, float):
+# SM-2 可調參數；fit_sm2 依複習紀錄為每位使用者擬合一組，存在 users/{uid}.sm2Params
+DEFAULT_PARAMS = {
+    "initialEase": 2.5,       # 新單字的起始 EF
+    "minEase": 1.3,           # EF 下限
+    "quickBonus": 0.05,       # 間隔還短（< 6 天）就答 quality 5 時 EF 只加這麼多
+    "intervalModifier": 1.0,  # 第二次起的間隔乘數
+}
+
+
+def user_params(stored) -> dict:
+    """users/{uid}.sm2Params（可能為 None 或缺少欄位）與 DEFAULT_PARAMS 合併"""
+    params = dict(DEFAULT_PARAMS)
+    for key, value in (stored or {}).items():
+        if key in params and isinstance(value, (int, float)) and not isinstance(value, bool):
+            params[key] = float(value)
+    return params
+
+
+def next_interval(old_interval: int, quality: int, ef: float, params=None) -> (int, float):
     """
     SM-2 核心計算：
     - quality < 3 → 重設為 1 天
-    - quality >= 3 → 照公式遞增
+    - quality >= 3 → 照公式遞增（乘上 intervalModifier，且至少比上次多 1 天）
     - quality == 5 且 old_interval 太小 → 降低 EF 成長，避免提早放棄複習
+    params 省略時使用 DEFAULT_PARAMS
     """
+    params = params or DEFAULT_PARAMS
     if quality < 3:
         new_interval = 1
     else:
         if old_interval == 0:
             new_interval = 1
         elif old_interval == 1:
-            new_interval = 6
+            new_interval = max(int(6 * params["intervalModifier"]), 2)
         else:
-            new_interval = int(old_interval * ef)
+            new_interval = max(int(old_interval * ef * params["intervalModifier"]), old_interval + 1)
 
     # 更新 Ease Factor
     new_ef = ef + (0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
 
     # 限制 EF 增長過快：若 interval 還小於 6，且 quality == 5，就放緩 EF 提升
     if quality == 5 and old_interval < 6:
-        new_ef = ef + 0.05  # 輕微提升
+        new_ef = ef + params["quickBonus"]  # 輕微提升
 
-    if new_ef < 1.3:
-        new_ef = 1.3
+    if new_ef < params["minEase"]:
+        new_ef = params["minEase"]
 
     return new_interval, new_ef
 
@@ -35,12 +55,12 @@ def due_date_from_interval(interval: int) -> datetime:
     return datetime.utcnow() + timedelta(days=interval)
 
 
-def sm2_review(last_interval: int, ease_factor: float, quality: int = 2) -> dict:
+def sm2_review(last_interval: int, ease_factor: float, quality: int = 2, params=None) -> dict:
     """
     封裝 SM-2 流程：輸入上次間隔、EF 與回答品質，輸出新複習資料
     預設 quality = 2，代表不熟
     """
-    interval, new_ef = next_interval(last_interval, quality, ease_factor)
+    interval, new_ef = next_interval(last_interval, quality, ease_factor, params)
     due_date = due_date_from_interval(interval)
 
     return {
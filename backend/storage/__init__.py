@@ -0,0 +1,152 @@
+# backend/storage/__init__.py
+"""
+儲存層：路由透過 word_store / article_store / user_store / definition_store / job_store /
+review_log_store 存取資料。
+
+後端由環境變數 STORAGE_BACKEND 決定（第一次存取時才建立連線，匯入時不需要憑證）：
+- firestore（預設）：正式環境，需 GOOGLE_APPLICATION_CREDENTIALS
+- memory：SQLite :memory:，行程結束即消失（每個 worker 各一份），適合測試與壓測
+- sqlite：SQLite 檔案（STORAGE_PATH，預設 adaptive-english.db），單機即可完整執行
+create_app(config) 依設定呼叫 configure()；測試或腳本也可直接呼叫。
+"""
+import asyncio
+import os
+import threading
+
+from storage.base import (NotFound, Increment, naive_utc, WordStore, ArticleStore, UserStore, DefinitionStore, JobStore,
+                          ReviewLogStore)
+
+BACKENDS = ("firestore", "memory", "sqlite")
+
+_stores = None
+_selected = None   # (backend, path)；None 代表依環境變數
+_lock = threading.Lock()
+
+
+COLLECTIONS = ("words", "articles", "users", "definitions", "jobs", "review_log")
+
+
+def _instrumented(stores):
+    """每次儲存層呼叫記錄一個 storage span（見 metrics.py）"""
+    from metrics import instrument_store
+    return tuple(instrument_store(s, name) for s, name in zip(stores, COLLECTIONS))
+
+
+def _build(backend, path):
+    if backend == "firestore":
+        from storage.firestore_store import firestore_stores
+        return _instrumented(firestore_stores())
+    if backend == "memory":
+        from storage.sqlite_store import sqlite_stores
+        return _instrumented(sqlite_stores(":memory:"))
+    if backend == "sqlite":
+        from storage.sqlite_store import sqlite_stores
+        return _instrumented(sqlite_stores(path or os.getenv("STORAGE_PATH", "adaptive-english.db")))
+    raise ValueError(f"STORAGE_BACKEND must be one of {', '.join(BACKENDS)}")
+
+
+def configure(backend=None, path=None):
+    """
+    指定儲存後端（create_app 依設定呼叫）；只記錄選擇，第一次存取時才建立連線，
+    因此可以在 gunicorn fork 前呼叫。
+    """
+    global _stores, _selected
+    backend = backend or os.getenv("STORAGE_BACKEND", "firestore")
+    if backend not in BACKENDS:
+        raise ValueError(f"STORAGE_BACKEND must be one of {', '.join(BACKENDS)}")
+    with _lock:
+        _selected = (backend, path)
+        _stores = None
+
+
+def reset():
+    """丟棄已建立的連線（保留後端選擇），下次存取時重建；fork 後的 worker 使用"""
+    global _stores
+    with _lock:
+        _stores = None
+
+
+def use_stores(stores, backend="custom"):
+    """直接換上一組 (words, articles, users, definitions, jobs, review_log)，例如壓測用的延遲包裝"""
+    global _stores
+    with _lock:
+        _stores = (backend, _instrumented(stores))
+
+
+def current_stores():
+    """目前使用中的 (words, articles, users, definitions, jobs, review_log)"""
+    return _current()[1]
+
+
+def backend_name():
+    return _current()[0]
+
+
+def _current():
+    global _stores
+    stores = _stores
+    if stores is None:
+        with _lock:
+            if _stores is None:
+                backend, path = _selected or (os.getenv("STORAGE_BACKEND", "firestore"), None)
+                _stores = (backend, _build(backend, path))
+            stores = _stores
+    return stores
+
+
+class _StoreProxy:
+    """模組層級的 store 代理：匯入時不連線，每次呼叫轉給目前設定的後端"""
+
+    def __init__(self, index):
+        self._index = index
+
+    def __getattr__(self, name):
+        return getattr(_current()[1][self._index], name)
+
+
+word_store = _StoreProxy(0)
+article_store = _StoreProxy(1)
+user_store = _StoreProxy(2)
+definition_store = _StoreProxy(3)
+job_store = _StoreProxy(4)
+review_log_store = _StoreProxy(5)
+
+
+class _ThreadedStore:
+    """把同步 store 的方法包成 coroutine（在執行緒中執行），供 async 服務模式使用"""
+
+    def __init__(self, store):
+        self._store = store
+
+    def __getattr__(self, name):
+        method = getattr(self._store, name)
+
+        async def call(*args, **kwargs):
+            return await asyncio.to_thread(method, *args, **kwargs)
+        return call
+
+
+def async_stores():
+    """
+    async 服務模式的 (words, articles)：Firestore 使用原生 AsyncClient，
+    內嵌後端則在執行緒中呼叫同步實作。需在 event loop 內呼叫。
+    單字遷移期間（WORD_LAYOUT=dual）words 同樣在執行緒中呼叫同步實作，以共用新舊路徑的判斷。
+    """
+    backend, stores = _current()
+    if backend == "firestore":
+        from metrics import instrument_async_store
+        from storage.firestore_store import async_firestore_stores
+        words, articles = async_firestore_stores()
+        if getattr(stores[0], "layout", "user") != "user":
+            words = _ThreadedStore(stores[0])
+        else:
+            words = instrument_async_store(words, "words")
+        return words, instrument_async_store(articles, "articles")
+    return _ThreadedStore(stores[0]), _ThreadedStore(stores[1])
+
+
+__all__ = [
+    "configure", "reset", "use_stores", "current_stores", "backend_name", "async_stores", "NotFound", "Increment",
+    "WordStore", "ArticleStore", "UserStore", "DefinitionStore", "JobStore", "ReviewLogStore",
+    "word_store", "article_store", "user_store", "definition_store", "job_store", "review_log_store",
+]
@@ -0,0 +1,213 @@
+# backend/storage/base.py
+"""
+儲存層介面：路由只透過這些方法存取資料，不直接組 Firestore 查詢。
+兩種實作（firestore_store / sqlite_store）的查詢語意一致：
+- 文件以 dict 表示，時間欄位為 datetime
+- update 可使用 Increment 遞增數值欄位；目標文件不存在時拋 NotFound
+- 依 dueDate / createdAt 排序的查詢同時以文件 id 排序，缺少該欄位的文件不會出現
+- 單字以 (user_id, word_id) 定位，word_id 即單字本身（users/{uid}/words/{word}）
+- 單字與文章的每次寫入由儲存層加上 updatedAt（UTC），刪除時留下 tombstone（保留 TOMBSTONE_DAYS 天），
+  GET /sync 依此回傳差異
+介面以 abc 定義：實作缺少任何方法時在建立實例時就拋 TypeError，不會等到執行期第一次呼叫
+"""
+import os
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+
+TOMBSTONE_DAYS = int(os.getenv("SYNC_TOMBSTONE_DAYS", "30"))
+
+
+def naive_utc(dt: datetime) -> datetime:
+    """帶時區的時間轉為 UTC naive（Firestore 讀回帶時區，程式寫入的時間本來就是 UTC naive）"""
+    if dt.tzinfo is not None:
+        return dt.replace(tzinfo=None) - (dt.utcoffset() or timedelta(0))
+    return dt
+
+
+class NotFound(LookupError):
+    """update 的目標文件不存在"""
+
+
+class Increment:
+    """數值欄位遞增（Firestore 實作轉為 firestore.Increment，不需在匯入時載入 Firestore）"""
+
+    def __init__(self, value):
+        self.value = value
+
+    def __repr__(self):
+        return f"Increment({self.value!r})"
+
+
+def merge_fields(data, fields):
+    """在本機套用 update 的欄位（含 Increment），回傳新的 dict"""
+    merged = dict(data)
+    for k, v in fields.items():
+        if isinstance(v, Increment):
+            v = (merged.get(k) or 0) + v.value
+        merged[k] = v
+    return merged
+
+
+def touched(data):
+    """加上 updatedAt 的新 dict（set 的整份文件或 update 的欄位皆可）"""
+    return {**data, "updatedAt": datetime.utcnow()}
+
+
+def tombstone():
+    """刪除紀錄；expireAt 供 Firestore TTL 政策自動清除"""
+    now = datetime.utcnow()
+    return {"deletedAt": now, "expireAt": now + timedelta(days=TOMBSTONE_DAYS)}
+
+
+def legacy_word_id(user_id, doc_id) -> str:
+    """
+    舊版全域 words 集合的文件 id 轉為單字：POST /words 以單字本身為 id，
+    mark_unknown 以 "<userId>_<word>" 為 id
+    """
+    prefix = f"{user_id}_"
+    return doc_id[len(prefix):] if doc_id.startswith(prefix) else doc_id
+
+
+class DocumentStore(ABC):
+    """單一集合的基本讀寫"""
+
+    @abstractmethod
+    def get(self, doc_id, fields=None):
+        """回傳文件內容，不存在時回傳 None；fields 為欄位投影"""
+
+    @abstractmethod
+    def set(self, doc_id, data):
+        """整份覆寫"""
+
+    @abstractmethod
+    def update(self, doc_id, fields):
+        """部分更新"""
+
+    @abstractmethod
+    def delete(self, doc_id):
+        ...
+
+    @abstractmethod
+    def get_many(self, doc_ids, fields=None) -> dict:
+        """一次讀取多筆，回傳 {doc_id: data}（不存在的省略）；fields 為欄位投影"""
+
+
+class WordStore(ABC):
+    """
+    每位使用者的單字（users/{uid}/words/{word}）：所有方法都以 user_id 限定範圍，
+    單筆讀寫直接定位到該使用者的文件，不需另外確認 userId。文件仍保留 userId 欄位。
+    """
+
+    @abstractmethod
+    def get(self, user_id, word_id):
+        """回傳單字內容，不存在時回傳 None"""
+
+    @abstractmethod
+    def set(self, user_id, word_id, data):
+        """整份覆寫"""
+
+    @abstractmethod
+    def update(self, user_id, word_id, fields):
+        """部分更新"""
+
+    @abstractmethod
+    def delete(self, user_id, word_id):
+        ...
+
+    @abstractmethod
+    def get_many(self, user_id, word_ids) -> dict:
+        """一次讀取多個單字，回傳 {word_id: data}（不存在的省略）"""
+
+    @abstractmethod
+    def update_many(self, user_id, updates):
+        """
+        {word_id: fields} 以批次寫入；先確認全部文件存在，任一不存在則全部不寫。
+        Firestore 遷移期間的雙寫每個單字兩筆寫入，超過 250 個單字時分成多批
+        """
+
+    @abstractmethod
+    def set_many(self, user_id, docs):
+        """{word_id: data} 整份覆寫，以批次寫入（Firestore 每批最多 500 筆，超過時分成多批）"""
+
+    @abstractmethod
+    def for_user(self, user_id, fields=None):
+        """使用者的所有單字 [(word_id, data)]；fields 為欄位投影"""
+
+    @abstractmethod
+    def by_due(self, user_id, limit, until=None, after=None):
+        """
+        依 (dueDate, id) 升冪取單字 [(word_id, data)]。
+        until：只取 dueDate <= until；after：(dueDate, word_id)，從其後接續。
+        """
+
+    @abstractmethod
+    def page(self, user_id, limit, cursor=None, fields=None):
+        """依 createdAt 升冪分頁，回傳 (items, next_cursor)，格式同 pagination.paginate"""
+
+    @abstractmethod
+    def changed_since(self, user_id, since, fields=None):
+        """updatedAt > since 的單字 [(word_id, data)]"""
+
+    @abstractmethod
+    def deleted_since(self, user_id, since):
+        """deletedAt > since 的刪除紀錄 [(word_id, deletedAt)]"""
+
+
+class ArticleStore(DocumentStore):
+    """articles 集合；索引：(userId, createdAt)、(userId, updatedAt)；delete 會留下該使用者的 tombstone"""
+
+    @abstractmethod
+    def add(self, data) -> str:
+        """以自動產生的 id 新增文章，回傳 id"""
+
+    @abstractmethod
+    def page(self, user_id, limit, cursor=None, fields=None, descending=True):
+        """依 createdAt 分頁（預設新到舊），回傳 (items, next_cursor)"""
+
+    @abstractmethod
+    def changed_since(self, user_id, since=None, fields=None):
+        """updatedAt > since 的文章 [(article_id, data)]；since 為 None 時回傳使用者的全部文章"""
+
+    @abstractmethod
+    def deleted_since(self, user_id, since):
+        """deletedAt > since 的刪除紀錄 [(article_id, deletedAt)]"""
+
+
+class UserStore(DocumentStore):
+    """users 集合，文件 id 為 email"""
+
+    @abstractmethod
+    def merge_many(self, docs):
+        """{doc_id: fields} 合併寫入（文件不存在時建立），以批次寫入"""
+
+
+class DefinitionStore(DocumentStore):
+    """definitions 集合（跨使用者共用的單字定義），文件 id 為正規化後的單字"""
+
+    @abstractmethod
+    def set_many(self, docs):
+        """{doc_id: data} 以批次寫入"""
+
+
+class JobStore(DocumentStore):
+    """jobs 集合：背景工作（如單字匯入）的狀態，任何 worker 都能讀取以回應輪詢；文件 id 為 job id"""
+
+
+class ReviewLogStore(ABC):
+    """
+    複習紀錄（只新增、不修改）。每筆事件為 dict：
+    wordId、quality、reviewedAt、prevInterval、prevEase、prevDue（複習前的排程，可能為 None）、
+    interval、easeFactor（複習後的排程）
+    """
+
+    @abstractmethod
+    def append(self, user_id, events):
+        """新增多筆事件"""
+
+    @abstractmethod
+    def for_user(self, user_id, since=None):
+        """使用者 reviewedAt > since 的事件，依 reviewedAt 升冪"""
+
+    @abstractmethod
+    def scan(self):
+        """全部使用者的事件，逐批產生 (user_id, [event, ...])；批次與事件的順序不保證（fit_sm2 使用）"""
@@ -0,0 +1,559 @@
+# backend/storage/firestore_store.py
+"""
+Firestore 實作（正式環境）
+
+單字存放在 users/{uid}/words/{word}。從舊版全域 words 集合（userId 欄位 + 複合索引）
+搬遷期間由 WORD_LAYOUT 控制：
+- dual（預設）：已遷移的使用者（users/{uid}.wordsLayout == 2，由 migrate_words 寫入）只用新路徑；
+  其餘使用者從舊集合讀取，寫入時新舊兩邊都寫：新路徑已有文件時只合併寫入變更的欄位，
+  沒有時以 create() 寫入完整文件，新路徑上的文件因此一定完整、不會被舊資料蓋掉；
+  遷移工具以 create() 複製、已存在即跳過
+- 遷移標記的讀取結果會快取（尚未遷移的結果最多 LAYOUT_CHECK_TTL 秒），但寫入舊集合前一律重新確認：
+  標記與舊文件、新路徑文件在同一次 get_all 中讀取，遷移工具翻轉標記後不會再有 worker 寫舊集合
+- user：全部遷移完成後使用，不再檢查遷移標記也不再寫舊集合
+
+刪除紀錄（GET /sync 的 tombstone）存在 users/{uid}/deleted_words、users/{uid}/deleted_articles，
+與刪除本身在同一批次寫入；expireAt 欄位需在 Firestore 設定 TTL 政策自動清除。
+遷移期間的雙寫一律寫入新路徑的完整文件，因此 changed_since 只查新路徑。
+
+複習紀錄以「每位使用者每天一份文件」存放：users/{uid}/review_log/{YYYY-MM-DD}，
+事件以短欄位名（REVIEW_EVENT_KEYS）的 map 用 ArrayUnion 附加到 events 陣列，
+一次複習只多一次寫入，離線擬合時每讀一份文件就取得一整天的事件
+（每份約 90 bytes/事件，1 MiB 上限約一萬次複習/天）。
+"""
+import os
+import threading
+import time
+
+import firebase_admin
+from firebase_admin import credentials, firestore
+from google.api_core import exceptions as gexc
+
+from pagination import paginate
+from storage.base import (NotFound, Increment, DocumentStore, WordStore, ArticleStore, UserStore, DefinitionStore,
+                          JobStore, ReviewLogStore, merge_fields, legacy_word_id, touched, tombstone)
+
+WORD_LAYOUTS = ("dual", "user")
+WORD_LAYOUT = os.getenv("WORD_LAYOUT", "dual")
+# users/{uid} 上的遷移標記
+LAYOUT_FIELD = "wordsLayout"
+LAYOUT_VERSION = 2
+# 尚未遷移的結果只快取這麼久（遷移完成是單向的，完成後永久快取）
+LAYOUT_CHECK_TTL = float(os.getenv("WORD_LAYOUT_CHECK_TTL", "60"))
+# 單次 batch.commit() 的寫入上限
+BATCH_LIMIT = 500
+# 尚未遷移的使用者 update_many 每個單字寫兩份文件，每批最多這麼多單字
+DUAL_BATCH_WORDS = BATCH_LIMIT // 2
+# 複習事件的欄位名 → Firestore 中的短欄位名
+REVIEW_EVENT_KEYS = {"wordId": "w", "quality": "q", "reviewedAt": "t", "prevInterval": "pi", "prevEase": "pe",
+                     "prevDue": "pd", "interval": "i", "easeFactor": "e"}
+_REVIEW_EVENT_FIELDS = {short: key for key, short in REVIEW_EVENT_KEYS.items()}
+# scan 每頁讀取的紀錄文件數
+SCAN_PAGE_SIZE = 300
+# 舊集合 by_due 以 after 接續時，同一 dueDate 的文件要在 Python 內依單字排序，多取這些筆
+_LEGACY_SLACK = 20
+
+
+def ensure_app():
+    """以 GOOGLE_APPLICATION_CREDENTIALS 初始化 firebase_admin（只做一次）"""
+    if not firebase_admin._apps:
+        cred = credentials.Certificate(os.getenv("GOOGLE_APPLICATION_CREDENTIALS"))
+        firebase_admin.initialize_app(cred)
+
+
+def _project(data, fields):
+    return data if fields is None else {k: data[k] for k in fields if k in data}
+
+
+def _fields(fields):
+    """storage.Increment 轉為 firestore.Increment"""
+    return {k: firestore.Increment(v.value) if isinstance(v, Increment) else v for k, v in fields.items()}
+
+
+class _FirestoreCollection(DocumentStore):
+    def __init__(self, db, name):
+        self._db = db
+        self._col = db.collection(name)
+
+    def get(self, doc_id, fields=None):
+        snap = self._col.document(doc_id).get(list(fields) if fields is not None else None)
+        return snap.to_dict() if snap.exists else None
+
+    def set(self, doc_id, data):
+        self._col.document(doc_id).set(data)
+
+    def update(self, doc_id, fields):
+        try:
+            self._col.document(doc_id).update(_fields(fields))
+        except gexc.NotFound:
+            raise NotFound(doc_id)
+
+    def delete(self, doc_id):
+        self._col.document(doc_id).delete()
+
+    def get_many(self, doc_ids, fields=None):
+        refs = [self._col.document(d) for d in dict.fromkeys(doc_ids)]
+        if not refs:
+            return {}
+        field_paths = list(fields) if fields is not None else None
+        return {snap.id: snap.to_dict() for snap in self._db.get_all(refs, field_paths) if snap.exists}
+
+
+class FirestoreWordStore(WordStore):
+    def __init__(self, db, layout=None):
+        self.layout = layout or WORD_LAYOUT
+        if self.layout not in WORD_LAYOUTS:
+            raise ValueError(f"WORD_LAYOUT must be one of {', '.join(WORD_LAYOUTS)}")
+        self._db = db
+        self._users = db.collection("users")
+        self._legacy = db.collection("words")
+        self._migrated = {}   # user_id -> True，或「尚未遷移」結果的到期時間
+        self._lock = threading.Lock()
+
+    def _col(self, user_id):
+        return self._users.document(user_id).collection("words")
+
+    def _deleted(self, user_id):
+        return self._users.document(user_id).collection("deleted_words")
+
+    def migrated(self, user_id) -> bool:
+        """使用者的單字是否已搬到 users/{uid}/words"""
+        if self.layout == "user":
+            return True
+        with self._lock:
+            cached = self._migrated.get(user_id)
+        if cached is True or (cached is not None and cached > time.monotonic()):
+            return cached is True
+        snap = self._users.document(user_id).get([LAYOUT_FIELD])
+        done = snap.exists and (snap.to_dict() or {}).get(LAYOUT_FIELD) == LAYOUT_VERSION
+        with self._lock:
+            self._migrated[user_id] = True if done else time.monotonic() + LAYOUT_CHECK_TTL
+        return done
+
+    def _legacy_wanted(self, user_id, word_ids):
+        """要讀取的舊文件 {doc_id: (word_id, 優先順序)}；"<uid>_<word>" 與以單字為 id 的文件都可能存在，前者優先"""
+        wanted = {}
+        for word_id in dict.fromkeys(word_ids):
+            wanted[f"{user_id}_{word_id}"] = (word_id, 0)
+            wanted.setdefault(word_id, (word_id, 1))
+        return wanted
+
+    @staticmethod
+    def _pick_legacy(user_id, wanted, snaps):
+        found = {}
+        for snap in snaps:
+            data = snap.to_dict() if snap.exists else None
+            if data is None or data.get("userId") != user_id:
+                continue
+            word_id, rank = wanted[snap.id]
+            if word_id not in found or rank < found[word_id][0]:
+                found[word_id] = (rank, snap.reference, data)
+        return {word_id: (ref, data) for word_id, (_, ref, data) in found.items()}
+
+    def _legacy_docs(self, user_id, word_ids):
+        """舊集合中屬於 user_id 的文件 {word_id: (ref, data)}"""
+        wanted = self._legacy_wanted(user_id, word_ids)
+        if not wanted:
+            return {}
+        snaps = self._db.get_all([self._legacy.document(doc_id) for doc_id in wanted])
+        return self._pick_legacy(user_id, wanted, snaps)
+
+    def _dual_write_state(self, user_id, word_ids):
+        """
+        尚未遷移的使用者寫入前呼叫：不使用快取，重新讀取遷移標記，
+        並在同一次 get_all 讀取舊文件與新路徑文件。
+        回傳 (migrated, legacy {word_id: (ref, data)}, 新路徑已存在的 word_id 集合)
+        """
+        user_ref = self._users.document(user_id)
+        col = self._col(user_id)
+        wanted = self._legacy_wanted(user_id, word_ids)
+        legacy_refs = [self._legacy.document(doc_id) for doc_id in wanted]
+        new_refs = [col.document(w) for w in dict.fromkeys(word_ids)]
+        kinds = {user_ref.path: "user", **{r.path: "legacy" for r in legacy_refs}, **{r.path: "new" for r in new_refs}}
+
+        done, legacy_snaps, existing = False, [], set()
+        for snap in self._db.get_all([user_ref, *legacy_refs, *new_refs]):
+            kind = kinds[snap.reference.path]
+            if kind == "user":
+                done = snap.exists and (snap.to_dict() or {}).get(LAYOUT_FIELD) == LAYOUT_VERSION
+            elif kind == "legacy":
+                legacy_snaps.append(snap)
+            elif snap.exists:
+                existing.add(snap.id)
+        with self._lock:
+            self._migrated[user_id] = True if done else time.monotonic() + LAYOUT_CHECK_TTL
+        if done:
+            return True, {}, existing
+        return False, self._pick_legacy(user_id, wanted, legacy_snaps), existing
+
+    def _legacy_items(self, docs):
+        """舊集合查詢結果轉為 [(word_id, data)]，同一單字重複時保留 "<uid>_<word>" 那筆"""
+        items = {}
+        for doc in docs:
+            data = doc.to_dict()
+            word_id = legacy_word_id(data.get("userId", ""), doc.id)
+            if word_id not in items or doc.id != word_id:
+                items[word_id] = data
+        return items
+
+    def get(self, user_id, word_id):
+        if self.migrated(user_id):
+            snap = self._col(user_id).document(word_id).get()
+            return snap.to_dict() if snap.exists else None
+        legacy = self._legacy_docs(user_id, [word_id]).get(word_id)
+        return legacy[1] if legacy else None
+
+    def set(self, user_id, word_id, data):
+        data = touched(data)
+        ref = self._col(user_id).document(word_id)
+        if self.migrated(user_id):
+            ref.set(data)
+            return
+        migrated, legacy, _ = self._dual_write_state(user_id, [word_id])
+        if migrated:
+            ref.set(data)
+            return
+        legacy = legacy.get(word_id)
+        batch = self._db.batch()
+        batch.set(ref, data)
+        batch.set(legacy[0] if legacy else self._legacy.document(f"{user_id}_{word_id}"), data)
+        batch.commit()
+
+    def update(self, user_id, word_id, fields):
+        fields = touched(fields)
+        if not self.migrated(user_id):
+            self.update_many(user_id, {word_id: fields})
+            return
+        try:
+            self._col(user_id).document(word_id).update(_fields(fields))
+        except gexc.NotFound:
+            raise NotFound(word_id)
+
+    def delete(self, user_id, word_id):
+        batch = self._db.batch()
+        batch.delete(self._col(user_id).document(word_id))
+        batch.set(self._deleted(user_id).document(word_id), tombstone())
+        if not self.migrated(user_id):
+            for ref, _ in self._dual_write_state(user_id, [word_id])[1].values():
+                batch.delete(ref)
+        batch.commit()
+
+    def set_many(self, user_id, docs):
+        if not docs:
+            return
+        docs = {word_id: touched(data) for word_id, data in docs.items()}
+        col = self._col(user_id)
+        migrated = self.migrated(user_id)
+        if not migrated:
+            migrated, legacy, _ = self._dual_write_state(user_id, docs)
+        if migrated:
+            writes = [(col.document(w), data) for w, data in docs.items()]
+        else:
+            writes = []
+            for word_id, data in docs.items():
+                legacy_ref = legacy[word_id][0] if word_id in legacy else self._legacy.document(f"{user_id}_{word_id}")
+                writes += [(col.document(word_id), data), (legacy_ref, data)]
+        _commit_sets(self._db, writes)
+
+    def get_many(self, user_id, word_ids):
+        if not self.migrated(user_id):
+            return {word_id: data for word_id, (_, data) in self._legacy_docs(user_id, word_ids).items()}
+        col = self._col(user_id)
+        refs = [col.document(w) for w in dict.fromkeys(word_ids)]
+        if not refs:
+            return {}
+        return {snap.id: snap.to_dict() for snap in self._db.get_all(refs) if snap.exists}
+
+    def update_many(self, user_id, updates):
+        if not updates:
+            return
+        updates = {word_id: touched(fields) for word_id, fields in updates.items()}
+        if self.migrated(user_id):
+            self._commit_updates(user_id, updates)
+            return
+        migrated, legacy, existing = self._dual_write_state(user_id, updates)
+        if migrated:
+            self._commit_updates(user_id, updates)
+            return
+        missing = [w for w in updates if w not in legacy]
+        if missing:
+            raise NotFound(missing[0])
+        # 每個單字兩筆寫入（舊文件 + 新路徑），每批最多 DUAL_BATCH_WORDS 個單字
+        word_ids = list(updates)
+        for i in range(0, len(word_ids), DUAL_BATCH_WORDS):
+            chunk = {w: updates[w] for w in word_ids[i:i + DUAL_BATCH_WORDS]}
+            self._commit_dual_updates(user_id, chunk, legacy, existing)
+
+    def _commit_dual_updates(self, user_id, updates, legacy, existing):
+        """一批雙寫；新路徑的文件可能在讀取與寫入之間被建立（create 失敗），重新讀取這批後再試一次"""
+        col = self._col(user_id)
+        for attempt in range(2):
+            batch = self._db.batch()
+            for word_id, fields in updates.items():
+                ref, data = legacy[word_id]
+                batch.update(ref, _fields(fields))
+                if word_id in existing:
+                    # 只寫變更的欄位：舊文件可能比新路徑舊，不能以它覆寫整份
+                    batch.set(col.document(word_id), _fields(fields), merge=True)
+                else:
+                    batch.create(col.document(word_id), merge_fields(data, fields))
+            try:
+                batch.commit()
+                return
+            except gexc.Conflict:
+                if attempt:
+                    raise
+            except gexc.NotFound as e:
+                raise NotFound(str(e))
+            migrated, legacy, existing = self._dual_write_state(user_id, updates)
+            if migrated:
+                self._commit_updates(user_id, updates)
+                return
+            missing = [w for w in updates if w not in legacy]
+            if missing:
+                raise NotFound(missing[0])
+
+    def _commit_updates(self, user_id, updates):
+        col = self._col(user_id)
+        batch = self._db.batch()
+        for word_id, fields in updates.items():
+            batch.update(col.document(word_id), _fields(fields))
+        try:
+            batch.commit()
+        except gexc.NotFound as e:
+            raise NotFound(str(e))
+
+    def for_user(self, user_id, fields=None):
+        if self.migrated(user_id):
+            query = self._col(user_id)
+            if fields is not None:
+                query = query.select(list(fields))
+            return [(doc.id, doc.to_dict()) for doc in query.stream()]
+        query = self._legacy.where("userId", "==", user_id)
+        if fields is not None:
+            query = query.select(list(dict.fromkeys([*fields, "userId"])))
+        items = self._legacy_items(query.stream())
+        return [(word_id, _project(data, fields)) for word_id, data in items.items()]
+
+    def by_due(self, user_id, limit, until=None, after=None):
+        migrated = self.migrated(user_id)
+        query = self._col(user_id) if migrated else self._legacy.where("userId", "==", user_id)
+        if until is not None:
+            query = query.where("dueDate", "<=", until)
+        query = query.order_by("dueDate").order_by("__name__")
+        if migrated:
+            if after is not None:
+                query = query.start_after({"dueDate": after[0], "__name__": after[1]})
+            return [(doc.id, doc.to_dict()) for doc in query.limit(limit).stream()]
+
+        # 舊集合的文件 id 不是單字本身，同一 dueDate 內改在 Python 依單字排序
+        if after is not None:
+            query = query.where("dueDate", ">=", after[0])
+        items = self._legacy_items(query.limit(limit + _LEGACY_SLACK).stream())
+        ordered = sorted(((w, d) for w, d in items.items() if d.get("dueDate") is not None),
+                         key=lambda item: (item[1]["dueDate"], item[0]))
+        if after is not None:
+            ordered = [(w, d) for w, d in ordered if (d["dueDate"], w) > tuple(after)]
+        return ordered[:limit]
+
+    def page(self, user_id, limit, cursor=None, fields=None):
+        if self.migrated(user_id):
+            return paginate(self._col(user_id), "createdAt", limit, cursor, fields)
+        items, next_cursor = paginate(self._legacy.where("userId", "==", user_id), "createdAt", limit, cursor, fields)
+        for item in items:
+            item["id"] = legacy_word_id(user_id, item["id"])
+        return items, next_cursor
+
+    def changed_since(self, user_id, since, fields=None):
+        query = self._col(user_id).where("updatedAt", ">", since).order_by("updatedAt")
+        if fields is not None:
+            query = query.select(list(fields))
+        return [(doc.id, doc.to_dict()) for doc in query.stream()]
+
+    def deleted_since(self, user_id, since):
+        return _deleted_since(self._deleted(user_id), since)
+
+
+class FirestoreArticleStore(_FirestoreCollection, ArticleStore):
+    def set(self, doc_id, data):
+        super().set(doc_id, touched(data))
+
+    def update(self, doc_id, fields):
+        super().update(doc_id, touched(fields))
+
+    def add(self, data):
+        doc_ref = self._col.document()
+        doc_ref.set(touched(data))
+        return doc_ref.id
+
+    def delete(self, doc_id):
+        ref = self._col.document(doc_id)
+        snap = ref.get(["userId"])
+        user_id = (snap.to_dict() or {}).get("userId") if snap.exists else None
+        batch = self._db.batch()
+        batch.delete(ref)
+        if user_id:
+            batch.set(self._deleted(user_id).document(doc_id), tombstone())
+        batch.commit()
+
+    def _deleted(self, user_id):
+        return self._db.collection("users").document(user_id).collection("deleted_articles")
+
+    def page(self, user_id, limit, cursor=None, fields=None, descending=True):
+        return paginate(self._col.where("userId", "==", user_id), "createdAt", limit, cursor, fields,
+                        descending=descending)
+
+    def changed_since(self, user_id, since=None, fields=None):
+        query = self._col.where("userId", "==", user_id)
+        if since is not None:
+            query = query.where("updatedAt", ">", since).order_by("updatedAt")
+        if fields is not None:
+            query = query.select(list(fields))
+        return [(doc.id, doc.to_dict()) for doc in query.stream()]
+
+    def deleted_since(self, user_id, since):
+        return _deleted_since(self._deleted(user_id), since)
+
+
+class FirestoreUserStore(_FirestoreCollection, UserStore):
+    def merge_many(self, docs):
+        _commit_sets(self._db, [(self._col.document(d), data) for d, data in docs.items()], merge=True)
+
+
+class FirestoreDefinitionStore(_FirestoreCollection, DefinitionStore):
+    def set_many(self, docs):
+        _commit_sets(self._db, [(self._col.document(d), data) for d, data in docs.items()])
+
+
+class FirestoreJobStore(_FirestoreCollection, JobStore):
+    pass
+
+
+class FirestoreReviewLogStore(ReviewLogStore):
+    def __init__(self, db):
+        self._db = db
+        self._users = db.collection("users")
+
+    def _col(self, user_id):
+        return self._users.document(user_id).collection("review_log")
+
+    def append(self, user_id, events):
+        by_day = {}
+        for event in events:
+            compact = {REVIEW_EVENT_KEYS[k]: v for k, v in event.items() if k in REVIEW_EVENT_KEYS}
+            by_day.setdefault(event["reviewedAt"].strftime("%Y-%m-%d"), []).append(compact)
+        batch = self._db.batch()
+        for day, items in by_day.items():
+            batch.set(self._col(user_id).document(day), touched({
+                "day": day,
+                "events": firestore.ArrayUnion(items),
+                "count": firestore.Increment(len(items))
+            }), merge=True)
+        batch.commit()
+
+    def for_user(self, user_id, since=None):
+        query = self._col(user_id)
+        if since is not None:
+            query = query.where("day", ">=", since.strftime("%Y-%m-%d"))
+        events = [e for doc in query.stream() for e in _review_events(doc.to_dict())]
+        if since is not None:
+            events = [e for e in events if e["reviewedAt"] > since]
+        return sorted(events, key=lambda e: e["reviewedAt"])
+
+    def scan(self):
+        query = self._db.collection_group("review_log").select(["events"]).order_by("__name__")
+        last = None
+        while True:
+            page = list((query.start_after(last) if last is not None else query).limit(SCAN_PAGE_SIZE).stream())
+            for doc in page:
+                yield doc.reference.parent.parent.id, _review_events(doc.to_dict())
+            if len(page) < SCAN_PAGE_SIZE:
+                return
+            last = page[-1]
+
+
+def _review_events(data):
+    return [{_REVIEW_EVENT_FIELDS.get(k, k): v for k, v in e.items()} for e in data.get("events") or ()]
+
+
+def _deleted_since(col, since):
+    query = col.where("deletedAt", ">", since).order_by("deletedAt").select(["deletedAt"])
+    return [(doc.id, doc.to_dict()["deletedAt"]) for doc in query.stream()]
+
+
+def _commit_sets(db, writes, merge=False):
+    """[(ref, data)] 每 BATCH_LIMIT 筆一批 set()"""
+    for i in range(0, len(writes), BATCH_LIMIT):
+        batch = db.batch()
+        for ref, data in writes[i:i + BATCH_LIMIT]:
+            batch.set(ref, data, merge=merge)
+        batch.commit()
+
+
+def firestore_stores(db=None):
+    """回傳 (words, articles, users, definitions, jobs, review_log)"""
+    if db is None:
+        ensure_app()
+        db = firestore.client()
+    return (FirestoreWordStore(db), FirestoreArticleStore(db, "articles"),
+            FirestoreUserStore(db, "users"), FirestoreDefinitionStore(db, "definitions"),
+            FirestoreJobStore(db, "jobs"), FirestoreReviewLogStore(db))
+
+
+class AsyncFirestoreWordStore:
+    """
+    async 服務模式（asgi.py）用到的 WordStore 方法，使用 Firestore AsyncClient；
+    只支援 WORD_LAYOUT=user，遷移期間 async_stores() 改在執行緒中呼叫同步實作
+    """
+
+    def __init__(self, db):
+        self._users = db.collection("users")
+
+    def _col(self, user_id):
+        return self._users.document(user_id).collection("words")
+
+    async def get(self, user_id, word_id):
+        snap = await self._col(user_id).document(word_id).get()
+        return snap.to_dict() if snap.exists else None
+
+    async def set(self, user_id, word_id, data):
+        await self._col(user_id).document(word_id).set(touched(data))
+
+    async def update(self, user_id, word_id, fields):
+        try:
+            await self._col(user_id).document(word_id).update(_fields(touched(fields)))
+        except gexc.NotFound:
+            raise NotFound(word_id)
+
+    async def for_user(self, user_id, fields=None):
+        query = self._col(user_id)
+        if fields is not None:
+            query = query.select(list(fields))
+        return [(doc.id, doc.to_dict()) async for doc in query.stream()]
+
+    async def by_due(self, user_id, limit, until=None, after=None):
+        query = self._col(user_id)
+        if until is not None:
+            query = query.where("dueDate", "<=", until)
+        query = query.order_by("dueDate").order_by("__name__")
+        if after is not None:
+            query = query.start_after({"dueDate": after[0], "__name__": after[1]})
+        return [(doc.id, doc.to_dict()) async for doc in query.limit(limit).stream()]
+
+
+class AsyncFirestoreArticleStore:
+    def __init__(self, db):
+        self._col = db.collection("articles")
+
+    async def add(self, data):
+        doc_ref = self._col.document()
+        await doc_ref.set(touched(data))
+        return doc_ref.id
+
+
+def async_firestore_stores():
+    """回傳 (words, articles)；AsyncClient 需在 event loop 內建立"""
+    from firebase_admin import firestore_async
+    ensure_app()
+    db = firestore_async.client()
+    return AsyncFirestoreWordStore(db), AsyncFirestoreArticleStore(db)
@@ -0,0 +1,425 @@
+# backend/storage/sqlite_store.py
+"""
+內嵌實作：SQLite（檔案或 :memory:），供本機執行、測試與壓測使用。
+
+每個集合一張表：id、查詢用欄位（user_id、due_date、created_at、updated_at）與 JSON 文件本體。
+單字表 user_words 以 (user_id, id) 為主鍵，對應 Firestore 的 users/{uid}/words/{word}；
+索引 (user_id, due_date, id)、(user_id, created_at, id)、(user_id, updated_at) 對應 Firestore 的查詢，
+排序與游標語意與 Firestore 實作相同（時間欄位一律以 UTC 比較）。
+刪除單字與文章時在 tombstones 表留下紀錄（GET /sync），超過保留期限的在下次刪除時清除。
+複習紀錄 review_log 每個事件一列（欄位對應 ReviewLogStore 的事件），索引 (user_id, reviewed_at)。
+
+舊版資料庫的 words 表（全域 id）在開啟時一次轉入 user_words，原表改名為 words_legacy。
+"""
+import json
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from pagination import encode_cursor
+from storage.base import (NotFound, DocumentStore, WordStore, ArticleStore, UserStore, DefinitionStore, JobStore,
+                          ReviewLogStore,
+                          naive_utc, merge_fields, legacy_word_id, touched, tombstone, TOMBSTONE_DAYS)
+
+_TABLES = ("articles", "users", "definitions", "jobs")
+_INDEXED = ("user_words", "articles")
+_MAX_PARAMS = 500
+_SCAN_PAGE_SIZE = 5000
+_REVIEW_COLUMNS = ("word_id", "quality", "reviewed_at", "prev_interval", "prev_ease", "prev_due", "interval", "ease")
+
+
+def _sort_key(value):
+    """查詢欄位：只有 datetime 會被索引，其他型別視為缺少該欄位"""
+    if isinstance(value, datetime):
+        return naive_utc(value).isoformat(timespec="microseconds")
+    return None
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return {"$dt": naive_utc(value).isoformat(timespec="microseconds")}
+    raise TypeError(f"unsupported value: {type(value).__name__}")
+
+
+def _hook(obj):
+    if len(obj) == 1 and "$dt" in obj:
+        return datetime.fromisoformat(obj["$dt"])
+    return obj
+
+
+def _dumps(data) -> str:
+    return json.dumps(data, default=_default, ensure_ascii=False)
+
+
+def _loads(raw: str) -> dict:
+    return json.loads(raw, object_hook=_hook)
+
+
+def _project(data, fields):
+    return data if fields is None else {k: data[k] for k in fields if k in data}
+
+
+class SqliteDatabase:
+    """共用一條連線；SQLite 本身不允許多執行緒同時寫入，以鎖序列化"""
+
+    def __init__(self, path=":memory:"):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.lock = threading.RLock()
+        if path != ":memory:":
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+        for table in _TABLES:
+            self.conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "id TEXT PRIMARY KEY, user_id TEXT, due_date TEXT, created_at TEXT, updated_at TEXT, "
+                "data TEXT NOT NULL)"
+            )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS user_words ("
+            "user_id TEXT NOT NULL, id TEXT NOT NULL, due_date TEXT, created_at TEXT, updated_at TEXT, "
+            "data TEXT NOT NULL, PRIMARY KEY (user_id, id))"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS tombstones ("
+            "user_id TEXT NOT NULL, kind TEXT NOT NULL, id TEXT NOT NULL, deleted_at TEXT NOT NULL, "
+            "PRIMARY KEY (user_id, kind, id))"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS review_log ("
+            "user_id TEXT NOT NULL, word_id TEXT NOT NULL, quality INTEGER NOT NULL, reviewed_at TEXT NOT NULL, "
+            "prev_interval INTEGER, prev_ease REAL, prev_due TEXT, interval INTEGER, ease REAL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS review_log_user ON review_log (user_id, reviewed_at)")
+        for table in (*_TABLES, "user_words"):
+            columns = {row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+            if "updated_at" not in columns:
+                self.conn.execute(f"ALTER TABLE {table} ADD COLUMN updated_at TEXT")
+        self._migrate_legacy_words()
+        for table in _INDEXED:
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_user_due ON {table} (user_id, due_date, id)")
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_user_created ON {table} (user_id, created_at, id)")
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_user_updated ON {table} (user_id, updated_at)")
+
+    def _migrate_legacy_words(self):
+        """舊版 words 表（id 全域唯一）轉入 user_words；同一使用者重複的單字保留 "<uid>_<word>" 那筆"""
+        if not self.conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'words'").fetchall():
+            return
+        rows = self.conn.execute("SELECT id, user_id, due_date, created_at, data FROM words "
+                                 "WHERE user_id IS NOT NULL ORDER BY length(id)").fetchall()
+        self.conn.execute("BEGIN")
+        try:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO user_words (user_id, id, due_date, created_at, data) VALUES (?, ?, ?, ?, ?)",
+                [(user_id, legacy_word_id(user_id, doc_id), due, created, data)
+                 for doc_id, user_id, due, created, data in rows]
+            )
+            self.conn.execute("ALTER TABLE words RENAME TO words_legacy")
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def query(self, sql, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def bury(self, user_id, kind, doc_id):
+        """留下刪除紀錄並清除該使用者過期的紀錄；呼叫端需持有 lock"""
+        deleted_at = tombstone()["deletedAt"]
+        self.conn.execute("DELETE FROM tombstones WHERE user_id = ? AND deleted_at < ?",
+                          (user_id, _sort_key(deleted_at - timedelta(days=TOMBSTONE_DAYS))))
+        self.conn.execute("INSERT OR REPLACE INTO tombstones (user_id, kind, id, deleted_at) VALUES (?, ?, ?, ?)",
+                          (user_id, kind, doc_id, _sort_key(deleted_at)))
+
+    def deleted_since(self, user_id, kind, since):
+        rows = self.query("SELECT id, deleted_at FROM tombstones WHERE user_id = ? AND kind = ? AND deleted_at > ? "
+                          "ORDER BY deleted_at", (user_id, kind, _sort_key(since)))
+        return [(doc_id, datetime.fromisoformat(deleted_at)) for doc_id, deleted_at in rows]
+
+
+class _SqliteCollection(DocumentStore):
+    def __init__(self, database, table):
+        self._db = database
+        self._table = table
+
+    def get(self, doc_id, fields=None):
+        rows = self._db.query(f"SELECT data FROM {self._table} WHERE id = ?", (doc_id,))
+        return _project(_loads(rows[0][0]), fields) if rows else None
+
+    def _write(self, doc_id, data):
+        self._db.conn.execute(
+            f"INSERT OR REPLACE INTO {self._table} (id, user_id, due_date, created_at, updated_at, data) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (doc_id, data.get("userId"), _sort_key(data.get("dueDate")), _sort_key(data.get("createdAt")),
+             _sort_key(data.get("updatedAt")), _dumps(data))
+        )
+
+    def set(self, doc_id, data):
+        with self._db.lock:
+            self._write(doc_id, data)
+
+    def update(self, doc_id, fields):
+        with self._db.lock:
+            data = self.get(doc_id)
+            if data is None:
+                raise NotFound(doc_id)
+            self._write(doc_id, merge_fields(data, fields))
+
+    def delete(self, doc_id):
+        self._db.query(f"DELETE FROM {self._table} WHERE id = ?", (doc_id,))
+
+    def get_many(self, doc_ids, fields=None):
+        ids = list(dict.fromkeys(doc_ids))
+        found = {}
+        for i in range(0, len(ids), _MAX_PARAMS):
+            chunk = ids[i:i + _MAX_PARAMS]
+            marks = ",".join("?" * len(chunk))
+            for doc_id, raw in self._db.query(f"SELECT id, data FROM {self._table} WHERE id IN ({marks})", chunk):
+                found[doc_id] = _project(_loads(raw), fields)
+        return found
+
+    def _page(self, user_id, limit, cursor, fields, descending):
+        return _page(self._db, self._table, user_id, limit, cursor, fields, descending)
+
+
+def _page(database, table, user_id, limit, cursor, fields, descending):
+    """依 (createdAt, id) 分頁，語意同 pagination.paginate"""
+    op, direction = ("<", "DESC") if descending else (">", "ASC")
+    sql = f"SELECT id, data FROM {table} WHERE user_id = ? AND created_at IS NOT NULL"
+    params = [user_id]
+    if cursor is not None:
+        value, doc_id = _sort_key(cursor[0]), cursor[1]
+        sql += f" AND (created_at {op} ? OR (created_at = ? AND id {op} ?))"
+        params += [value, value, doc_id]
+    sql += f" ORDER BY created_at {direction}, id {direction} LIMIT ?"
+    params.append(limit + 1)
+    rows = database.query(sql, params)
+
+    docs = [(doc_id, _loads(raw)) for doc_id, raw in rows[:limit]]
+    items = [{**_project(data, fields), "id": doc_id} for doc_id, data in docs]
+    next_cursor = None
+    if len(rows) > limit and docs:
+        doc_id, data = docs[-1]
+        next_cursor = encode_cursor(data.get("createdAt"), doc_id)
+    return items, next_cursor
+
+
+def _changed_since(database, table, user_id, since, fields):
+    sql = f"SELECT id, data FROM {table} WHERE user_id = ?"
+    params = [user_id]
+    if since is not None:
+        sql += " AND updated_at > ?"
+        params.append(_sort_key(since))
+    rows = database.query(sql + " ORDER BY updated_at", params)
+    return [(doc_id, _project(_loads(raw), fields)) for doc_id, raw in rows]
+
+
+class SqliteWordStore(WordStore):
+    def __init__(self, database):
+        self._db = database
+
+    def get(self, user_id, word_id):
+        rows = self._db.query("SELECT data FROM user_words WHERE user_id = ? AND id = ?", (user_id, word_id))
+        return _loads(rows[0][0]) if rows else None
+
+    def _write(self, user_id, word_id, data):
+        data = touched(data)
+        self._db.conn.execute(
+            "INSERT OR REPLACE INTO user_words (user_id, id, due_date, created_at, updated_at, data) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (user_id, word_id, _sort_key(data.get("dueDate")), _sort_key(data.get("createdAt")),
+             _sort_key(data["updatedAt"]), _dumps(data))
+        )
+
+    def set(self, user_id, word_id, data):
+        with self._db.lock:
+            self._write(user_id, word_id, data)
+
+    def update(self, user_id, word_id, fields):
+        self.update_many(user_id, {word_id: fields})
+
+    def set_many(self, user_id, docs):
+        with self._db.lock:
+            self._db.conn.execute("BEGIN")
+            try:
+                for word_id, data in docs.items():
+                    self._write(user_id, word_id, data)
+                self._db.conn.execute("COMMIT")
+            except Exception:
+                self._db.conn.execute("ROLLBACK")
+                raise
+
+    def delete(self, user_id, word_id):
+        with self._db.lock:
+            deleted = self._db.conn.execute("DELETE FROM user_words WHERE user_id = ? AND id = ?", (user_id, word_id))
+            if deleted.rowcount:
+                self._db.bury(user_id, "word", word_id)
+
+    def get_many(self, user_id, word_ids):
+        ids = list(dict.fromkeys(word_ids))
+        found = {}
+        for i in range(0, len(ids), _MAX_PARAMS):
+            chunk = ids[i:i + _MAX_PARAMS]
+            marks = ",".join("?" * len(chunk))
+            rows = self._db.query(f"SELECT id, data FROM user_words WHERE user_id = ? AND id IN ({marks})",
+                                  [user_id, *chunk])
+            for doc_id, raw in rows:
+                found[doc_id] = _loads(raw)
+        return found
+
+    def update_many(self, user_id, updates):
+        if not updates:
+            return
+        with self._db.lock:
+            current = self.get_many(user_id, updates)
+            missing = [w for w in updates if w not in current]
+            if missing:
+                raise NotFound(missing[0])
+            self._db.conn.execute("BEGIN")
+            try:
+                for word_id, fields in updates.items():
+                    self._write(user_id, word_id, merge_fields(current[word_id], fields))
+                self._db.conn.execute("COMMIT")
+            except Exception:
+                self._db.conn.execute("ROLLBACK")
+                raise
+
+    def for_user(self, user_id, fields=None):
+        rows = self._db.query("SELECT id, data FROM user_words WHERE user_id = ?", (user_id,))
+        return [(doc_id, _project(_loads(raw), fields)) for doc_id, raw in rows]
+
+    def by_due(self, user_id, limit, until=None, after=None):
+        sql = "SELECT id, data FROM user_words WHERE user_id = ? AND due_date IS NOT NULL"
+        params = [user_id]
+        if until is not None:
+            sql += " AND due_date <= ?"
+            params.append(_sort_key(until))
+        if after is not None:
+            value = _sort_key(after[0])
+            sql += " AND (due_date > ? OR (due_date = ? AND id > ?))"
+            params += [value, value, after[1]]
+        sql += " ORDER BY due_date, id LIMIT ?"
+        params.append(limit)
+        return [(doc_id, _loads(raw)) for doc_id, raw in self._db.query(sql, params)]
+
+    def page(self, user_id, limit, cursor=None, fields=None):
+        return _page(self._db, "user_words", user_id, limit, cursor, fields, descending=False)
+
+    def changed_since(self, user_id, since, fields=None):
+        return _changed_since(self._db, "user_words", user_id, since, fields)
+
+    def deleted_since(self, user_id, since):
+        return self._db.deleted_since(user_id, "word", since)
+
+
+class SqliteArticleStore(_SqliteCollection, ArticleStore):
+    def _write(self, doc_id, data):
+        super()._write(doc_id, touched(data))
+
+    def add(self, data):
+        doc_id = uuid.uuid4().hex[:20]
+        self.set(doc_id, data)
+        return doc_id
+
+    def delete(self, doc_id):
+        with self._db.lock:
+            rows = self._db.query("SELECT user_id FROM articles WHERE id = ?", (doc_id,))
+            self._db.conn.execute("DELETE FROM articles WHERE id = ?", (doc_id,))
+            if rows and rows[0][0]:
+                self._db.bury(rows[0][0], "article", doc_id)
+
+    def page(self, user_id, limit, cursor=None, fields=None, descending=True):
+        return self._page(user_id, limit, cursor, fields, descending)
+
+    def changed_since(self, user_id, since=None, fields=None):
+        return _changed_since(self._db, "articles", user_id, since, fields)
+
+    def deleted_since(self, user_id, since):
+        return self._db.deleted_since(user_id, "article", since)
+
+
+class SqliteUserStore(_SqliteCollection, UserStore):
+    def merge_many(self, docs):
+        with self._db.lock:
+            self._db.conn.execute("BEGIN")
+            try:
+                for doc_id, fields in docs.items():
+                    self._write(doc_id, merge_fields(self.get(doc_id) or {}, fields))
+                self._db.conn.execute("COMMIT")
+            except Exception:
+                self._db.conn.execute("ROLLBACK")
+                raise
+
+
+class SqliteDefinitionStore(_SqliteCollection, DefinitionStore):
+    def set_many(self, docs):
+        with self._db.lock:
+            self._db.conn.execute("BEGIN")
+            try:
+                for doc_id, data in docs.items():
+                    self._write(doc_id, data)
+                self._db.conn.execute("COMMIT")
+            except Exception:
+                self._db.conn.execute("ROLLBACK")
+                raise
+
+
+class SqliteJobStore(_SqliteCollection, JobStore):
+    pass
+
+
+def _review_event(row) -> dict:
+    word_id, quality, reviewed_at, prev_interval, prev_ease, prev_due, interval, ease = row
+    return {
+        "wordId": word_id, "quality": quality, "reviewedAt": datetime.fromisoformat(reviewed_at),
+        "prevInterval": prev_interval, "prevEase": prev_ease,
+        "prevDue": datetime.fromisoformat(prev_due) if prev_due else None,
+        "interval": interval, "easeFactor": ease
+    }
+
+
+class SqliteReviewLogStore(ReviewLogStore):
+    def __init__(self, database):
+        self._db = database
+
+    def append(self, user_id, events):
+        rows = [(user_id, e["wordId"], e["quality"], _sort_key(e["reviewedAt"]), e.get("prevInterval"),
+                 e.get("prevEase"), _sort_key(e.get("prevDue")), e.get("interval"), e.get("easeFactor"))
+                for e in events]
+        with self._db.lock:
+            self._db.conn.executemany(
+                f"INSERT INTO review_log (user_id, {', '.join(_REVIEW_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+
+    def for_user(self, user_id, since=None):
+        rows = self._db.query(
+            f"SELECT {', '.join(_REVIEW_COLUMNS)} FROM review_log WHERE user_id = ? AND reviewed_at > ? "
+            "ORDER BY reviewed_at, rowid", (user_id, _sort_key(since) or "")
+        )
+        return [_review_event(row) for row in rows]
+
+    def scan(self):
+        last = 0
+        while True:
+            rows = self._db.query(
+                f"SELECT rowid, user_id, {', '.join(_REVIEW_COLUMNS)} FROM review_log WHERE rowid > ? "
+                "ORDER BY rowid LIMIT ?", (last, _SCAN_PAGE_SIZE)
+            )
+            by_user = {}
+            for row in rows:
+                by_user.setdefault(row[1], []).append(_review_event(row[2:]))
+            yield from by_user.items()
+            if len(rows) < _SCAN_PAGE_SIZE:
+                return
+            last = rows[-1][0]
+
+
+def sqlite_stores(path=":memory:"):
+    """回傳 (words, articles, users, definitions, jobs, review_log)，共用同一個資料庫"""
+    database = SqliteDatabase(path)
+    return (SqliteWordStore(database), SqliteArticleStore(database, "articles"),
+            SqliteUserStore(database, "users"), SqliteDefinitionStore(database, "definitions"),
+            SqliteJobStore(database, "jobs"), SqliteReviewLogStore(database))
@@ -0,0 +1,94 @@
+# backend/sync/routes.py
+"""
+差異同步：GET /sync?since=<token>
+
+App 開啟畫面時不必再重抓 GET /words、/review/due、/articles 的完整清單：
+- 沒有 since：回傳全部單字與文章摘要（full=true）
+- 有 since：只回傳之後新增或修改的單字（含複習排程欄位）與文章摘要，
+  以及 deletedWords / deletedArticles（tombstone）；同一期間刪除後又新增的單字只出現在 words
+- 每次回應帶新的 token；查詢往前多取 SYNC_OVERLAP 秒，涵蓋時間戳已產生但尚未寫入完成的寫入，
+  重複收到的項目以 id 覆蓋即可
+- token 早於 tombstone 保留期限（SYNC_TOMBSTONE_DAYS）時改回傳完整資料（full=true），
+  用戶端應以回應取代本機資料
+- 回應超過 COMPRESS_MIN_BYTES 時依 Accept-Encoding 以 br / gzip 壓縮（compression.py）
+單字省略 userId；文章只回傳摘要欄位，內文以 GET /articles/<id> 取得。
+"""
+import base64
+import json
+import os
+from datetime import datetime, timedelta
+
+from flask import Blueprint, request, jsonify, g, current_app
+
+from articles.routes import ARTICLE_SUMMARY_FIELDS
+from auth.utils import auth_required
+from storage import word_store, article_store
+from storage.base import TOMBSTONE_DAYS
+
+bp = Blueprint("sync", __name__, url_prefix="/sync")
+
+OVERLAP_SECONDS = float(os.getenv("SYNC_OVERLAP", "5"))
+TOKEN_VERSION = 1
+ARTICLE_FIELDS = [*ARTICLE_SUMMARY_FIELDS, "updatedAt"]
+
+
+def encode_token(at: datetime) -> str:
+    raw = json.dumps({"v": TOKEN_VERSION, "t": at.isoformat()}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_token(token: str):
+    """回傳 token 的時間；版本不符時回傳 None（視同第一次同步），格式錯誤拋 ValueError"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        if payload.get("v") != TOKEN_VERSION:
+            return None
+        return datetime.fromisoformat(payload["t"])
+    except (ValueError, KeyError, TypeError, AttributeError):
+        raise ValueError("invalid since token")
+
+
+def changes(user_id, since, now):
+    """since 為 None 或早於 tombstone 保留期限時回傳完整資料"""
+    full = since is None or since < now - timedelta(days=TOMBSTONE_DAYS)
+    if full:
+        words = word_store.for_user(user_id)
+        articles = article_store.changed_since(user_id, None, ARTICLE_FIELDS)
+        deleted_words, deleted_articles = [], []
+    else:
+        after = since - timedelta(seconds=OVERLAP_SECONDS)
+        words = word_store.changed_since(user_id, after)
+        articles = article_store.changed_since(user_id, after, ARTICLE_FIELDS)
+        word_ids = {word_id for word_id, _ in words}
+        article_ids = {article_id for article_id, _ in articles}
+        deleted_words = [w for w, _ in word_store.deleted_since(user_id, after) if w not in word_ids]
+        deleted_articles = [a for a, _ in article_store.deleted_since(user_id, after) if a not in article_ids]
+
+    return {
+        "token": encode_token(now),
+        "full": full,
+        "words": [{**{k: v for k, v in data.items() if k != "userId"}, "id": word_id} for word_id, data in words],
+        "deletedWords": deleted_words,
+        "articles": [{**data, "id": article_id} for article_id, data in articles],
+        "deletedArticles": deleted_articles
+    }
+
+
+@bp.route("", methods=["GET"])
+@auth_required
+def sync():
+    """
+    query param: ?since=<上次回應的 token>
+    回傳 { token, full, words, deletedWords, articles, deletedArticles }
+    """
+    now = datetime.utcnow()
+    since = request.args.get("since")
+    try:
+        since = decode_token(since) if since else None
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+
+    body = current_app.json.dumps(changes(g.user["sub"], since, now)).encode()
+    resp = current_app.response_class(body, mimetype="application/json")
+    resp.headers["Cache-Control"] = "private, no-store"
+    return resp
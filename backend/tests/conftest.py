@@ -0,0 +1,33 @@
+# backend/tests/conftest.py
+import os
+import time
+import pytest
+
+# 測試一律使用內嵌的記憶體儲存後端，不需要 Google 憑證
+os.environ["STORAGE_BACKEND"] = "memory"
+# 文章預產池會在背景呼叫 GPT，測試中預設關閉（tests/test_article_pool.py 自行建立實例）
+os.environ["ARTICLE_POOL"] = "0"
+
+
+@pytest.fixture
+def app():
+    """每個測試建立新的 app；create_app 會重設記憶體儲存層，測試資料要在取得 app / client 之後才寫入"""
+    from app import create_app
+    return create_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth_headers():
+    """auth_headers(user) → 帶該使用者 JWT 的 Authorization header"""
+    import jwt
+    from auth.utils import SECRET_KEY
+
+    def make(sub, **claims):
+        token = jwt.encode({"sub": sub, "exp": time.time() + 60, **claims}, SECRET_KEY, algorithm="HS256")
+        return {"Authorization": f"Bearer {token}"}
+    return make
@@ -0,0 +1,78 @@
+import gzip
+import json
+from storage import article_store
+from compression import base_etag
+
+USER = "etag@example.com"
+TEXT = "The glacier moved slowly across the valley. " * 60
+
+
+class _RecordingStore:
+    def __init__(self, store):
+        self._store = store
+        self.reads = []
+
+    def get(self, article_id, fields=None):
+        self.reads.append(fields)
+        return self._store.get(article_id, fields=fields)
+
+    def __getattr__(self, name):
+        return getattr(self._store, name)
+
+
+def _recording_store(monkeypatch):
+    import articles.routes
+    store = _RecordingStore(article_store)
+    monkeypatch.setattr(articles.routes, "article_store", store)
+    articles.routes.article_cache.clear()
+    return store
+
+
+def test_etag_304_and_cached_payload(monkeypatch, client, auth_headers):
+    store = _recording_store(monkeypatch)
+    headers = auth_headers(USER)
+    from articles.routes import article_document
+    article_id = article_store.add(article_document(USER, 800, ["glacier"], TEXT, 820))
+
+    first = client.get(f"/articles/{article_id}", headers=headers)
+    assert first.status_code == 200 and first.get_json()["article"] == TEXT
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    store.reads.clear()
+    again = client.get(f"/articles/{article_id}", headers={**headers, "If-None-Match": etag})
+    assert again.status_code == 304 and again.data == b"" and again.headers["ETag"] == etag
+    # 只讀驗證用的欄位，不讀內文
+    assert store.reads == [["userId", "contentHash", "updatedAt"]]
+
+    store.reads.clear()
+    zipped = client.get(f"/articles/{article_id}", headers={**headers, "Accept-Encoding": "gzip"})
+    assert zipped.headers["Content-Encoding"] == "gzip" and "Accept-Encoding" in zipped.headers["Vary"]
+    assert json.loads(gzip.decompress(zipped.data))["article"] == TEXT
+    assert zipped.headers["ETag"] == etag[:-1] + '-gzip"'
+    assert len(store.reads) == 1   # LRU 命中，不再讀整份文件
+    not_modified = client.get(f"/articles/{article_id}",
+                              headers={**headers, "If-None-Match": zipped.headers["ETag"]})
+    assert not_modified.status_code == 304
+
+    assert client.put(f"/articles/{article_id}", json={"targetWords": ["valley"]},
+                      headers=headers).status_code == 200
+    changed = client.get(f"/articles/{article_id}", headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["ETag"] != etag
+    assert changed.get_json()["targetWords"] == ["valley"]
+
+    assert client.get(f"/articles/{article_id}", headers={**auth_headers("other@example.com"),
+                                                          "If-None-Match": etag}).status_code == 404
+
+
+def test_legacy_article_without_content_hash(monkeypatch, client, auth_headers):
+    _recording_store(monkeypatch)
+    headers = auth_headers(USER)
+    article_id = article_store.add({"userId": USER, "article": "short legacy text"})
+
+    first = client.get(f"/articles/{article_id}", headers=headers)
+    assert first.status_code == 200 and "Content-Encoding" not in first.headers
+    etag = first.headers["ETag"]
+    assert client.get(f"/articles/{article_id}",
+                      headers={**headers, "If-None-Match": f"W/{etag}"}).status_code == 304
+    assert base_etag("abc-gzip") == "abc" and base_etag("abc") == "abc"
@@ -0,0 +1,87 @@
+import time
+from datetime import datetime, timedelta
+from article_pool import ArticlePool, article_pool
+from storage import word_store
+
+STORY = "The cat sat on the mat. It was a sunny day, and the cat was happy to rest in the warm light."
+
+
+def _seed(user_id, words):
+    now = datetime.utcnow()
+    for i, word in enumerate(words):
+        word_store.set(user_id, word, {"userId": user_id, "dueDate": now - timedelta(days=10 - i)})
+
+
+def _pool(**kwargs):
+    calls = []
+
+    def generate(lexile_target, target_words):
+        calls.append((lexile_target, list(target_words)))
+        return STORY
+    options = {"enabled": True, "delay": 3600, "tolerance": 5000, "generate": generate}
+    options.update(kwargs)
+    return ArticlePool(**options), calls
+
+
+def test_refill_predicts_due_words_and_take_matches_band_and_words():
+    user = "pool1@example.com"
+    words = [f"pool1w{i}" for i in range(6)]
+    _seed(user, words)
+    pool, calls = _pool()
+    assert not pool.refill(user)            # 沒產過文的使用者不預產
+
+    pool.note_request(user, 640)
+    pool.note_request(user, 1200)
+    pool.note_request(user, 650)
+    assert pool.refill(user)
+    assert calls == [(650, words[:5])]
+    assert not pool.refill(user)            # 預測結果沒變就不重產
+
+    assert pool.take(user, 900, words[:5]) is None                    # 不同區段
+    assert pool.take(user, 610, words[:4]) is None                    # 單字不同
+    hit = pool.take(user, 610, [w.upper() for w in reversed(words[:5])])
+    assert hit["article"] == STORY and isinstance(hit["lexileActual"], int)
+    assert pool.take(user, 610, words[:5]) is None                    # 同一篇只給一次
+    assert pool.stats()["hits"] == 1
+
+
+def test_off_band_articles_expired_entries_and_changed_words_are_dropped():
+    user = "pool2@example.com"
+    words = [f"pool2w{i}" for i in range(5)]
+    _seed(user, words)
+
+    strict, _ = _pool(tolerance=0)
+    strict.note_request(user, 1900)
+    assert not strict.refill(user) and strict.stats()["discarded"] == 1
+
+    pool, _ = _pool(ttl=0)
+    pool.note_request(user, 600)
+    assert pool.refill(user)
+    time.sleep(0.01)
+    assert pool.take(user, 600, words) is None
+
+    pool, _ = _pool()
+    pool.note_request(user, 600)
+    assert pool.refill(user)
+    pool.word_changed(user, words[2])
+    assert pool.take(user, 600, words) is None
+
+
+def test_create_article_serves_from_pool(monkeypatch, client, auth_headers):
+    user = "pool3@example.com"
+    words = [f"pool3w{i}" for i in range(5)]
+    _seed(user, words)
+    monkeypatch.setattr(article_pool, "enabled", True)
+    monkeypatch.setattr(article_pool, "delay", 3600)
+    monkeypatch.setattr(article_pool, "tolerance", 5000)
+    monkeypatch.setattr(article_pool, "_generate", lambda target, targets: STORY)
+    try:
+        article_pool.note_request(user, 700)
+        assert article_pool.refill(user)
+
+        resp = client.post("/articles", json={"lexileTarget": 720}, headers=auth_headers(user))
+        assert resp.status_code == 201
+        body = resp.get_json()
+        assert body["article"] == STORY and body["wordCounts"] == {w: 0 for w in words}
+    finally:
+        article_pool.clear()
@@ -0,0 +1,31 @@
+import json
+import llm
+import articles.routes
+from storage import word_store
+
+USER = "stream@example.com"
+
+
+def _events(resp):
+    events = []
+    for block in resp.get_data(as_text=True).strip().split("\n\n"):
+        event, data = block.split("\n", 1)
+        events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def test_stream_tokens_done_and_analysis_error(monkeypatch, client, auth_headers):
+    word_store.set(USER, "glacier", {"userId": USER, "dueDate": None})
+    monkeypatch.setattr(llm, "stream", lambda site, messages, **options: iter(["The glacier ", "moved."]))
+    body = {"lexileTarget": 600, "targetWords": ["glacier"]}
+
+    events = _events(client.post("/articles/stream", json=body, headers=auth_headers(USER)))
+    assert [e for e, _ in events] == ["token", "token", "done"]
+    assert events[-1][1]["wordCounts"] == {"glacier": 1}
+
+    def fail(text):
+        raise RuntimeError("lexile down")
+    monkeypatch.setattr(articles.routes, "lexile_score", fail)
+    events = _events(client.post("/articles/stream", json=body, headers=auth_headers(USER)))
+    assert [e for e, _ in events] == ["token", "token", "error"]
+    assert events[-1][1]["detail"] == "lexile down"
@@ -0,0 +1,82 @@
+import asyncio
+import random
+from datetime import datetime, timedelta
+import httpx
+import pytest
+import llm
+from benchmarks.fakes import reply_for
+from storage import word_store, article_store
+
+WORDS = ["glacier", "crevasse", "valley", "summit", "harbor", "lantern"]
+
+
+@pytest.fixture
+def asgi_app(monkeypatch):
+    """asgi.app 與同步 Flask app 共用同一份記憶體儲存層，GPT 兩邊都換成相同的假回覆"""
+    import asgi
+
+    async def acomplete(site, messages, **options):
+        return reply_for(messages, options.get("response_format"))
+
+    monkeypatch.setattr(llm, "complete", lambda site, messages, **options:
+                        reply_for(messages, options.get("response_format")))
+    monkeypatch.setattr(asgi, "acomplete", acomplete)
+    monkeypatch.setattr(asgi, "_stores", None)
+    return asgi.app
+
+
+def _seed(user):
+    now = datetime.utcnow()
+    for i, word in enumerate(WORDS):
+        word_store.set(user, word, {"userId": user, "createdAt": now, "lastInterval": 1, "easeFactor": 2.5,
+                                    "dueDate": now - timedelta(days=len(WORDS) - i), "short": "測試", "full": "n. 測試"})
+
+
+def _call(app, method, path, headers, json=None):
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://asgi") as http:
+            return await http.request(method, path, json=json, headers=headers)
+    return asyncio.run(run())
+
+
+def test_async_endpoints_match_sync(client, auth_headers, asgi_app):
+    sync_user, async_user = "sync-mode@example.com", "async-mode@example.com"
+    _seed(sync_user)
+    _seed(async_user)
+
+    def both(method, path, json=None):
+        random.seed(7)
+        sync = client.open(path, method=method, json=json, headers=auth_headers(sync_user))
+        random.seed(7)
+        resp = _call(asgi_app, method, path, auth_headers(async_user), json)
+        assert resp.status_code == sync.status_code
+        return sync.get_json(), resp.json()
+
+    for body in ({"word": "fjord"}, {"word": "glacier"}):
+        sync, resp = both("POST", "/words", body)
+        assert resp == sync
+    fields = ("lastInterval", "easeFactor", "reviewCount", "short")
+    for word in ("fjord", "glacier"):
+        assert ({k: word_store.get(async_user, word).get(k) for k in fields}
+                == {k: word_store.get(sync_user, word).get(k) for k in fields})
+
+    sync, article = both("POST", "/articles", {"lexileTarget": 700})
+    assert {**article, "id": None} == {**sync, "id": None}
+    assert article_store.get(article["id"])["userId"] == async_user
+
+    sync, resp = both("GET", "/words/quiz")
+    assert resp == sync and len(resp["questions"]) == len(WORDS) + 1
+
+    # 其他路由交給 Flask app（WsgiToAsgi）
+    stored = _call(asgi_app, "GET", f"/articles/{article['id']}", auth_headers(async_user))
+    assert stored.status_code == 200 and stored.json()["article"] == article["article"]
+
+
+def test_async_auth_and_validation(auth_headers, asgi_app):
+    assert _call(asgi_app, "POST", "/articles", {}, {"lexileTarget": 700}).status_code == 401
+    headers = auth_headers("async-bad@example.com")
+    assert _call(asgi_app, "POST", "/articles", headers, {"lexileTarget": "high"}).status_code == 400
+    assert _call(asgi_app, "POST", "/articles", headers, {"lexileTarget": 700}).json() == {
+        "error": "無法自動選取單字，請手動輸入至少一個單字"}
+    assert _call(asgi_app, "GET", "/words/quiz", headers).status_code == 400
@@ -0,0 +1,63 @@
+# backend/tests/test_auth_cache.py
+import time
+import jwt
+from auth import utils
+
+
+def make_token(sub="foo@example.com", exp=None, **claims):
+    payload = {"sub": sub, "exp": exp or time.time() + 3600, **claims}
+    return jwt.encode(payload, utils.SECRET_KEY, algorithm="HS256")
+
+
+def test_second_decode_is_cache_hit():
+    token = make_token(sub="hit@example.com")
+    before = utils.auth_stats()
+    assert utils.decode_bearer(f"Bearer {token}")[0]["sub"] == "hit@example.com"
+    assert utils.decode_bearer(f"Bearer {token}")[0]["sub"] == "hit@example.com"
+    after = utils.auth_stats()
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 1
+
+
+def test_cached_token_expires_at_exp():
+    token = make_token(exp=time.time() + 1)
+    assert utils.decode_bearer(f"Bearer {token}")[1] is None
+    time.sleep(1.1)
+    assert utils.decode_bearer(f"Bearer {token}") == (None, "Token expired")
+
+
+def test_invalid_and_missing_tokens():
+    assert utils.decode_bearer("") == (None, "Missing token")
+    assert utils.decode_bearer("Bearer abc") == (None, "Invalid token")
+
+
+def test_revoke_token_and_user():
+    token = make_token(sub="rev@example.com", iat=int(time.time()) - 10)
+    other = make_token(sub="rev@example.com", iat=int(time.time()) - 5)
+    utils.decode_bearer(f"Bearer {token}")
+    utils.revoke_token(token)
+    assert utils.decode_bearer(f"Bearer {token}") == (None, "Token revoked")
+    assert utils.decode_bearer(f"Bearer {other}")[1] is None
+    utils.revoke_user("rev@example.com")
+    assert utils.decode_bearer(f"Bearer {other}") == (None, "Token revoked")
+
+
+def test_token_issued_in_revocation_second_stays_valid():
+    utils.revoke_user("same@example.com")
+    now = int(time.time())
+    assert utils.decode_bearer(f"Bearer {make_token(sub='same@example.com', iat=now)}")[1] is None
+    assert utils.decode_bearer(f"Bearer {make_token(sub='same@example.com', iat=now - 1)}") == (None, "Token revoked")
+
+
+def test_change_password_revokes_older_tokens(client):
+    creds = {"email": "pw@example.com", "password": "old-secret"}
+    client.post("/auth/signup", json=creds)
+    old = {"Authorization": "Bearer " + make_token(sub="pw@example.com", iat=int(time.time()) - 60)}
+    body = {"oldPassword": "wrong", "newPassword": "new-secret"}
+    assert client.post("/auth/password", json=body, headers=old).status_code == 401
+
+    resp = client.post("/auth/password", json={**body, "oldPassword": "old-secret"}, headers=old)
+    assert resp.status_code == 200
+    assert client.get("/auth/me", headers=old).status_code == 401
+    assert client.get("/auth/me", headers={"Authorization": f"Bearer {resp.get_json()['token']}"}).status_code == 200
+    assert client.post("/auth/login", json={**creds, "password": "new-secret"}).status_code == 200
@@ -0,0 +1,70 @@
+# backend/tests/test_definitions.py
+from datetime import datetime, timedelta
+from definitions import DefinitionCache, normalize_word
+
+
+class FakeStore:
+    """DefinitionStore 的替身，記錄讀取次數"""
+
+    def __init__(self):
+        self.docs = {}
+        self.reads = 0
+
+    def get(self, key):
+        self.reads += 1
+        return dict(self.docs[key]) if key in self.docs else None
+
+    def set(self, key, data):
+        self.docs[key] = dict(data)
+
+    def delete(self, key):
+        self.docs.pop(key, None)
+
+
+def test_normalize_word():
+    assert normalize_word("  Apple  Pie ") == "apple pie"
+
+
+def test_memory_hit_after_put():
+    store = FakeStore()
+    cache = DefinitionCache(store=store)
+    cache.put("Apple", "蘋果", "n. 蘋果")
+    reads = store.reads
+    assert cache.get("apple ") == {"short": "蘋果", "full": "n. 蘋果"}
+    assert store.reads == reads
+    assert cache.stats()["memoryHits"] == 1
+
+
+def test_persistent_tier_shared_across_instances():
+    store = FakeStore()
+    DefinitionCache(store=store).put("apple", "蘋果", "n. 蘋果")
+    other = DefinitionCache(store=store)
+    assert other.get("apple")["short"] == "蘋果"
+    assert other.stats()["persistentHits"] == 1
+    # 第二次由 LRU 命中
+    other.get("apple")
+    assert other.stats()["memoryHits"] == 1
+
+
+def test_version_bump_invalidates():
+    store = FakeStore()
+    DefinitionCache(store=store, version=1).put("apple", "蘋果", "n. 蘋果")
+    cache = DefinitionCache(store=store, version=2)
+    assert cache.get("apple") is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_ttl_expiry():
+    store = FakeStore()
+    store.docs["apple"] = {
+        "word": "apple", "short": "蘋果", "full": "n. 蘋果", "version": 1,
+        "createdAt": datetime.utcnow() - timedelta(days=100)
+    }
+    assert DefinitionCache(store=store, version=1, ttl_days=90).get("apple") is None
+
+
+def test_lru_is_bounded():
+    cache = DefinitionCache(store=FakeStore(), maxsize=2)
+    for w in ["a", "b", "c"]:
+        cache.put(w, w, w)
+    assert cache.stats()["size"] == 2
@@ -0,0 +1,52 @@
+import random
+from distractors import WordIndex, DistractorIndexCache, parse_pos, random_distractors
+from signals import word_saved, word_deleted
+from storage import word_store
+
+UNRELATED = ["cat", "sky", "run", "blue", "tree", "milk", "door", "sun", "pen", "fish", "bag", "hat"]
+
+
+def test_parse_pos_from_full_definition():
+    assert parse_pos("n. 測試") == "n"
+    assert parse_pos("（vt.）計算；估計") == "v"
+    assert parse_pos("Adj. 快樂的") == "adj"
+    assert parse_pos("沒有詞性") == "" and parse_pos(None) == ""
+
+
+def test_index_prefers_similar_words_and_falls_back_to_random():
+    similar = [("computer", "n"), ("commute", "v"), ("compose", "v"), ("compete", "v"), ("complete", "v"),
+               ("computation", "n")]
+    entries = [("compute", "compute", "v")] + [(w, w, p) for w, p in similar] + [(w, w, "n") for w in UNRELATED]
+    index = WordIndex(entries)
+    rng = random.Random(0)
+    for _ in range(20):
+        picked = index.distractors("compute", 3, rng)
+        assert len(set(picked)) == 3 and "compute" not in picked
+        assert set(picked) <= {w for w, _ in similar}
+
+    small = WordIndex([(w, w, "n") for w in UNRELATED[:5]])
+    picked = small.distractors("cat", 3, rng)
+    assert len(picked) == 3 and "cat" not in picked
+    assert random_distractors(["a", "b"], "a", 3, rng) == ["b"]
+
+
+def test_cache_loads_once_and_follows_signals():
+    user = "distract@example.com"
+    for w in UNRELATED:
+        word_store.set(user, w + "_d", {"userId": user, "full": "n. 測試"})
+    cache = DistractorIndexCache()
+    index = cache.get(user)
+    assert len(index) == len(UNRELATED) and cache.get(user) is index
+
+    cache.add(user, "planet_d", {"full": "n. 行星"})
+    assert "planet_d" in index.words()
+    assert len(index.distractors("planet_d", 3)) == 3
+    cache.remove(user, "cat_d")
+    assert "cat_d" not in index.words()
+
+    import distractors
+    distractors.distractor_index.get(user)
+    word_saved.send(user, word_id="comet_d", fields={"userId": user, "full": "n. 彗星"}, created=True)
+    word_deleted.send(user, word_id="sky_d")
+    words = distractors.distractor_index.get(user).words()
+    assert "comet_d" in words and "sky_d" not in words
@@ -0,0 +1,103 @@
+# backend/tests/test_due_queue.py
+from datetime import datetime, timedelta, timezone
+from due_queue import DueQueueCache
+from storage import Increment
+
+NOW = datetime(2025, 1, 10)
+
+
+class FakeStore:
+    """只支援 due_queue 用到的 WordStore.by_due，記錄查詢次數"""
+
+    def __init__(self, docs):
+        self.docs, self.queries, self.direct = docs, 0, 0
+
+    def by_due(self, user_id, limit, until=None, after=None):
+        self.queries += 1
+        if until is not None:
+            self.direct += 1
+        docs = sorted((d["dueDate"], i) for i, d in self.docs.items() if d["userId"] == user_id)
+        if until is not None:
+            docs = [d for d in docs if d[0] <= until]
+        if after is not None:
+            docs = [d for d in docs if d > after]
+        return [(i, dict(self.docs[i])) for _, i in docs[:limit]]
+
+
+def make_store():
+    return FakeStore({
+        f"w{i}": {"userId": "u", "dueDate": NOW - timedelta(days=5 - i), "short": str(i)}
+        for i in range(8)
+    })
+
+
+def test_repeated_reads_hit_memory():
+    store = make_store()
+    cache = DueQueueCache(store=store)
+    first = cache.due_words("u", NOW, limit=10)
+    assert [w for w, _ in first] == ["w0", "w1", "w2", "w3", "w4", "w5"]
+    cache.due_words("u", NOW, limit=3)
+    assert store.queries == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_updates_reorder_and_deletes_remove():
+    cache = DueQueueCache(store=make_store())
+    cache.due_words("u", NOW)
+    cache.update("u", "w0", {"dueDate": NOW + timedelta(days=6), "reviewCount": Increment(1)})
+    cache.remove("u", "w1")
+    cache.update("u", "new", {"userId": "u", "dueDate": NOW - timedelta(days=30)}, created=True)
+    ids = [w for w, _ in cache.due_words("u", NOW)]
+    assert ids == ["new", "w2", "w3", "w4", "w5"]
+    assert dict(cache.due_words("u", NOW + timedelta(days=7), limit=20))["w0"]["reviewCount"] == 1
+
+
+def test_partial_update_for_unknown_word_invalidates():
+    store = make_store()
+    cache = DueQueueCache(store=store)
+    cache.due_words("u", NOW)
+    cache.update("u", "missing", {"dueDate": NOW})
+    cache.due_words("u", NOW)
+    assert store.queries == 2
+
+
+def test_cursor_pagination_and_bounds():
+    store = make_store()
+    cache = DueQueueCache(store=store, max_words=4, max_users=1)
+    page = cache.due_words("u", NOW, limit=2)
+    assert [w for w, _ in page] == ["w0", "w1"]
+    # 只載入 4 筆：第二頁超出已載入範圍，改為直接查詢儲存層
+    rest = cache.due_words("u", NOW, limit=10, after=(page[-1][1]["dueDate"], page[-1][0]))
+    assert [w for w, _ in rest] == ["w2", "w3", "w4", "w5"]
+    assert (store.queries, store.direct) == (2, 1)
+    # 已載入範圍內的查詢仍由記憶體回應
+    assert [w for w, _ in cache.due_words("u", NOW, limit=3)] == ["w0", "w1", "w2"]
+    assert store.queries == 2
+    # 使用者數上限
+    cache.due_words("other", NOW)
+    assert cache.stats()["users"] == 1
+
+
+def test_timezone_aware_due_dates():
+    store = FakeStore({"a": {"userId": "u", "dueDate": datetime(2025, 1, 9, tzinfo=timezone.utc)}})
+    assert DueQueueCache(store=store).due_words("u", NOW)[0][0] == "a"
+
+
+def test_expired_queue_sees_writes_from_other_workers():
+    store = make_store()
+    cache = DueQueueCache(store=store, ttl=0)
+    cache.due_words("u", NOW)
+    # 另一個 worker 複習了 w0：儲存層已更新，但本行程沒有收到 signal
+    store.docs["w0"]["dueDate"] = NOW + timedelta(days=3)
+    assert "w0" not in dict(cache.due_words("u", NOW))
+    assert store.queries == 2
+
+
+def test_due_endpoint_rejects_cursor_without_datetime(client, auth_headers):
+    from pagination import encode_cursor
+    headers = auth_headers("due-cursor@example.com")
+    resp = client.get("/review/due", query_string={"cursor": encode_cursor("apple", "apple")}, headers=headers)
+    assert resp.status_code == 400 and resp.get_json()["error"] == "invalid cursor"
+    resp = client.get("/review/due", query_string={"cursor": encode_cursor(datetime(2025, 1, 1), "apple")},
+                      headers=headers)
+    assert resp.status_code == 200
@@ -0,0 +1,129 @@
+# backend/tests/test_firestore_words.py
+"""FirestoreWordStore 遷移期間的雙寫，以記憶體中的最小 Firestore 替身驗證批次大小與合併寫入"""
+import pytest
+from firebase_admin import firestore
+from google.api_core import exceptions as gexc
+from storage import NotFound, Increment
+from storage.firestore_store import FirestoreWordStore, BATCH_LIMIT
+
+USER = "dual@example.com"
+
+
+class _Snap:
+    def __init__(self, db, ref):
+        self.reference, self.id = ref, ref.id
+        self.exists = ref.path in db.docs
+        self._data = db.docs.get(ref.path)
+
+    def to_dict(self):
+        return dict(self._data) if self.exists else None
+
+
+class _Ref:
+    def __init__(self, db, path):
+        self._db, self.path, self.id = db, path, path.rsplit("/", 1)[-1]
+
+    def collection(self, name):
+        return _Col(self._db, f"{self.path}/{name}")
+
+    def get(self, field_paths=None):
+        return _Snap(self._db, self)
+
+
+class _Col:
+    def __init__(self, db, path):
+        self._db, self.path = db, path
+
+    def document(self, doc_id):
+        return _Ref(self._db, f"{self.path}/{doc_id}")
+
+
+def _apply(data, fields):
+    data = dict(data)
+    for k, v in fields.items():
+        data[k] = (data.get(k) or 0) + v.value if isinstance(v, firestore.Increment) else v
+    return data
+
+
+class _Batch:
+    def __init__(self, db):
+        self._db, self.ops = db, []
+
+    def set(self, ref, data, merge=False):
+        self.ops.append(("merge" if merge else "set", ref, data))
+
+    def create(self, ref, data):
+        self.ops.append(("create", ref, data))
+
+    def update(self, ref, data):
+        self.ops.append(("update", ref, data))
+
+    def delete(self, ref):
+        self.ops.append(("delete", ref, None))
+
+    def commit(self):
+        docs = self._db.docs
+        if len(self.ops) > BATCH_LIMIT:
+            raise gexc.InvalidArgument("maximum 500 writes allowed per request")
+        for op, ref, _ in self.ops:
+            if op == "create" and ref.path in docs:
+                raise gexc.AlreadyExists(ref.path)
+            if op == "update" and ref.path not in docs:
+                raise gexc.NotFound(ref.path)
+        self._db.commits.append(len(self.ops))
+        for op, ref, data in self.ops:
+            if op == "delete":
+                docs.pop(ref.path, None)
+            else:
+                docs[ref.path] = _apply(docs.get(ref.path, {}) if op in ("update", "merge") else {}, data)
+
+
+class FakeFirestore:
+    def __init__(self):
+        self.docs, self.commits = {}, []
+
+    def collection(self, name):
+        return _Col(self, name)
+
+    def batch(self):
+        return _Batch(self)
+
+    def get_all(self, refs, field_paths=None):
+        return [_Snap(self, ref) for ref in refs]
+
+
+@pytest.fixture
+def dual():
+    db = FakeFirestore()
+    db.docs[f"users/{USER}"] = {"email": USER}
+    return db, FirestoreWordStore(db, "dual")
+
+
+def test_full_review_batch_for_unmigrated_user_is_chunked(dual):
+    db, words = dual
+    for i in range(500):
+        db.docs[f"words/{USER}_w{i}"] = {"userId": USER, "lastInterval": 1, "reviewCount": 0}
+    db.docs[f"users/{USER}/words/w0"] = {"userId": USER, "lastInterval": 1, "reviewCount": 3, "short": "newer"}
+
+    words.update_many(USER, {f"w{i}": {"lastInterval": 6, "reviewCount": Increment(1)} for i in range(500)})
+    assert db.commits == [BATCH_LIMIT, BATCH_LIMIT]
+    assert db.docs[f"words/{USER}_w499"]["lastInterval"] == 6
+    assert db.docs[f"users/{USER}/words/w499"]["reviewCount"] == 1
+    # 新路徑已存在的文件只合併變更的欄位
+    assert db.docs[f"users/{USER}/words/w0"]["short"] == "newer"
+    assert db.docs[f"users/{USER}/words/w0"]["reviewCount"] == 4
+
+
+def test_missing_word_writes_nothing_and_marker_is_rechecked(dual):
+    db, words = dual
+    db.docs[f"words/{USER}_apple"] = {"userId": USER, "lastInterval": 1}
+    with pytest.raises(NotFound):
+        words.update_many(USER, {"apple": {"lastInterval": 6}, "nope": {"lastInterval": 6}})
+    assert db.commits == []
+
+    assert not words.migrated(USER)
+    db.docs[f"users/{USER}"]["wordsLayout"] = 2
+    db.docs[f"users/{USER}/words/apple"] = {"userId": USER, "lastInterval": 1}
+    words.update(USER, "apple", {"lastInterval": 6})
+    assert db.docs[f"users/{USER}/words/apple"]["lastInterval"] == 6
+    assert db.docs[f"words/{USER}_apple"]["lastInterval"] == 1
@@ -0,0 +1,41 @@
+# backend/tests/test_forecast.py
+from datetime import datetime, timedelta
+import itertools
+import numpy as np
+import pytest
+import forecast
+from sm2 import next_interval
+
+
+def test_vectorized_matches_scalar_sm2():
+    grid = list(itertools.product([0, 1, 2, 5, 6, 17, 40], range(6), [1.3, 1.7, 2.5, 2.9]))
+    intervals, qualities, efs = map(list, zip(*grid))
+    new_intervals, new_efs = forecast.next_interval_array(intervals, qualities, efs)
+    expected = [next_interval(*g) for g in grid]
+    assert new_intervals.tolist() == [i for i, _ in expected]
+    assert new_efs.tolist() == pytest.approx([ef for _, ef in expected])
+
+
+def test_all_perfect_recall_schedule():
+    # 單一新字、全部 quality 5：第 0 天、第 1 天、第 7 天…
+    counts = forecast.simulate([0], [2.5], [0], days=10, quality_probs=[0, 0, 0, 0, 0, 1], seed=1)
+    assert counts.tolist() == [1, 1, 0, 0, 0, 0, 0, 1, 0, 0]
+
+
+def test_overdue_words_are_due_today_and_trials_average():
+    counts = forecast.simulate([3] * 4, [2.5] * 4, [-5, -1, 0, 40], days=5, trials=4, seed=0)
+    assert counts[0] == 3
+    assert counts.shape == (5,)
+
+
+def test_word_state_arrays_and_quality_parsing():
+    now = datetime(2025, 1, 1)
+    intervals, efs, due = forecast.word_state_arrays(
+        [{"lastInterval": 6, "easeFactor": 2.1, "dueDate": now + timedelta(days=2)}, {}], now=now)
+    assert intervals.tolist() == [6, 0]
+    assert efs.tolist() == [2.1, 2.5]
+    assert due.tolist() == [2.0, 0.0]
+    assert np.isclose(forecast.parse_quality_probs("1,1,1,1,1,5").sum(), 1.0)
+    for spec in ("1,2", "nan,0,0,0,0,1", "inf,0,0,0,0,1"):
+        with pytest.raises(ValueError):
+            forecast.parse_quality_probs(spec)
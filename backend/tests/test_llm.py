@@ -0,0 +1,100 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+import pytest
+import clients
+import llm
+
+
+class FlakyError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(status_code=status_code, headers=headers or {})
+
+
+class ScriptedOpenAI:
+    """依序回傳 script 中的結果：例外就拋出，數字為延遲秒數後回覆"""
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model=None, messages=(), timeout=None, **_):
+        with self._lock:
+            self.calls += 1
+            step = self.script.pop(0) if self.script else 0
+        if isinstance(step, Exception):
+            raise step
+        time.sleep(step)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=f"reply {step}"))],
+                               usage=None)
+
+
+@pytest.fixture
+def site(monkeypatch):
+    test_site = llm.Site("test_site", model="test-model", concurrency=1, deadline=5)
+    monkeypatch.setitem(llm.SITES, "test_site", test_site)
+    monkeypatch.setattr(llm, "BACKOFF_BASE", 0.01)
+    monkeypatch.setattr(llm, "QUEUE_WAIT", 0.05)
+    monkeypatch.setattr(llm, "_cooldowns", {})
+    yield test_site
+    clients.reset()
+
+
+def test_retries_429_honoring_retry_after_then_succeeds(site):
+    fake = ScriptedOpenAI([FlakyError(429, {"retry-after-ms": "50"}), FlakyError(503), 0])
+    clients.use_openai(fake)
+    start = time.monotonic()
+    assert llm.complete("test_site", []) == "reply 0"
+    assert fake.calls == 3
+    assert time.monotonic() - start >= 0.05
+
+
+def test_client_errors_are_not_retried(site):
+    fake = ScriptedOpenAI([FlakyError(400), 0])
+    clients.use_openai(fake)
+    with pytest.raises(FlakyError):
+        llm.complete("test_site", [])
+    assert fake.calls == 1
+
+
+def test_full_site_and_long_cooldown_raise_busy(site):
+    clients.use_openai(ScriptedOpenAI([0.3]))
+    worker = threading.Thread(target=llm.complete, args=("test_site", []))
+    worker.start()
+    time.sleep(0.05)
+    with pytest.raises(llm.LLMBusy):
+        llm.complete("test_site", [])
+    worker.join()
+
+    llm._cooldowns["test-model"] = time.monotonic() + 60
+    with pytest.raises(llm.LLMBusy) as exc:
+        llm.complete("test_site", [])
+    assert exc.value.retry_after >= 59
+
+
+def test_slow_call_is_hedged(site):
+    site.hedge = True
+    site._p95 = 0.05
+    fake = ScriptedOpenAI([1.0, 0])
+    clients.use_openai(fake)
+    start = time.monotonic()
+    assert llm.complete("test_site", []) == "reply 0"
+    assert time.monotonic() - start < 0.5
+    assert fake.calls == 2
+
+
+def test_async_gateway_retries(site, monkeypatch):
+    fake = ScriptedOpenAI([FlakyError(500), 0])
+
+    async def create(**kwargs):
+        return fake._create(**kwargs)
+
+    async_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(clients, "async_openai_client", lambda: async_client)
+    assert asyncio.run(llm.acomplete("test_site", [])) == "reply 0"
+    assert fake.calls == 2
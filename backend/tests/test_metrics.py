@@ -0,0 +1,50 @@
+# backend/tests/test_metrics.py
+import logging
+from types import SimpleNamespace
+import metrics
+
+
+def test_histogram_renders_cumulative_buckets():
+    h = metrics.Histogram("t_seconds", "test", ("op",), buckets=(0.1, 1.0))
+    h.observe(0.05, "a")
+    h.observe(0.5, "a")
+    h.observe(5, "a")
+    lines = h.render()
+    assert 't_seconds_bucket{op="a",le="0.1"} 1' in lines
+    assert 't_seconds_bucket{op="a",le="1.0"} 2' in lines
+    assert 't_seconds_bucket{op="a",le="+Inf"} 3' in lines
+    assert 't_seconds_count{op="a"} 3' in lines
+
+
+def test_instrumented_openai_counts_tokens_and_errors():
+    usage = SimpleNamespace(prompt_tokens=7, completion_tokens=3)
+
+    def create(**kwargs):
+        if kwargs.get("fail"):
+            raise RuntimeError("boom")
+        return SimpleNamespace(usage=usage)
+
+    client = metrics.instrument_openai(SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create))))
+    before = dict(metrics.LLM_TOKENS._values)
+    client.chat.completions.create(model="test-model")
+    try:
+        client.chat.completions.create(model="test-model", fail=True)
+    except RuntimeError:
+        pass
+    assert metrics.LLM_TOKENS._values[("test-model", "prompt")] - before.get(("test-model", "prompt"), 0) == 7
+    assert metrics.LLM_REQUESTS._values[("test-model", "error")] >= 1
+
+
+def test_request_spans_metrics_endpoint_and_slow_log(caplog, auth_headers):
+    from app import create_app
+    from storage import word_store
+    app = create_app({"STORAGE_BACKEND": "memory", "SLOW_REQUEST_MS": 0.000001})
+    word_store.set("m@example.com", "metrics_w", {"userId": "m@example.com", "dueDate": None})
+    client = app.test_client()
+    with caplog.at_level(logging.WARNING, logger="slow_requests"):
+        client.delete("/words/metrics_w", headers=auth_headers("m@example.com"))
+    assert '"storage:words.delete"' in caplog.text
+
+    body = client.get("/metrics").get_data(as_text=True)
+    assert 'http_request_duration_seconds_count{method="DELETE",endpoint="/words/<word_id>",status="204"}' in body
+    assert 'span_duration_seconds_count{kind="storage",op="words.get"}' in body
@@ -0,0 +1,25 @@
+# backend/tests/test_pagination.py
+from datetime import datetime, timezone
+import pytest
+from pagination import parse_page_args, encode_cursor, decode_cursor, MAX_PAGE_SIZE
+
+
+def test_cursor_round_trip_datetime():
+    dt = datetime(2025, 1, 2, 3, 4, 5, 678000, tzinfo=timezone.utc)
+    assert decode_cursor(encode_cursor(dt, "abc")) == (dt, "abc")
+
+
+def test_invalid_cursor():
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+def test_parse_page_args_defaults_and_projection():
+    limit, cursor, fields = parse_page_args({}, default_fields=["preview"])
+    assert cursor is None and fields == ["preview"]
+    assert parse_page_args({"fields": "*"}, default_fields=["preview"])[2] is None
+    assert parse_page_args({"fields": "short, dueDate", "limit": "5"})[::2] == (5, ["short", "dueDate"])
+    with pytest.raises(ValueError):
+        parse_page_args({"limit": str(MAX_PAGE_SIZE + 1)})
+    with pytest.raises(ValueError):
+        parse_page_args({"fields": "a.b"})
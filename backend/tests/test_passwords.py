@@ -0,0 +1,56 @@
+# backend/tests/test_passwords.py
+import threading
+import pytest
+from auth.passwords import PasswordHasher, HasherBusy
+
+
+def test_hash_and_verify():
+    hasher = PasswordHasher(rounds=4, workers=1, queue=1)
+    pw_hash = hasher.hash("secret")
+    assert hasher.verify("secret", pw_hash)
+    assert not hasher.verify("wrong", pw_hash)
+
+
+def test_needs_rehash_when_cost_changes():
+    old = PasswordHasher(rounds=4, workers=1, queue=1)
+    new = PasswordHasher(rounds=5, workers=1, queue=1)
+    pw_hash = old.hash("secret")
+    assert not old.needs_rehash(pw_hash)
+    assert new.needs_rehash(pw_hash)
+    assert new.verify("secret", pw_hash)
+
+
+def test_full_pool_rejects_instead_of_queueing():
+    hasher = PasswordHasher(rounds=4, workers=1, queue=0)
+    release = threading.Event()
+    started = threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    t = threading.Thread(target=hasher._run, args=(block,))
+    t.start()
+    started.wait(5)
+    with pytest.raises(HasherBusy):
+        hasher.hash("secret")
+    release.set()
+    t.join()
+    assert hasher.rejected == 1
+    assert hasher.verify("secret", hasher.hash("secret"))
+
+
+def test_login_skips_rehash_when_pool_is_busy(monkeypatch, client):
+    from auth.passwords import hasher
+    from storage import user_store
+    old_hash = PasswordHasher(rounds=4, workers=1, queue=1).hash("secret")
+    user_store.set("rehash@example.com", {"passwordHash": old_hash})
+
+    def busy(password):
+        raise HasherBusy()
+
+    monkeypatch.setattr(hasher, "needs_rehash", lambda pw_hash: True)
+    monkeypatch.setattr(hasher, "hash", busy)
+    resp = client.post("/auth/login", json={"email": "rehash@example.com", "password": "secret"})
+    assert resp.status_code == 200 and resp.get_json()["token"]
+    assert user_store.get("rehash@example.com")["passwordHash"] == old_hash
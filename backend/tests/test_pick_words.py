@@ -25,6 +25,23 @@ def test_pick_words_empty(client):
     )
     assert resp.status_code == 200
     data = resp.get_json()
-    # 檢查回傳結構有 words 欄位
-    assert "words" in data
-    assert isinstance(data["words"], list)
\ No newline at end of file
+    # 回傳單字陣列（前端 Review 畫面直接使用）
+    assert data == []
+
+@freeze_time("2025-01-01T00:00:00Z")
+def test_pick_words_orders_by_due_date(client):
+    from datetime import datetime, timedelta
+    from storage import word_store
+    now = datetime(2025, 1, 1)
+    for i, word in enumerate(["later", "first", "second"]):
+        word_store.set("pick@example.com", f"pick_{word}", {
+            "userId": "pick@example.com",
+            "dueDate": now - timedelta(days=[-1, 3, 2][i]),
+            "lastInterval": 1,
+            "easeFactor": 2.5
+        })
+    resp = client.get(
+        "/pick_words?limit=5",
+        headers={"Authorization": f"Bearer {make_token('pick@example.com')}"}
+    )
+    assert [w["id"] for w in resp.get_json()] == ["pick_first", "pick_second"]
@@ -0,0 +1,55 @@
+# backend/tests/test_readability.py
+import pytest
+import textstat
+from lexile import approximate_lexile, approximate_lexile_many, grade_to_lexile
+from readability import analyze, text_counts
+
+# textstat 遇到 CMU 字典外的字（例如 didn't → didnt）會拋 KeyError，參考文本避開縮寫
+TEXTS = [
+    "The cat sat on the mat. It was a sunny day, and the children played outside. "
+    "Their mother called them in for lunch.",
+    "Photosynthesis is the biochemical process through which green plants, algae, and certain "
+    "bacteria convert electromagnetic radiation into chemical energy. This transformation sustains "
+    "virtually every ecosystem on Earth. Without it, atmospheric oxygen would gradually disappear.",
+    "Once upon a time, in a quiet village by the sea, there lived an old fisherman named Leo. "
+    "Every morning he rowed his small boat past the lighthouse. One day he found a bottle floating "
+    "on the waves. Inside was a map, drawn in faded ink, showing an island nobody had ever heard of. "
+    "Leo felt curious, anxious, and strangely excited. He decided to follow the map, even though "
+    "the weather looked uncertain.",
+]
+
+# textstat 會把每字音節數先四捨五入到 0.1 再代入 Flesch–Kincaid，
+# 單次掃描版本不做中間捨入，因此允許少量差距
+LEXILE_TOLERANCE = 15
+
+
+def textstat_lexile(text):
+    """原本 lexile.approximate_lexile 的 textstat 實作，作為比對基準"""
+    avg_grade = (textstat.flesch_kincaid_grade(text)
+                 + textstat.gunning_fog(text)
+                 + textstat.dale_chall_readability_score(text)
+                 + textstat.smog_index(text)) / 4.0
+    return grade_to_lexile(avg_grade)
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_matches_textstat_within_tolerance(text):
+    assert abs(approximate_lexile(text) - textstat_lexile(text)) <= LEXILE_TOLERANCE
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_indices_match_textstat(text):
+    s = analyze(text)
+    assert s["gunningFog"] == pytest.approx(textstat.gunning_fog(text), abs=0.1)
+    assert s["daleChall"] == pytest.approx(textstat.dale_chall_readability_score(text), abs=0.1)
+    assert s["smog"] == pytest.approx(textstat.smog_index(text), abs=0.1)
+
+
+def test_batch_matches_single():
+    assert approximate_lexile_many(TEXTS) == [approximate_lexile(t) for t in TEXTS]
+
+
+def test_contractions_and_empty_text():
+    assert approximate_lexile("Tom didn't want to go. \"I'm tired,\" he said. They ran outside.") >= 200
+    assert text_counts("")["words"] == 0
+    assert approximate_lexile("") == grade_to_lexile(0.0)
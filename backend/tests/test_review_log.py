@@ -0,0 +1,73 @@
+import math
+import random
+from datetime import datetime, timedelta
+from storage import word_store, user_store, review_log_store
+from sm2 import next_interval, user_params, DEFAULT_PARAMS
+import fit_sm2
+
+
+def test_feedback_appends_events_and_uses_user_params(client, auth_headers):
+    user = "reviewlog@example.com"
+    headers = auth_headers(user)
+    user_store.set(user, {"sm2Params": {"intervalModifier": 2.0, "minEase": 1.2}})
+    now = datetime.utcnow()
+    for word in ("apple", "pear"):
+        word_store.set(user, word, {"userId": user, "lastInterval": 1, "easeFactor": 2.5, "dueDate": now})
+
+    resp = client.post("/review/feedback", json={"wordId": "apple", "quality": 4}, headers=headers)
+    assert resp.get_json()["interval"] == 12
+    items = [{"wordId": "pear", "quality": 0}, {"wordId": "pear", "quality": 0}, {"wordId": "nope", "quality": 3},
+             {"wordId": "apple", "quality": True}]
+    results = client.post("/review/feedback/batch", json={"items": items}, headers=headers).get_json()["results"]
+    assert "error" in results[3]
+
+    events = review_log_store.for_user(user)
+    assert [(e["wordId"], e["quality"]) for e in events] == [("apple", 4), ("pear", 0), ("pear", 0)]
+    assert (events[0]["prevInterval"], events[0]["prevDue"], events[0]["interval"]) == (1, now, 12)
+    # 同一批次的第二筆接在第一筆之後，EF 停在使用者的下限
+    assert events[2]["prevEase"] == events[1]["easeFactor"] and events[2]["easeFactor"] == 1.2
+    assert events[1]["reviewedAt"] < events[2]["reviewedAt"]
+
+
+def test_params_default_and_interval_floor():
+    assert user_params(None) == DEFAULT_PARAMS
+    assert user_params({"minEase": 1.2, "quickBonus": "x", "other": 1})["minEase"] == 1.2
+    slow = {**DEFAULT_PARAMS, "intervalModifier": 0.5}
+    assert next_interval(1, 4, 2.5, slow) == (3, 2.5)
+    assert next_interval(6, 4, 1.3, slow)[0] == 7
+
+
+def _simulate(rng, user, k, n_words, days, start):
+    """以遺忘率 k 模擬一位使用者的複習紀錄"""
+    events = []
+    for w in range(n_words):
+        interval, ef, due, last = 0, 2.5, 0.0, None
+        while due < days:
+            t = due + rng.random() * 0.2
+            recalled = last is None or rng.random() < math.exp(-k * (t - last) / max(interval, 1))
+            quality = rng.choice([3, 4, 5]) if recalled else rng.choice([0, 1, 2])
+            new_interval, new_ef = next_interval(interval, quality, ef)
+            events.append({"wordId": f"{user}{w}", "quality": quality, "reviewedAt": start + timedelta(days=t),
+                           "prevInterval": interval, "prevEase": ef, "prevDue": start + timedelta(days=due),
+                           "interval": new_interval, "easeFactor": new_ef})
+            interval, ef, last, due = new_interval, new_ef, t, t + new_interval
+    return events
+
+
+def test_fit_adjusts_intervals_and_skips_users_without_new_reviews(app):
+    rng = random.Random(3)
+    start = datetime.utcnow() - timedelta(days=200)
+    review_log_store.append("forgetful", _simulate(rng, "f", 0.5, 80, 150, start))
+    review_log_store.append("steady", _simulate(rng, "s", -math.log(0.9), 80, 150, start))
+    review_log_store.append("newbie", _simulate(rng, "n", 0.1, 1, 5, start))
+
+    stats = fit_sm2.run(review_log_store, user_store)
+    assert set(stats["params"]) == {"forgetful", "steady"}
+    forgetful = user_store.get("forgetful")["sm2Params"]
+    steady = user_store.get("steady")["sm2Params"]
+    assert forgetful["intervalModifier"] < 0.7 < steady["intervalModifier"]
+    assert forgetful["initialEase"] < steady["initialEase"]
+    assert user_store.get("newbie") is None
+
+    # 擬合之後沒有新的複習，不再更新
+    assert fit_sm2.run(review_log_store, user_store, dry_run=True)["fitted"] == 0
@@ -0,0 +1,32 @@
+# backend/tests/test_startup.py
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_create_app_does_not_import_heavy_stacks():
+    code = (
+        "import sys\n"
+        "from app import create_app\n"
+        "create_app({'STORAGE_BACKEND': 'memory'})\n"
+        "heavy = ['openai', 'textstat', 'numpy', 'google.cloud.firestore_v1', 'grpc']\n"
+        "print(','.join(m for m in heavy if m in sys.modules))\n"
+    )
+    proc = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True,
+                          env={**os.environ, "STORAGE_BACKEND": "memory"}, check=True)
+    assert proc.stdout.strip() == ""
+
+
+def test_create_app_config_selects_storage(tmp_path):
+    import storage
+    from app import create_app
+    path = str(tmp_path / "app.db")
+    try:
+        app = create_app({"STORAGE_BACKEND": "sqlite", "STORAGE_PATH": path})
+        assert app.config["STORAGE_BACKEND"] == "sqlite"
+        storage.user_store.set("a@example.com", {"email": "a@example.com"})
+        assert storage.backend_name() == "sqlite" and os.path.exists(path)
+    finally:
+        storage.configure("memory")
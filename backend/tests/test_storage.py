@@ -0,0 +1,144 @@
+# backend/tests/test_storage.py
+from datetime import datetime, timedelta, timezone
+import pytest
+from pagination import decode_cursor
+from storage import NotFound, Increment
+from storage.base import legacy_word_id, ReviewLogStore
+from storage.sqlite_store import sqlite_stores
+
+NOW = datetime(2025, 1, 10)
+
+
+@pytest.fixture
+def stores():
+    words, articles, users, definitions, jobs, reviews = sqlite_stores(":memory:")
+    for i in range(6):
+        words.set("u", f"w{i}", {
+            "userId": "u",
+            "createdAt": NOW + timedelta(minutes=i),
+            "dueDate": NOW + timedelta(days=i - 3),
+            "lastInterval": i,
+            "reviewCount": 0
+        })
+    words.set("v", "other", {"userId": "v", "createdAt": NOW, "dueDate": NOW})
+    words.set("u", "no_due", {"userId": "u", "createdAt": NOW - timedelta(days=1)})
+    return words, articles, users, definitions, jobs, reviews
+
+
+def test_round_trip_and_datetimes(stores):
+    words = stores[0]
+    assert words.get("u", "w0")["dueDate"] == NOW - timedelta(days=3)
+    words.set("u", "aware", {"userId": "u", "dueDate": datetime(2025, 1, 10, 8, tzinfo=timezone(timedelta(hours=8)))})
+    assert words.get("u", "aware")["dueDate"] == NOW
+    assert words.get("u", "missing") is None
+
+
+def test_update_with_increment_and_not_found(stores):
+    words = stores[0]
+    words.update("u", "w1", {"reviewCount": Increment(2), "lastInterval": 9})
+    assert words.get("u", "w1")["reviewCount"] == 2 and words.get("u", "w1")["lastInterval"] == 9
+    with pytest.raises(NotFound):
+        words.update("u", "missing", {"lastInterval": 1})
+
+
+def test_update_many_is_all_or_nothing(stores):
+    words = stores[0]
+    with pytest.raises(NotFound):
+        words.update_many("u", {"w0": {"lastInterval": 7}, "missing": {"lastInterval": 7}})
+    assert words.get("u", "w0")["lastInterval"] == 0
+    words.update_many("u", {"w0": {"reviewCount": Increment(1)}, "w1": {"reviewCount": Increment(1)}})
+    assert words.get_many("u", ["w0", "w1", "missing", "other"]).keys() == {"w0", "w1"}
+
+
+def test_same_word_is_separate_per_user(stores):
+    words = stores[0]
+    words.set("v", "w0", {"userId": "v", "lastInterval": 42})
+    assert words.get("u", "w0")["lastInterval"] == 0 and words.get("v", "w0")["lastInterval"] == 42
+    with pytest.raises(NotFound):
+        words.update("v", "w1", {"lastInterval": 1})
+    words.delete("v", "w0")
+    assert words.get("v", "w0") is None and words.get("u", "w0") is not None
+
+
+def test_by_due_order_until_and_after(stores):
+    words = stores[0]
+    assert [w for w, _ in words.by_due("u", 10)] == ["w0", "w1", "w2", "w3", "w4", "w5"]
+    assert [w for w, _ in words.by_due("u", 10, until=NOW)] == ["w0", "w1", "w2", "w3"]
+    after = (NOW - timedelta(days=2), "w1")
+    assert [w for w, _ in words.by_due("u", 2, until=NOW, after=after)] == ["w2", "w3"]
+
+
+def test_page_and_projection(stores):
+    words = stores[0]
+    items, cursor = words.page("u", 4, fields=["lastInterval"])
+    assert [i["id"] for i in items] == ["no_due", "w0", "w1", "w2"]
+    assert set(items[1]) == {"lastInterval", "id"}
+    rest, end = words.page("u", 4, cursor=decode_cursor(cursor))
+    assert [i["id"] for i in rest] == ["w3", "w4", "w5"] and end is None
+    assert dict(words.for_user("v", fields=["dueDate"])) == {"other": {"dueDate": NOW}}
+
+
+def test_articles_newest_first(stores):
+    articles = stores[1]
+    ids = [articles.add({"userId": "u", "createdAt": NOW + timedelta(hours=i), "article": str(i)}) for i in range(3)]
+    items, cursor = articles.page("u", 2, fields=["article"])
+    assert [i["id"] for i in items] == [ids[2], ids[1]]
+    rest, _ = articles.page("u", 2, cursor=decode_cursor(cursor))
+    assert [i["id"] for i in rest] == [ids[0]]
+
+
+def test_review_log_and_user_merge(stores):
+    users, reviews = stores[2], stores[5]
+    events = [{"wordId": "w1", "quality": q, "reviewedAt": NOW + timedelta(hours=q), "prevInterval": 1,
+               "prevEase": 2.5, "prevDue": NOW if q else None, "interval": 6, "easeFactor": 2.4} for q in (4, 0)]
+    reviews.append("u", events)
+    reviews.append("v", events[:1])
+    assert [e["quality"] for e in reviews.for_user("u")] == [0, 4]
+    assert reviews.for_user("u", since=NOW + timedelta(hours=1)) == [events[0]]
+    assert sorted((u, len(batch)) for u, batch in reviews.scan()) == [("u", 2), ("v", 1)]
+
+    users.set("u", {"email": "u"})
+    users.merge_many({"u": {"sm2Params": {"minEase": 1.2}}, "new": {"sm2Params": {}}})
+    assert users.get("u") == {"email": "u", "sm2Params": {"minEase": 1.2}}
+    assert users.get("new") == {"sm2Params": {}}
+
+
+def test_legacy_words_table_is_converted_on_open(tmp_path):
+    import sqlite3
+    path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE words (id TEXT PRIMARY KEY, user_id TEXT, due_date TEXT, created_at TEXT, "
+                 "data TEXT NOT NULL)")
+    conn.executemany("INSERT INTO words (id, user_id, data) VALUES (?, ?, ?)", [
+        ("apple", "a", '{"userId": "a", "short": "bare"}'),
+        ("a_apple", "a", '{"userId": "a", "word": "apple", "short": "prefixed"}'),
+        ("b_pear", "b", '{"userId": "b", "word": "pear"}'),
+    ])
+    conn.commit()
+    conn.close()
+
+    words = sqlite_stores(path)[0]
+    assert words.get("a", "apple")["short"] == "prefixed"
+    assert [w for w, _ in words.for_user("b")] == ["pear"]
+    assert legacy_word_id("a", "a_apple") == "apple" and legacy_word_id("a", "b_apple") == "b_apple"
+    # 第二次開啟不再轉換
+    assert sqlite_stores(path)[0].get("b", "pear") is not None
+
+
+def test_migration_dedupe_prefers_prefixed_documents():
+    from types import SimpleNamespace
+    from migrate_words import dedupe
+
+    def doc(doc_id, **data):
+        return SimpleNamespace(id=doc_id, to_dict=lambda: data)
+    docs = [doc("a_apple", short="prefixed"), doc("apple", short="bare"), doc("pear", short="p")]
+    assert dedupe("a", docs) == {"apple": {"short": "prefixed"}, "pear": {"short": "p"}}
+
+
+def test_incomplete_backend_fails_at_construction():
+    class PartialReviewLog(ReviewLogStore):
+        def append(self, user_id, events):
+            pass
+
+    with pytest.raises(TypeError, match="for_user"):
+        PartialReviewLog()
@@ -0,0 +1,64 @@
+import gzip
+import json
+import time
+from datetime import datetime, timedelta
+import pytest
+from storage import word_store, article_store
+
+USER = "sync@example.com"
+
+
+@pytest.fixture
+def headers(monkeypatch, auth_headers):
+    import sync.routes
+    monkeypatch.setattr(sync.routes, "OVERLAP_SECONDS", 0)
+    return auth_headers(USER)
+
+
+def test_full_then_delta_with_tombstones(client, headers):
+    now = datetime.utcnow()
+    for word in ("apple", "pear", "plum"):
+        word_store.set(USER, word, {"userId": USER, "createdAt": now, "dueDate": now, "lastInterval": 0})
+    kept = article_store.add({"userId": USER, "createdAt": now, "article": "long text", "preview": "long"})
+    gone = article_store.add({"userId": USER, "createdAt": now, "article": "bye", "preview": "bye"})
+    article_store.add({"userId": "other@example.com", "createdAt": now, "article": "x"})
+
+    first = client.get("/sync", headers=headers).get_json()
+    assert first["full"] is True
+    assert sorted(w["id"] for w in first["words"]) == ["apple", "pear", "plum"]
+    assert "userId" not in first["words"][0]
+    assert {a["id"] for a in first["articles"]} == {kept, gone} and "article" not in first["articles"][0]
+
+    time.sleep(0.01)
+    client.post("/review/feedback", json={"wordId": "apple", "quality": 5}, headers=headers)
+    client.delete("/words/pear", headers=headers)
+    client.delete(f"/articles/{gone}", headers=headers)
+    # 同一期間刪除後又新增：只出現在 words
+    word_store.delete(USER, "plum")
+    word_store.set(USER, "plum", {"userId": USER, "createdAt": now, "dueDate": now})
+
+    delta = client.get("/sync", query_string={"since": first["token"]}, headers=headers).get_json()
+    assert delta["full"] is False
+    assert sorted(w["id"] for w in delta["words"]) == ["apple", "plum"]
+    assert next(w for w in delta["words"] if w["id"] == "apple")["lastInterval"] == 1
+    assert delta["deletedWords"] == ["pear"]
+    assert delta["articles"] == [] and delta["deletedArticles"] == [gone]
+
+    empty = client.get("/sync", query_string={"since": delta["token"]}, headers=headers).get_json()
+    assert (empty["words"], empty["deletedWords"], empty["articles"]) == ([], [], [])
+
+
+def test_gzip_expired_and_invalid_tokens(client, headers):
+    now = datetime.utcnow()
+    for i in range(40):
+        word_store.set(USER, f"gz{i}", {"userId": USER, "createdAt": now, "short": "測試" * 5})
+
+    resp = client.get("/sync", headers={**headers, "Accept-Encoding": "gzip"})
+    assert resp.headers["Content-Encoding"] == "gzip" and "Accept-Encoding" in resp.headers["Vary"]
+    body = json.loads(gzip.decompress(resp.data))
+    assert len(body["words"]) >= 40
+
+    from sync.routes import encode_token
+    old = encode_token(now - timedelta(days=365))
+    assert client.get("/sync", query_string={"since": old}, headers=headers).get_json()["full"] is True
+    assert client.get("/sync", query_string={"since": "not-a-token"}, headers=headers).status_code == 400
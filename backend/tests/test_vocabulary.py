@@ -0,0 +1,62 @@
+from signals import word_saved, word_deleted
+from storage import word_store, article_store
+from vocabulary import VocabularyCache
+
+TEXT = "The explorers crossed the glacier. Two explorers found a crevasse, and the glacier groaned."
+
+
+def test_coverage_counts_unknown_words_and_folds_inflections():
+    user = "vocab1@example.com"
+    word_store.set(user, "explorer", {"userId": user})
+    word_store.set(user, "Glacier", {"userId": user, "word": "glacier"})
+    cache = VocabularyCache()
+
+    result = cache.coverage(user, TEXT)
+    assert result["totalWords"] == 14
+    # crossed / groaned 對回易字表中的 cross / groan，explorers 對回單字本中的 explorer
+    assert result["unknownWords"] == [{"word": "crevasse", "count": 1}]
+    assert result["unknownCount"] == 1 and result["unknownDensity"] == round(1 / 14, 4)
+    assert cache.knows(user, "Explorer") and cache.knows(user, "the")
+
+
+def test_signals_keep_loaded_vocabulary_in_sync():
+    import vocabulary
+    user = "vocab2@example.com"
+    vocabulary.vocabulary.invalidate(user)
+    assert not vocabulary.vocabulary.knows(user, "crevasse")
+    assert vocabulary.vocabulary.stats()["loads"] >= 1
+
+    word_saved.send(user, word_id="crevasse", fields={"word": "crevasse", "userId": user}, created=True)
+    assert vocabulary.vocabulary.knows(user, "Crevasse")
+    word_deleted.send(user, word_id="crevasse")
+    assert not vocabulary.vocabulary.knows(user, "crevasse")
+
+
+def test_coverage_endpoint(client, auth_headers):
+    user = "vocab3@example.com"
+    article_id = article_store.add({"userId": user, "article": TEXT})
+    word_store.set(user, "glacier", {"userId": user})
+
+    def get(as_user):
+        return client.get(f"/articles/{article_id}/coverage", headers=auth_headers(as_user))
+
+    assert get("someone@example.com").status_code == 404
+    body = get(user).get_json()
+    assert body["id"] == article_id
+    assert [w["word"] for w in body["unknownWords"]] == ["explorers", "crevasse"]
+
+
+def test_vocabulary_is_sorted_uint64_array_of_stable_hashes():
+    import os
+    import subprocess
+    import sys
+    import vocabulary
+    from vocabulary import term_hash, _UserVocabulary
+    vocab = _UserVocabulary(["glacier", "explorer", "glacier"])
+    assert str(vocab.hashes.dtype) == "uint64" and len(vocab.hashes) == 2
+    assert vocab.hashes.tolist() == sorted(vocab.hashes.tolist())
+    # 不受 PYTHONHASHSEED 影響：另一個行程算出相同的值
+    out = subprocess.run([sys.executable, "-c", "from vocabulary import term_hash; print(term_hash('glacier'))"],
+                         capture_output=True, text=True, env={"PYTHONHASHSEED": "123"}, check=True,
+                         cwd=os.path.dirname(vocabulary.__file__))
+    assert int(out.stdout) == term_hash("glacier")
@@ -0,0 +1,88 @@
+import json
+import time
+import llm
+from definitions import definition_cache
+from storage import word_store, job_store
+from word_import import parse_words, parse_definition_batch, definition_batch_messages
+
+ANKI = "#separator:tab\n#html:true\n<b>Glacier</b>\t冰河\ncrevasse\t冰隙\n"
+
+
+def test_parse_formats_dedupe_and_reject():
+    assert parse_words("apple\nBanana, cherry\n# comment\napple") == (["apple", "banana", "cherry"], [])
+    assert parse_words("word,meaning\nice cap,冰帽\nfjord,峽灣") == (["ice cap", "fjord"], [])
+    assert parse_words(ANKI) == (["glacier", "crevasse"], [])
+    words, invalid = parse_words("ok\nx/y\n123", fmt="list")
+    assert words == ["ok"] and invalid == ["x/y", "123"]
+
+
+def test_parse_definition_batch_keeps_requested_words():
+    content = json.dumps({"definitions": {"Apple": {"short": "蘋果", "full": "n. 蘋果"},
+                                          "pear": {"short": "梨"}, "extra": {"short": "多的"}}})
+    assert parse_definition_batch(content, ["apple", "pear"]) == {"apple": ("蘋果", "n. 蘋果"), "pear": ("梨", "梨")}
+
+
+def _fake_complete(calls):
+    def complete(site, messages, **options):
+        words = messages[-1]["content"].split("Words:\n", 1)[1].splitlines()
+        calls.append(words)
+        # 每組故意漏掉含 "skip" 的單字，重試時才回覆
+        retry = len(calls) > 1 and all("skip" in w for w in words)
+        return json.dumps({"definitions": {w: {"short": f"短{w}", "full": f"n. {w}"}
+                                           for w in words if retry or "skip" not in w}})
+    return complete
+
+
+def test_import_endpoint_runs_in_background(monkeypatch, client, auth_headers):
+    import word_import
+    user = "import@example.com"
+    word_store.set(user, "apple", {"userId": user, "short": "蘋果"})
+    definition_cache.put("banana", "香蕉", "n. 香蕉")
+    calls = []
+    monkeypatch.setattr(llm, "complete", _fake_complete(calls))
+    monkeypatch.setattr(word_import, "CHUNK_SIZE", 2)
+    headers = auth_headers(user)
+
+    content = "apple\nbanana\ncherry\ndate\nskipper\nfig\n1nvalid"
+    resp = client.post("/words/import", json={"content": content}, headers=headers)
+    assert resp.status_code == 202 and resp.get_json()["total"] == 6
+    status_url = resp.headers["Location"]
+
+    for _ in range(200):
+        status = client.get(status_url, headers=headers).get_json()
+        if status["status"] == "done":
+            break
+        time.sleep(0.01)
+    assert status["status"] == "done", status
+    assert (status["imported"], status["existing"], status["cached"], status["failedCount"]) == (5, 1, 1, 0)
+    assert status["invalid"] == ["1nvalid"] and status["processed"] == 6
+    # cherry/date、skipper/fig 兩組，skipper 缺漏後再單獨重試一次
+    assert calls[-1] == ["skipper"]
+    assert word_store.get(user, "skipper")["short"] == "短skipper"
+    assert word_store.get(user, "apple")["short"] == "蘋果"
+    assert definition_cache.get("fig")["full"] == "n. fig"
+
+    assert client.get(status_url, headers=auth_headers("other@example.com")).status_code == 404
+    assert client.post("/words/import", json={"content": "123"}, headers=headers).status_code == 400
+    assert "Words:\napple" in definition_batch_messages(["apple"])[-1]["content"]
+
+
+def test_import_and_post_words_share_normalization(monkeypatch, client, auth_headers):
+    import word_import
+    user = "import-case@example.com"
+    headers = auth_headers(user)
+    definition_cache.put("apple", "蘋果", "n. 蘋果")
+    # 舊版 POST /words 以原始大小寫為 id
+    word_store.set(user, "Kiwi", {"userId": user, "short": "奇異果"})
+
+    resp = client.post("/words", json={"word": " Apple "}, headers=headers)
+    assert resp.status_code == 201 and resp.get_json()["word"] == "apple"
+    resp = client.post("/words", json={"word": "Kiwi"}, headers=headers)
+    assert resp.status_code == 200 and resp.get_json()["existed"] is True
+
+    calls = []
+    monkeypatch.setattr(llm, "complete", _fake_complete(calls))
+    job_store.set("case-job", {"type": word_import.JOB_TYPE, "userId": user, "status": "queued"})
+    word_import.run_import("case-job", user, ["apple", "kiwi"])
+    assert calls == [] and job_store.get("case-job")["existing"] == 2
+    assert set(word_store.get_many(user, ["apple", "Apple", "kiwi", "Kiwi"])) == {"apple", "Kiwi"}
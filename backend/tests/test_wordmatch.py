@@ -0,0 +1,54 @@
+# backend/tests/test_wordmatch.py
+import itertools
+import string
+from wordmatch import WordMatcher, match_words, tokenize
+
+
+def test_whole_token_only():
+    result = match_words("The cat chose a category.", ["cat"])
+    assert result["counts"] == {"cat": 1}
+    assert result["offsets"]["cat"] == [{"start": 4, "end": 7}]
+
+
+def test_case_insensitive_keys():
+    result = match_words("Apple pie and an APPLE.", ["Apple"])
+    assert result["counts"] == {"apple": 2}
+
+
+def test_inflection_folding():
+    text = "She studies hard, stopped twice, kept running and liked the cats' boxes."
+    targets = ["study", "stop", "run", "like", "cat", "box"]
+    assert match_words(text, targets)["counts"]["study"] == 0
+    counts = match_words(text, targets, fold_inflections=True)["counts"]
+    assert counts == {"study": 1, "stop": 1, "run": 1, "like": 1, "cat": 1, "box": 1}
+
+
+def test_phrases_use_longest_match():
+    text = "He gave up. Then he gave the book up."
+    result = match_words(text, ["give up", "give"], fold_inflections=True)
+    assert result["counts"] == {"give up": 1, "give": 1}
+    start = result["offsets"]["give up"][0]
+    assert text[start["start"]:start["end"]] == "gave up"
+
+
+def test_offsets_point_into_original_text():
+    text = "Dogs, dogs; DOGS!"
+    result = match_words(text, ["dog"], fold_inflections=True)
+    assert [text[o["start"]:o["end"]] for o in result["offsets"]["dog"]] == ["Dogs", "dogs", "DOGS"]
+
+
+def test_large_target_list_single_pass():
+    # 676 個不同的兩字母目標字 + river
+    targets = ["".join(p) for p in itertools.product(string.ascii_lowercase, repeat=2)] + ["river"]
+    matcher = WordMatcher(targets)
+    counts = matcher.match("An ox by the river: go, go, GO to it. Ab ba zz!")["counts"]
+    assert len(counts) == len(targets)
+    assert {w: counts[w] for w in ("an", "ox", "by", "go", "to", "it", "ab", "ba", "zz", "river")} == {
+        "an": 1, "ox": 1, "by": 1, "go": 3, "to": 1, "it": 1, "ab": 1, "ba": 1, "zz": 1, "river": 1}
+    assert sum(counts.values()) == 12
+    assert len(tokenize("don’t stop")) == 2
+
+
+def test_targets_with_digits_never_match():
+    result = match_words("A word, word1, an mp3 and word2.", ["word1", "word2", "mp3", "an"])
+    assert result["counts"] == {"word1": 0, "word2": 0, "mp3": 0, "an": 1}
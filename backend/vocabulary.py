@@ -0,0 +1,193 @@
+# backend/vocabulary.py
+"""
+每位使用者的字彙集合與文章覆蓋率（GET /articles/<id>/coverage）
+
+字彙集合是「已收錄單字」的 64-bit 雜湊值（blake2b 前 8 bytes，跨 worker 與重啟都相同）
+排序後的 np.uint64 陣列，每字 8 bytes，不保留字串本身，以 searchsorted 查詢
+（2000 字的單字本約 16 KiB；64-bit 雜湊誤判的機率約 n² / 2⁶⁵，可忽略）：
+- 第一次存取時以 for_user(fields=[]) 只讀文件 id（即單字本身）載入，之後由 signals 增量維護
+  （create_or_mark_word、mark_unknown_word 新增，刪除時移除；以新陣列替換，讀取端不需加鎖），
+  不必每次掃整個 words 集合
+- NumPy 在第一次載入字彙時才匯入
+- 使用者數以 LRU 限制（VOCAB_MAX_USERS），每位使用者另有 TTL（VOCAB_TTL），
+  避免多個 worker 之間的寫入讓集合長期不一致
+- Dale–Chall 易字表中的單字一律視為已知（初學者不會把 the、house 收進單字本）
+
+覆蓋率以 wordmatch.tokenize 切 token，詞形變化（cats、went）會對回原形再查；
+300 字的文章約 0.5 毫秒（單字本 2000 字）。
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import register_collector
+from readability import easy_words
+from signals import word_saved, word_deleted
+from storage import word_store
+from wordmatch import tokenize, inflection_candidates
+
+MAX_USERS = int(os.getenv("VOCAB_MAX_USERS", "5000"))
+TTL_SECONDS = int(os.getenv("VOCAB_TTL", "600"))
+
+
+def _term(word_id) -> str:
+    return word_id.strip().lower()
+
+
+def term_hash(term) -> int:
+    """穩定的 64-bit 雜湊（不受 PYTHONHASHSEED 影響）"""
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class _UserVocabulary:
+    __slots__ = ("hashes", "loaded_at")
+
+    def __init__(self, terms):
+        import numpy as np
+        self.hashes = np.unique(np.fromiter((term_hash(t) for t in terms), dtype=np.uint64))
+        self.loaded_at = time.monotonic()
+
+    def contains(self, values):
+        """values（雜湊值序列）中各值是否在字彙中，回傳 bool 陣列"""
+        import numpy as np
+        values = np.asarray(values, dtype=np.uint64)
+        hashes = self.hashes
+        if not len(hashes):
+            return np.zeros(len(values), dtype=bool)
+        idx = np.minimum(np.searchsorted(hashes, values), len(hashes) - 1)
+        return hashes[idx] == values
+
+    def add(self, value):
+        import numpy as np
+        i = int(np.searchsorted(self.hashes, np.uint64(value)))
+        if i == len(self.hashes) or self.hashes[i] != value:
+            self.hashes = np.insert(self.hashes, i, np.uint64(value))
+
+    def remove(self, value):
+        import numpy as np
+        i = int(np.searchsorted(self.hashes, np.uint64(value)))
+        if i < len(self.hashes) and self.hashes[i] == value:
+            self.hashes = np.delete(self.hashes, i)
+
+
+class VocabularyCache:
+    def __init__(self, max_users=MAX_USERS, ttl=TTL_SECONDS, store=None):
+        self.max_users = max_users
+        self.ttl = ttl
+        self._store = store or word_store
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+
+    def _vocabulary(self, user_id) -> _UserVocabulary:
+        with self._lock:
+            vocab = self._users.get(user_id)
+            if vocab is not None and time.monotonic() - vocab.loaded_at > self.ttl:
+                del self._users[user_id]
+                vocab = None
+            if vocab is not None:
+                self._users.move_to_end(user_id)
+                self.hits += 1
+                return vocab
+
+        docs = self._store.for_user(user_id, fields=[])
+        vocab = _UserVocabulary(_term(word_id) for word_id, _ in docs)
+        with self._lock:
+            self.loads += 1
+            self._users[user_id] = vocab
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        return vocab
+
+    def knows(self, user_id, word) -> bool:
+        word = word.strip().lower()
+        return word in easy_words() or bool(self._vocabulary(user_id).contains([term_hash(word)])[0])
+
+    def coverage(self, user_id, text) -> dict:
+        """
+        回傳 {"totalWords", "unknownCount", "unknownDensity", "coverage", "unknownWords"}；
+        unknownWords 依首次出現順序列出 {"word", "count"}。
+        """
+        vocab = self._vocabulary(user_id)
+        easy = easy_words()
+        tokens = [token for token, _, _ in tokenize(text)]
+        total = len(tokens)
+
+        # 不在易字表的 token：所有可能原形的雜湊一次以 searchsorted 查詢
+        candidates = {}
+        for token in dict.fromkeys(tokens):
+            forms = list(dict.fromkeys(inflection_candidates(token)))
+            if not any(c in easy for c in forms):
+                candidates[token] = [term_hash(c) for c in forms]
+        flat = [h for forms in candidates.values() for h in forms]
+        hits = {h for h, hit in zip(flat, vocab.contains(flat)) if hit} if flat else set()
+
+        unknown = {}
+        for token in tokens:
+            forms = candidates.get(token)
+            if forms is not None and not any(h in hits for h in forms):
+                unknown[token] = unknown.get(token, 0) + 1
+
+        unknown_count = sum(unknown.values())
+        density = unknown_count / total if total else 0.0
+        return {
+            "totalWords": total,
+            "unknownCount": unknown_count,
+            "unknownDensity": round(density, 4),
+            "coverage": round(1 - density, 4),
+            "unknownWords": [{"word": w, "count": n} for w, n in unknown.items()],
+        }
+
+    def add(self, user_id, term):
+        with self._lock:
+            vocab = self._users.get(user_id)
+            if vocab is not None:
+                vocab.add(term_hash(term))
+
+    def remove(self, user_id, term):
+        with self._lock:
+            vocab = self._users.get(user_id)
+            if vocab is not None:
+                vocab.remove(term_hash(term))
+
+    def invalidate(self, user_id=None):
+        with self._lock:
+            if user_id is None:
+                self._users.clear()
+            else:
+                self._users.pop(user_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"users": len(self._users), "words": sum(len(v.hashes) for v in self._users.values()),
+                    "hits": self.hits, "loads": self.loads}
+
+
+vocabulary = VocabularyCache()
+
+
+@word_saved.connect
+def _on_word_saved(user_id, word_id, fields, created=False, **_):
+    # update() 只改排程欄位，不影響字彙集合
+    if created:
+        vocabulary.add(user_id, _term(word_id))
+
+
+@word_deleted.connect
+def _on_word_deleted(user_id, word_id, **_):
+    vocabulary.remove(user_id, _term(word_id))
+
+
+@register_collector
+def _vocabulary_samples():
+    stats = vocabulary.stats()
+    labels = {"cache": "vocabulary"}
+    return [
+        ("cache_entries", "Entries held by in-process caches", labels, stats["users"]),
+        ("cache_hits", "In-process cache hits since start", labels, stats["hits"]),
+        ("cache_misses", "In-process cache misses since start", labels, stats["loads"]),
+    ]
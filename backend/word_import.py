@@ -0,0 +1,297 @@
+# backend/word_import.py
+"""
+批次匯入單字（POST /words/import，GET /words/import/<job_id>）
+
+輸入格式（format，預設 auto 自動判斷）：
+- list：每行一個單字（也接受逗號、分號分隔）
+- csv：第一欄為單字，第一列是 word / term 等標題時略過
+- anki：Anki 純文字匯出，依 #separator 檔頭分欄（預設 tab），第一欄為單字，移除 HTML 標籤
+# 開頭的行一律略過。單字正規化（definitions.normalize_word）後只接受英文字母、連字號、
+撇號與空白（片語），重複的只算一次，不合格的列在 invalid。
+
+匯入在背景執行（每個 worker 一個有上限的執行緒池），進度存在 jobs 集合，任何 worker 都能回應輪詢：
+1. 以一次 get_many 比對使用者已有的單字（含舊版以首字大寫為 id 的單字），已存在的略過（不重設排程）
+2. 共用定義快取以 get_many 一次查詢，命中的直接使用
+3. 其餘單字每 CHUNK_SIZE 個一組，以單次結構化（JSON）GPT 呼叫產生 short / full，
+   各組並行（並行上限見 llm.SITES["definition_batch"]）；回覆缺漏的單字最後再併組重試一次，
+   仍失敗的列在 failed，不寫入「翻譯失敗」的單字
+4. 每組完成即以 set_many 批次寫入並送出 word_saved，新定義也以 put_many 寫回共用快取
+1000 個新單字約 25 次 GPT 呼叫（4 組並行），加上數次批次讀寫。
+"""
+import csv
+import html
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+import llm
+from llm import LLMBusy
+from auth.utils import user_doc
+from definitions import definition_cache, normalize_word
+from signals import word_saved
+from sm2 import user_params
+from storage import word_store, job_store, naive_utc
+
+MAX_WORDS = int(os.getenv("IMPORT_MAX_WORDS", "2000"))
+CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK", "40"))
+JOB_WORKERS = int(os.getenv("IMPORT_WORKERS", "2"))          # 同時執行的匯入工作
+CHUNK_WORKERS = int(os.getenv("IMPORT_CHUNK_WORKERS", "4"))  # 單一工作內同時進行的 GPT 呼叫
+STALE_SECONDS = int(os.getenv("IMPORT_STALE_SECONDS", "300"))
+TOKENS_PER_WORD = 60
+BUSY_RETRIES = 3
+MAX_WORD_LENGTH = 64
+MAX_REPORTED = 50        # invalid / failed 最多列出幾個
+
+FORMATS = ("auto", "list", "csv", "anki")
+JOB_TYPE = "word_import"
+
+_WORD_RE = re.compile(r"^[a-z][a-z' -]*$")
+_TAG_RE = re.compile(r"<[^>]+>")
+_HEADER_CELLS = {"word", "words", "term", "front", "english", "vocabulary"}
+_ANKI_SEPARATORS = {"tab": "\t", "comma": ",", "semicolon": ";", "pipe": "|", "space": " "}
+
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="word-import")
+
+
+# ---- 解析 ----
+
+def _data_lines(content):
+    return [line for line in content.splitlines() if line.strip() and not line.lstrip().startswith("#")]
+
+
+def detect_format(content) -> str:
+    if content.lstrip().startswith("#separator") or "\t" in content:
+        return "anki"
+    lines = _data_lines(content)
+    if len(lines) > 1 and all("," in line for line in lines):
+        return "csv"
+    return "list"
+
+
+def _anki_separator(content):
+    for line in content.splitlines():
+        if line.startswith("#separator:"):
+            name = line.split(":", 1)[1].strip()
+            return _ANKI_SEPARATORS.get(name.lower(), name[:1] or "\t")
+        if line.strip() and not line.startswith("#"):
+            break
+    return "\t"
+
+
+def parse_words(content, fmt="auto"):
+    """回傳 (words, invalid)：words 為正規化、去重後的單字（保留輸入順序），invalid 為無法接受的項目"""
+    if fmt == "auto":
+        fmt = detect_format(content)
+    if fmt == "anki":
+        rows = csv.reader(_data_lines(content), delimiter=_anki_separator(content))
+        raw = [html.unescape(_TAG_RE.sub(" ", row[0])) for row in rows if row]
+    elif fmt == "csv":
+        rows = [row for row in csv.reader(_data_lines(content)) if row]
+        if rows and rows[0][0].strip().lower() in _HEADER_CELLS:
+            rows = rows[1:]
+        raw = [row[0] for row in rows]
+    else:
+        raw = re.split(r"[,;\n]", "\n".join(_data_lines(content)))
+    return clean_words(raw)
+
+
+def clean_words(raw):
+    words, invalid = {}, []
+    for item in raw:
+        if not isinstance(item, str):
+            invalid.append(str(item))
+            continue
+        word = normalize_word(item.replace("’", "'"))
+        if not word:
+            continue
+        if len(word) > MAX_WORD_LENGTH or not _WORD_RE.match(word):
+            invalid.append(item.strip())
+            continue
+        words.setdefault(word, None)
+    return list(words), invalid
+
+
+# ---- GPT 批次定義 ----
+
+def definition_batch_messages(words):
+    prompt = (
+        "For each English word or phrase below, give the shortest possible Traditional Chinese meaning "
+        "(a few Traditional Chinese words, no punctuation) and a brief Traditional Chinese explanation in one or "
+        "two lines that starts with the part of speech (e.g., n., v., adj.). "
+        'Respond with a JSON object of the form {"definitions": {"<word>": {"short": "...", "full": "..."}}}.\n'
+        "Words:\n" + "\n".join(words)
+    )
+    return [
+        {"role": "system", "content": "You are a concise English-to-Traditional Chinese dictionary assistant."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def parse_definition_batch(content, words) -> dict:
+    """解析批次 JSON 回覆為 {word: (short, full)}，只保留要求的單字；格式錯誤拋 ValueError"""
+    wanted = set(words)
+    parsed = json.loads(content)
+    definitions = {}
+    for word, entry in (parsed.get("definitions") or {}).items():
+        word = normalize_word(word)
+        if word not in wanted or not isinstance(entry, dict):
+            continue
+        short, full = entry.get("short"), entry.get("full")
+        if isinstance(short, str) and short.strip():
+            short = short.strip()
+            definitions[word] = (short, full.strip() if isinstance(full, str) and full.strip() else short)
+    return definitions
+
+
+def define_chunk(words) -> dict:
+    """一次 GPT 呼叫定義一組單字；名額已滿時等 Retry-After 後重試，其他錯誤回傳空結果（整組留待重試）"""
+    for attempt in range(BUSY_RETRIES + 1):
+        try:
+            content = llm.complete("definition_batch", definition_batch_messages(words),
+                                   response_format={"type": "json_object"},
+                                   max_tokens=TOKENS_PER_WORD * len(words))
+            return parse_definition_batch(content, words)
+        except LLMBusy as e:
+            if attempt == BUSY_RETRIES:
+                return {}
+            time.sleep(e.retry_after)
+        except Exception:
+            return {}
+
+
+# ---- 背景工作 ----
+
+class _Job:
+    """單一匯入工作的計數；每組完成後把進度寫回 jobs 集合"""
+
+    def __init__(self, job_id, user_id):
+        self.job_id = job_id
+        self.user_id = user_id
+        self.imported = 0
+        self.existing = 0
+        self.cached = 0
+        self.failed = []
+        self._lock = threading.Lock()
+
+    def save(self, definitions, cached=False):
+        """{word: (short, full)} 寫入使用者的單字本"""
+        if not definitions:
+            return
+        from words.routes import new_word_document
+        ease = user_params(user_doc(self.user_id).get("sm2Params"))["initialEase"]
+        docs = {w: new_word_document(self.user_id, short, full, ease) for w, (short, full) in definitions.items()}
+        word_store.set_many(self.user_id, docs)
+        for word_id, doc in docs.items():
+            word_saved.send(self.user_id, word_id=word_id, fields=doc, created=True)
+        with self._lock:
+            self.imported += len(docs)
+            if cached:
+                self.cached += len(docs)
+        self.report()
+
+    def report(self, **fields):
+        with self._lock:
+            progress = {
+                "imported": self.imported,
+                "existing": self.existing,
+                "cached": self.cached,
+                "processed": self.imported + self.existing + len(self.failed),
+                "failed": self.failed[:MAX_REPORTED],
+                "failedCount": len(self.failed),
+                "updatedAt": datetime.utcnow()
+            }
+        job_store.update(self.job_id, {**progress, **fields})
+
+
+def run_import(job_id, user_id, words):
+    job = _Job(job_id, user_id)
+    job.report(status="running")
+
+    # POST /words 過去以原始大小寫為 id（文章句首點擊的 "Apple"），一併查首字大寫的形式
+    variants = [w.capitalize() for w in words if w.capitalize() != w]
+    existing = word_store.get_many(user_id, words + variants)
+    new_words = [w for w in words if w not in existing and w.capitalize() not in existing]
+    job.existing = len(words) - len(new_words)
+
+    cached = definition_cache.get_many(new_words)
+    job.save({w: (d["short"], d["full"]) for w, d in cached.items()}, cached=True)
+
+    pending = [w for w in new_words if w not in cached]
+    chunks = [pending[i:i + CHUNK_SIZE] for i in range(0, len(pending), CHUNK_SIZE)]
+    missing = []
+
+    def define_and_save(chunk):
+        defined = define_chunk(chunk)
+        if defined:
+            definition_cache.put_many(defined)
+            job.save(defined)
+        return [w for w in chunk if w not in defined]
+
+    if chunks:
+        with ThreadPoolExecutor(max_workers=min(CHUNK_WORKERS, len(chunks))) as pool:
+            for future in as_completed([pool.submit(define_and_save, c) for c in chunks]):
+                missing += future.result()
+    # 回覆缺漏的單字（通常是 JSON 被截斷或少數單字被略過）併組重試一次
+    for i in range(0, len(missing), CHUNK_SIZE):
+        job.failed += define_and_save(missing[i:i + CHUNK_SIZE])
+
+    job.report(status="done", finishedAt=datetime.utcnow())
+
+
+def _run(job_id, user_id, words):
+    try:
+        run_import(job_id, user_id, words)
+    except Exception as e:
+        job_store.update(job_id, {"status": "failed", "error": str(e), "finishedAt": datetime.utcnow(),
+                                  "updatedAt": datetime.utcnow()})
+
+
+def start_import(user_id, words, invalid) -> str:
+    """建立工作並交給背景執行緒，回傳 job id"""
+    job_id = uuid.uuid4().hex[:20]
+    now = datetime.utcnow()
+    job_store.set(job_id, {
+        "type": JOB_TYPE,
+        "userId": user_id,
+        "status": "queued",
+        "total": len(words),
+        "processed": 0,
+        "imported": 0,
+        "existing": 0,
+        "cached": 0,
+        "failed": [],
+        "failedCount": 0,
+        "invalid": invalid[:MAX_REPORTED],
+        "invalidCount": len(invalid),
+        "createdAt": now,
+        "updatedAt": now
+    })
+    _executor.submit(_run, job_id, user_id, words)
+    return job_id
+
+
+def job_status(user_id, job_id):
+    """回傳工作進度；不存在或不屬於該使用者時回傳 None"""
+    job = job_store.get(job_id)
+    if job is None or job.get("userId") != user_id or job.get("type") != JOB_TYPE:
+        return None
+    status = job["status"]
+    updated = job.get("updatedAt")
+    if status in ("queued", "running") and updated is not None \
+            and naive_utc(updated) < datetime.utcnow() - timedelta(seconds=STALE_SECONDS):
+        # 執行的 worker 已重啟或當掉，進度不會再更新
+        status = "interrupted"
+    result = {k: job.get(k) for k in ("total", "processed", "imported", "existing", "cached", "failed",
+                                      "failedCount", "invalid", "invalidCount", "error")}
+    result.update(jobId=job_id, status=status, createdAt=_iso(job.get("createdAt")),
+                  finishedAt=_iso(job.get("finishedAt")))
+    return result
+
+
+def _iso(dt):
+    return naive_utc(dt).isoformat() if dt is not None else None
@@ -0,0 +1,150 @@
+# backend/wordmatch.py
+"""
+以單字（token）為單位的目標字比對：
+- 文章只切一次 token，所有目標字在同一次掃描中計數
+- 依 token 比對，不會把 "cat" 算進 "category"
+- 多字片語（如 "give up"）以 token trie 比對
+- 可選的詞形還原：複數、過去式、進行式等規則變化對回原形
+- 回傳每個目標字在原文中的字元位置 (start, end)，供前端直接標示
+"""
+import re
+
+_TOKEN_RE = re.compile(r"[^\W\d_]+(?:['’][^\W\d_]+)*")
+_END = object()  # trie 中標記片語結尾
+
+# 常見不規則變化 → 原形
+IRREGULAR_FORMS = {
+    "was": "be", "were": "be", "been": "be", "is": "be", "am": "be", "are": "be",
+    "had": "have", "has": "have", "did": "do", "done": "do", "does": "do",
+    "went": "go", "gone": "go", "goes": "go", "gave": "give", "given": "give",
+    "took": "take", "taken": "take", "came": "come", "saw": "see", "seen": "see",
+    "made": "make", "said": "say", "got": "get", "gotten": "get", "knew": "know",
+    "known": "know", "thought": "think", "told": "tell", "found": "find",
+    "felt": "feel", "left": "leave", "kept": "keep", "began": "begin", "begun": "begin",
+    "brought": "bring", "bought": "buy", "caught": "catch", "taught": "teach",
+    "wrote": "write", "written": "write", "ran": "run", "ate": "eat", "eaten": "eat",
+    "drank": "drink", "drunk": "drink", "spoke": "speak", "spoken": "speak",
+    "chose": "choose", "chosen": "choose", "flew": "fly", "flown": "fly",
+    "grew": "grow", "grown": "grow", "threw": "throw", "thrown": "throw",
+    "forgot": "forget", "forgotten": "forget", "held": "hold", "met": "meet",
+    "sat": "sit", "stood": "stand", "understood": "understand", "lost": "lose",
+    "paid": "pay", "sent": "send", "spent": "spend", "built": "build", "fell": "fall",
+    "fallen": "fall", "heard": "hear", "led": "lead", "meant": "mean", "slept": "sleep",
+    "won": "win", "wore": "wear", "worn": "wear", "broke": "break", "broken": "break",
+    "drove": "drive", "driven": "drive", "rode": "ride", "ridden": "ride",
+    "sang": "sing", "sung": "sing", "swam": "swim", "swum": "swim", "hid": "hide",
+    "hidden": "hide", "woke": "wake", "woken": "wake",
+    "children": "child", "men": "man", "women": "woman", "people": "person",
+    "feet": "foot", "teeth": "tooth", "mice": "mouse", "geese": "goose",
+}
+
+
+def tokenize(text: str):
+    """回傳 [(token 小寫, start, end), ...]"""
+    return [(m.group().lower().replace("’", "'"), m.start(), m.end()) for m in _TOKEN_RE.finditer(text)]
+
+
+def inflection_candidates(token: str):
+    """
+    規則變化的可能原形（不查字典，僅供與目標字表比對）：
+    cats→cat, boxes→box, studies→study, played→play, liked→like,
+    stopped→stop, running→run, making→make, boy's→boy，以及常見不規則變化（gave→give）
+    """
+    yield token
+    if token in IRREGULAR_FORMS:
+        yield IRREGULAR_FORMS[token]
+    if token.endswith("'s"):
+        token = token[:-2]
+        yield token
+    n = len(token)
+    if n > 3 and token.endswith("ies"):
+        yield token[:-3] + "y"
+    if n > 3 and token.endswith("es"):
+        yield token[:-2]
+    if n > 2 and token.endswith("s") and not token.endswith("ss"):
+        yield token[:-1]
+    if n > 3 and token.endswith("ied"):
+        yield token[:-3] + "y"
+    for suffix in ("ed", "ing"):
+        if n > len(suffix) + 1 and token.endswith(suffix):
+            stem = token[:-len(suffix)]
+            yield stem
+            yield stem + "e"
+            if len(stem) > 2 and stem[-1] == stem[-2]:
+                yield stem[:-1]
+
+
+class WordMatcher:
+    """
+    針對一組目標字建好索引後，可重複套用在多篇文章上（例如批次重新分析）。
+    目標字以小寫作為結果的 key，與原本 wordCounts 相同。
+    token 只含字母（與撇號），含數字或底線的目標字（如 "mp3"、"word1"）不會被比對到，
+    結果中計數恆為 0；不建入 trie，避免 "word1"、"word2" 被切成同一個 "word" 而互相覆蓋。
+    """
+
+    def __init__(self, targets, fold_inflections=False):
+        self.fold_inflections = fold_inflections
+        self.targets = []
+        self._trie = {}
+        for target in targets:
+            key = target.strip().lower()
+            tokens = [t for t, _, _ in tokenize(key)]
+            if not tokens or key in self.targets:
+                continue
+            self.targets.append(key)
+            if any(c.isdigit() or c == "_" for c in key):
+                continue
+            node = self._trie
+            for t in tokens:
+                node = node.setdefault(t, {})
+            node[_END] = key
+
+    def _step(self, node, token):
+        """沿 trie 前進一個 token；開啟詞形還原時依序嘗試可能原形"""
+        child = node.get(token)
+        if child is not None or not self.fold_inflections:
+            return child
+        for base in inflection_candidates(token):
+            child = node.get(base)
+            if child is not None:
+                return child
+        return None
+
+    def match(self, text: str) -> dict:
+        """
+        回傳 {"counts": {word: n}, "offsets": {word: [{"start", "end"}, ...]}}
+        同一位置有多個片語符合時取最長者，且比對不重疊。
+        """
+        counts = {w: 0 for w in self.targets}
+        offsets = {w: [] for w in self.targets}
+        tokens = tokenize(text)
+
+        i = 0
+        while i < len(tokens):
+            node = self._trie
+            best = None
+            j = i
+            while j < len(tokens):
+                node = self._step(node, tokens[j][0])
+                if node is None:
+                    break
+                if _END in node:
+                    best = (node[_END], j)
+                j += 1
+
+            if best is None:
+                i += 1
+                continue
+            word, last = best
+            counts[word] += 1
+            offsets[word].append({"start": tokens[i][1], "end": tokens[last][2]})
+            i = last + 1
+
+        return {"counts": counts, "offsets": offsets}
+
+    def match_many(self, texts) -> list:
+        return [self.match(t) for t in texts]
+
+
+def match_words(text: str, targets, fold_inflections=False) -> dict:
+    return WordMatcher(targets, fold_inflections).match(text)
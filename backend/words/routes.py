@@ -2,43 +2,50 @@
 from flask import Blueprint, request, jsonify, g
 from auth.utils import auth_required
 from datetime import datetime
-from firebase_admin import firestore
+import json
 import random
+from concurrent.futures import ThreadPoolExecutor, as_completed
 # import requests
-import openai
+import llm
+from llm import LLMBusy
+from sm2 import sm2_review, user_params, DEFAULT_PARAMS
+from definitions import definition_cache, normalize_word
+from pagination import parse_page_args
+from storage import word_store
+from signals import word_saved, word_deleted
+import word_import
+import review_log
 bp = Blueprint('words', __name__, url_prefix='/words')
-db = firestore.client()
 
 @bp.route('', methods=['POST'])
 @auth_required
 def create_or_mark_word():
     """
     建立新單字或標記文章中的單字，並自動翻譯與儲存。
+    單字以 normalize_word 正規化後作為 id（與批次匯入相同）；先前以原始大小寫建立的單字（如句首的 "Apple"）
+    仍以原 id 更新，不另建一份。
     """
     data = request.get_json(force=True)
     user_id = g.user["sub"]
-    word = data.get('word')
+    raw = data.get('word')
     level = data.get('level', 'A1')
+    word = normalize_word(raw) if isinstance(raw, str) else ""
     if not word:
         return jsonify(error="word is required"), 400
 
-    doc_ref = db.collection("words").document(word)
-    doc = doc_ref.get()
+    word_data = word_store.get(user_id, word)
+    if word_data is None and raw.strip() != word:
+        legacy = word_store.get(user_id, raw.strip())
+        if legacy is not None:
+            word, word_data = raw.strip(), legacy
 
-    if doc.exists and doc.to_dict().get("userId") == user_id:
+    params = user_params(g.user_ctx.get("sm2Params"))
+    if word_data is not None:
         # 更新熟悉度（再次點擊 = 還不熟，quality=2）
-        from sm2 import sm2_review  # 確保已 import
-        word_data = doc.to_dict()
-        update = sm2_review(
-            last_interval=word_data.get("lastInterval", 0),
-            ease_factor=word_data.get("easeFactor", 2.5),
-            quality=2
-        )
-        doc_ref.update({
-            "lastInterval": update["interval"],
-            "easeFactor": update["easeFactor"],
-            "dueDate": update["dueDate"]
-        })
+        fields = remark_fields(word_data, params)
+        word_store.update(user_id, word, fields)
+        word_saved.send(user_id, word_id=word, fields=fields)
+        review_log.record(user_id, [review_log.review_event(word, REMARK_QUALITY, word_data, fields)])
         return jsonify(
             word=word,
             short=word_data.get("short", "無翻譯"),
@@ -46,45 +53,25 @@ def create_or_mark_word():
             existed=True
         ), 200
 
-    # 呼叫 OpenAI 翻譯與解釋
-    try:
-        messages = [
-            {
-                "role": "system",
-                "content": "You are a concise English-to-Tranditional Chinese dictionary assistant. Provide clear and short definitions."
-            },
-            {
-                "role": "user",
-                "content": f"Translate the English word '{word}' into the shortest possible Tranditional Chinese meaning. Just output a few Tranditional Chinese words, no punctuation or explanation."
-            },
-            {
-                "role": "user",
-                "content": f"Then give a brief Tranditional Chinese explanation of '{word}', including the part of speech (e.g., n., v., adj.). Use simple language in one or two lines. Keep it short and clear. Separate the two parts with 3 hyphens (---)."
-            }
-        ]
-        response = openai.chat.completions.create(
-            model="gpt-4o",
-            messages=messages,
-            max_tokens=150
-        )
-        parts = response.choices[0].message.content.strip().split('---', 1)
-        short = parts[0].strip()
-        full = parts[1].strip() if len(parts) > 1 else short
-    except Exception as e:
-        short = "翻譯失敗"
-        full = str(e)
+    # 先查共用定義快取，未命中才呼叫 OpenAI 翻譯與解釋
+    cached = definition_cache.get(word)
+    if cached:
+        short, full = cached["short"], cached["full"]
+    else:
+        try:
+            short, full = _define_word(word)
+            definition_cache.put(word, short, full)
+        except LLMBusy as e:
+            # GPT 名額已滿或限流中：不寫入「翻譯失敗」的單字，請用戶端稍後重試
+            return llm_busy(e)
+        except Exception as e:
+            short = "翻譯失敗"
+            full = str(e)
 
     # 新增新單字資料
-    doc_ref.set({
-        "userId": user_id,
-        "createdAt": datetime.utcnow(),
-        "lastInterval": 0,
-        "easeFactor": 2.5,
-        "dueDate": datetime.utcnow(),
-        "short": short,
-        "full": full,
-        "reviewCount": 0
-    })
+    new_doc = new_word_document(user_id, short, full, params["initialEase"])
+    word_store.set(user_id, word, new_doc)
+    word_saved.send(user_id, word_id=word, fields=new_doc, created=True)
 
     return jsonify(
         word=word,
@@ -94,13 +81,93 @@ def create_or_mark_word():
     ), 201
 
 
+REMARK_QUALITY = 2
+
+
+def remark_fields(word_data, params=None):
+    """已存在的單字再次被點擊：以 quality=2 套用 SM-2，回傳要更新的欄位"""
+    params = params or DEFAULT_PARAMS
+    update = sm2_review(
+        last_interval=word_data.get("lastInterval", 0),
+        ease_factor=word_data.get("easeFactor", params["initialEase"]),
+        quality=REMARK_QUALITY,
+        params=params
+    )
+    return {
+        "lastInterval": update["interval"],
+        "easeFactor": update["easeFactor"],
+        "dueDate": update["dueDate"]
+    }
+
+
+def new_word_document(user_id, short, full, ease_factor=DEFAULT_PARAMS["initialEase"]):
+    """ease_factor 為使用者擬合的起始 EF（sm2Params.initialEase）"""
+    now = datetime.utcnow()
+    return {
+        "userId": user_id,
+        "createdAt": now,
+        "lastInterval": 0,
+        "easeFactor": ease_factor,
+        "dueDate": now,
+        "short": short,
+        "full": full,
+        "reviewCount": 0
+    }
+
+
+def definition_messages(word):
+    """字典查詢的 GPT messages（同步與 async 端點共用）"""
+    return [
+        {
+            "role": "system",
+            "content": "You are a concise English-to-Tranditional Chinese dictionary assistant. Provide clear and short definitions."
+        },
+        {
+            "role": "user",
+            "content": f"Translate the English word '{word}' into the shortest possible Tranditional Chinese meaning. Just output a few Tranditional Chinese words, no punctuation or explanation."
+        },
+        {
+            "role": "user",
+            "content": f"Then give a brief Tranditional Chinese explanation of '{word}', including the part of speech (e.g., n., v., adj.). Use simple language in one or two lines. Keep it short and clear. Separate the two parts with 3 hyphens (---)."
+        }
+    ]
+
+
+def parse_definition(content):
+    """GPT 回覆以 --- 分成 (short, full)"""
+    parts = content.strip().split('---', 1)
+    short = parts[0].strip()
+    full = parts[1].strip() if len(parts) > 1 else short
+    return short, full
+
+
+def _define_word(word):
+    """呼叫 GPT 取得單字的 (short, full) 中文翻譯與解釋"""
+    return parse_definition(llm.complete("definition", definition_messages(word)))
+
+
+def llm_busy(e):
+    """GPT 名額已滿或限流冷卻中：回 503 與 Retry-After"""
+    resp = jsonify(error="server busy, please retry")
+    resp.headers["Retry-After"] = str(e.retry_after)
+    return resp, 503
+
+
 @bp.route('', methods=['GET'])
 @auth_required
 def list_words():
+    """
+    分頁列出使用者的單字（依 createdAt 升冪）
+    query param: ?limit=100&cursor=...&fields=short,dueDate
+    """
     user_id = g.user["sub"]
-    docs = db.collection("words").where("userId","==",user_id).order_by("createdAt").stream()
-    words = [{**doc.to_dict(), "id": doc.id} for doc in docs]
-    return jsonify(words=words), 200
+    try:
+        limit, cursor, fields = parse_page_args(request.args)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+
+    words, next_cursor = word_store.page(user_id, limit, cursor, fields)
+    return jsonify(words=words, nextCursor=next_cursor), 200
 
 @bp.route('/<word_id>', methods=['PUT'])
 @auth_required
@@ -108,10 +175,9 @@ def update_word(word_id):
     user_id = g.user["sub"]
     data = request.get_json(force=True)
 
-    # 1. 先取出該文件，確保它屬於當前使用者
-    doc_ref = db.collection("words").document(word_id)
-    doc = doc_ref.get()
-    if not doc.exists or doc.to_dict().get("userId") != user_id:
+    # 1. 單字存放在使用者自己的路徑下，讀得到即屬於當前使用者
+    word_data = word_store.get(user_id, word_id)
+    if word_data is None:
         return jsonify(error="Not found or unauthorized"), 404
 
     # 2. 只更新 level（或你允許的欄位）
@@ -121,7 +187,8 @@ def update_word(word_id):
     if not update_fields:
         return jsonify(error="No fields to update"), 400
 
-    doc_ref.update(update_fields)
+    word_store.update(user_id, word_id, update_fields)
+    word_saved.send(user_id, word_id=word_id, fields=update_fields)
     return jsonify(message="word updated"), 200
 
 @bp.route('/<word_id>', methods=['DELETE'])
@@ -129,53 +196,181 @@ def update_word(word_id):
 def delete_word(word_id):
     user_id = g.user["sub"]
 
-    # 1. 確認擁有權
-    doc_ref = db.collection("words").document(word_id)
-    doc = doc_ref.get()
-    if not doc.exists or doc.to_dict().get("userId") != user_id:
+    # 1. 確認單字存在（路徑已限定使用者）
+    if word_store.get(user_id, word_id) is None:
         return jsonify(error="Not found or unauthorized"), 404
 
     # 2. 刪除
-    doc_ref.delete()
+    word_store.delete(user_id, word_id)
+    word_deleted.send(user_id, word_id=word_id)
     return '', 204
 
+@bp.route('/import', methods=['POST'])
+@auth_required
+def import_words():
+    """
+    批次匯入單字（背景執行，見 word_import.py）
+    - JSON：{"content": "...", "format": "auto|list|csv|anki"} 或 {"words": ["apple", ...]}
+    - multipart：file 欄位上傳 CSV / 單字清單 / Anki 匯出，格式以 ?format= 指定（預設 auto）
+    回傳 202 與 jobId，以 GET /words/import/<jobId> 輪詢進度
+    """
+    user_id = g.user["sub"]
+    upload = request.files.get("file")
+    if upload is not None:
+        data = {"content": upload.read().decode("utf-8-sig", errors="replace"), "format": request.args.get("format")}
+    else:
+        data = request.get_json(force=True, silent=True) or {}
+
+    fmt = data.get("format") or "auto"
+    if fmt not in word_import.FORMATS:
+        return jsonify(error=f"format must be one of {', '.join(word_import.FORMATS)}"), 400
+    if isinstance(data.get("words"), list):
+        words, invalid = word_import.clean_words(data["words"])
+    elif isinstance(data.get("content"), str):
+        words, invalid = word_import.parse_words(data["content"], fmt)
+    else:
+        return jsonify(error="content or words is required"), 400
+
+    if not words:
+        return jsonify(error="no valid words", invalid=invalid[:word_import.MAX_REPORTED]), 400
+    if len(words) > word_import.MAX_WORDS:
+        return jsonify(error=f"at most {word_import.MAX_WORDS} words per import"), 400
+
+    job_id = word_import.start_import(user_id, words, invalid)
+    resp = jsonify(jobId=job_id, status="queued", total=len(words), invalidCount=len(invalid))
+    resp.headers["Location"] = f"{bp.url_prefix}/import/{job_id}"
+    return resp, 202
+
+@bp.route('/import/<job_id>', methods=['GET'])
+@auth_required
+def import_status(job_id):
+    """匯入進度：status 為 queued / running / done / failed / interrupted"""
+    status = word_import.job_status(g.user["sub"], job_id)
+    if status is None:
+        return jsonify(error="Not found or unauthorized"), 404
+    return jsonify(status), 200
+
 @bp.route('/quiz', methods=['GET'])
 @auth_required
 def generate_quiz():
+    # 延後匯入：NumPy 只在第一次出題時才載入
+    from distractors import distractor_index
     user_id = g.user["sub"]
-    docs = db.collection("words").where("userId", "==", user_id).stream()
-    word_list = [doc.id for doc in docs]
+    index = distractor_index.get(user_id)
+    word_list = index.words()
 
     if len(word_list) < 4:
         return jsonify(error="需要至少 4 個單字才能生成測驗"), 400
 
     selected_words = random.sample(word_list, min(10, len(word_list)))
-    questions = []
+    try:
+        sentences = _generate_quiz_sentences(selected_words)
+    except LLMBusy as e:
+        return llm_busy(e)
+
+    questions = build_quiz_questions(selected_words, sentences, word_list, index)
+    if not questions:
+        return jsonify(error="GPT generation failed"), 502
 
+    return jsonify(questions=questions), 200
+
+
+QUIZ_SYSTEM_PROMPT = "You are an English teacher generating quiz questions."
+QUIZ_MAX_WORKERS = 4        # 補產句子時的最大並行數（期限與全域並行上限見 llm.SITES）
+
+
+def build_quiz_questions(selected_words, sentences, word_list, index=None):
+    """
+    組合題目與選項；句子產生失敗的單字略過，回傳部分題目。
+    有單字索引（distractors.WordIndex）時挑拼字、詞性、長度相近的干擾選項，否則隨機挑選。
+    """
+    from distractors import random_distractors
+    questions = []
     for target_word in selected_words:
-        others = [w for w in word_list if w != target_word]
-        distractors = random.sample(others, min(3, len(others)))
+        sentence = sentences.get(target_word)
+        if not sentence:
+            continue
+
+        if index is not None:
+            distractors = index.distractors(target_word, 3)
+        else:
+            distractors = random_distractors(word_list, target_word, 3)
         options = distractors + [target_word]
         random.shuffle(options)
 
-        prompt = f"Create a TOEIC-style fill-in-the-blank sentence using the word '{target_word}', with a blank for the word."
-        response = openai.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are an English teacher generating quiz questions."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=80
-        )
-        sentence = response.choices[0].message.content.strip()
-
         questions.append({
             "question": sentence,
             "options": options,
             "answer": target_word
         })
+    return questions
+
+
+def quiz_batch_messages(words):
+    prompt = (
+        "Create one TOEIC-style fill-in-the-blank sentence for each of these words, "
+        "with a blank (____) where the word belongs: "
+        f"{', '.join(words)}. "
+        'Respond with a JSON object of the form {"sentences": {"<word>": "<sentence>"}}.'
+    )
+    return [
+        {"role": "system", "content": QUIZ_SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def quiz_sentence_messages(target_word):
+    prompt = f"Create a TOEIC-style fill-in-the-blank sentence using the word '{target_word}', with a blank for the word."
+    return [
+        {"role": "system", "content": QUIZ_SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def parse_quiz_sentences(content, words):
+    """解析批次 JSON 回覆，只保留要求的單字；格式錯誤拋 ValueError"""
+    parsed = json.loads(content)
+    sentences = {}
+    for word, sentence in (parsed.get("sentences") or {}).items():
+        if word in words and isinstance(sentence, str) and sentence.strip():
+            sentences[word] = sentence.strip()
+    return sentences
+
+
+def _generate_quiz_sentences(words):
+    """
+    為每個單字產生一句 TOEIC 風格的克漏字句子，回傳 {word: sentence}。
+    - 先以單一結構化（JSON）prompt 一次取得所有句子，只需一次 GPT 往返
+    - 批次結果缺漏的單字，再以有上限的並行呼叫逐字補產（各自有期限）
+    - 仍失敗的單字不會出現在結果中，由呼叫端決定如何處理
+    - 批次呼叫就遇到 LLMBusy 時直接拋出，不再逐字補產加重限流
+    """
+    sentences = {}
+    try:
+        content = llm.complete("quiz_batch", quiz_batch_messages(words),
+                               response_format={"type": "json_object"}, max_tokens=80 * len(words))
+        sentences = parse_quiz_sentences(content, words)
+    except LLMBusy:
+        raise
+    except Exception:
+        pass
+
+    missing = [w for w in words if w not in sentences]
+    if missing:
+        with ThreadPoolExecutor(max_workers=min(QUIZ_MAX_WORKERS, len(missing))) as pool:
+            futures = {pool.submit(_generate_quiz_sentence, w): w for w in missing}
+            for future in as_completed(futures):
+                try:
+                    sentences[futures[future]] = future.result()
+                except Exception:
+                    continue
+    return sentences
+
+
+def _generate_quiz_sentence(target_word):
+    """單一單字的克漏字句子（批次結果缺漏時使用）"""
+    return llm.complete("quiz_sentence", quiz_sentence_messages(target_word)).strip()
 
-    return jsonify(questions=questions), 200
 
 # @bp.route('/mark', methods=['POST'])
 # @auth_required